@@ -44,6 +44,25 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Tokyo'
 
+# 音声処理設定
+AUDIO_PROCESSING_WORKERS = config('AUDIO_PROCESSING_WORKERS', default=0, cast=int)  # 0の場合はCPUコア数
+OPENAI_CHUNK_FORMAT = config('OPENAI_CHUNK_FORMAT', default='ogg')  # OpenAIへ送る分割ファイルの形式（ogg / mp3）
+OPENAI_MAX_IN_FLIGHT = config('OPENAI_MAX_IN_FLIGHT', default=4, cast=int)  # OpenAI APIへの同時リクエスト数
+OPENAI_REQUESTS_PER_MINUTE = config('OPENAI_REQUESTS_PER_MINUTE', default=50, cast=int)  # OpenAI APIの1分あたりのリクエスト数
+TRANSCRIPTION_CHUNK_CACHE_TTL = config('TRANSCRIPTION_CHUNK_CACHE_TTL', default=7 * 24 * 60 * 60, cast=int)  # 分割ファイルごとの文字起こし結果の保存期間（秒、0で無効）
+TRANSCRIPTION_CHUNK_CACHE_EVICT_INTERVAL = config('TRANSCRIPTION_CHUNK_CACHE_EVICT_INTERVAL', default=24 * 60 * 60, cast=int)  # 期限切れの文字起こし結果を削除する間隔（秒）
+INFERENCE_SOCKET_PATH = config('INFERENCE_SOCKET_PATH', default='/tmp/voice_picker/inference.sock')  # Whisper・pyannoteの推論サーバーのUnixソケット
+WHISPER_BACKEND = config('WHISPER_BACKEND', default='openai-whisper')  # ローカルWhisperのエンジン（openai-whisper / faster-whisper）
+WHISPER_COMPUTE_TYPE = config('WHISPER_COMPUTE_TYPE', default='int8')  # faster-whisperの量子化（int8 / int8_float32 / float32）
+WHISPER_CPU_THREADS = config('WHISPER_CPU_THREADS', default=0, cast=int)  # faster-whisperのスレッド数（0の場合は自動）
+WHISPER_SHARD_MIN_SECONDS = config('WHISPER_SHARD_MIN_SECONDS', default=600, cast=int)  # この長さ以上の録音はシャードに分割して並列に文字起こしする（0で無効）
+WHISPER_SHARD_WORKERS = config('WHISPER_SHARD_WORKERS', default=0, cast=int)  # シャードのワーカー数（0の場合はCPUコア数 / WHISPER_SHARD_THREADS）
+WHISPER_SHARD_THREADS = config('WHISPER_SHARD_THREADS', default=2, cast=int)  # 1ワーカーあたりのスレッド数
+TRANSCRIPTION_ENGINE = config('TRANSCRIPTION_ENGINE', default='')  # 空の場合はジョブごとに自動で選ぶ（local-whisper / openai-api / vosk）
+TRANSCRIPTION_LOCAL_QUEUE_LIMIT = config('TRANSCRIPTION_LOCAL_QUEUE_LIMIT', default=2, cast=int)  # ローカルのエンジンで処理中のファイルがこの件数以上になるとAPIに振り分ける
+TRANSCRIPTION_LOCAL_MAX_SECONDS = config('TRANSCRIPTION_LOCAL_MAX_SECONDS', default=3600, cast=int)  # 有料プランでこの長さ（秒）を超える録音はAPIに振り分ける（0で無効）
+VOSK_MODEL_PATH = config('VOSK_MODEL_PATH', default=os.path.join(BASE_DIR, 'models', 'vosk-model-small-ja-0.22'))  # 無料プラン用のVoskモデル
+
 allowed_hosts = config('ALLOWED_HOSTS', default='*')
 ALLOWED_HOSTS = [h.strip() for h in allowed_hosts.split(',')]
 
@@ -286,6 +305,9 @@ EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 # voice-pickerファイルアップロード設定-----------------------------------------------------------------------
 MEDIA_URL = ''
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+PCM_ARTIFACT_ROOT = os.path.join(MEDIA_ROOT, 'pcm')  # 処理用の16kHzモノラルPCMの保存先
+DIARIZATION_CACHE_ROOT = os.path.join(MEDIA_ROOT, 'diarization')  # 話者分離の結果（RTTM、音声のSHA-256ごと）の保存先
+TRANSCRIPTION_CHUNK_CACHE_ROOT = os.path.join(MEDIA_ROOT, 'transcription_chunks')  # OpenAI APIの分割ファイルごとの文字起こし結果の保存先
 
 # ログ設定------------------------------------------------------------------------------------------------
 # プロジェクトのベースディレクトリを設定
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UploadedFile, Transcription
+from .models import UploadedFile, Transcription, ProcessingStage
 
 class UploadedFileAdmin(admin.ModelAdmin):
     list_display = ['id', 'organization_id', 'file', 'duration', 'status', 'summarization', 'issue', 'solution', 'created_at', 'updated_at', 'deleted_at']
@@ -11,5 +11,11 @@ class TranscriptionAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'updated_at', 'deleted_at']
     search_fields = ['text']
 
+class ProcessingStageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'uploaded_file', 'name', 'status', 'attempts', 'started_at', 'finished_at']
+    list_filter = ['name', 'status', 'created_at']
+    search_fields = ['uploaded_file__id', 'error']
+
 admin.site.register(UploadedFile, UploadedFileAdmin)
-admin.site.register(Transcription, TranscriptionAdmin)
\ No newline at end of file
+admin.site.register(Transcription, TranscriptionAdmin)
+admin.site.register(ProcessingStage, ProcessingStageAdmin)
\ No newline at end of file
@@ -0,0 +1,2 @@
+from .runner import AudioBenchmark, BenchmarkResult, build_baseline, compare_baselines, load_baseline, save_baseline
+from .synthetic import generate_recording, iter_synthetic_blocks
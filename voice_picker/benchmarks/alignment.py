@@ -0,0 +1,67 @@
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# 会議を想定した話者交代・文字起こしセグメントの長さ（秒）
+TURN_SECONDS = (0.5, 12.0)
+SEGMENT_SECONDS = (1.0, 8.0)
+N_SPEAKERS = 6
+
+
+def synthetic_meeting(minutes: float, seed: int = 0, long_turns: bool = False) -> Tuple[List[dict], List[tuple]]:
+    """
+    話者分離の結果（話者区間）と文字起こしのセグメントを合成する。
+    話者区間は一部が重なり（同時発話）、セグメントの境界は話者区間の境界と揃わない。
+
+    Args:
+        minutes (float): 会議の長さ（分）
+        seed (int): 乱数のシード
+        long_turns (bool): 会議全体にわたる話者区間（BGMや司会のマイクなど）と、
+            数分にわたって他の発話と重なる区間を加える
+
+    Returns:
+        Tuple[List[dict], List[tuple]]: (セグメントのリスト, 話者区間のリスト)
+    """
+    rng = np.random.default_rng(seed)
+    total = minutes * 60
+
+    tracks = []
+    position = 0.0
+    while position < total:
+        length = rng.uniform(*TURN_SECONDS)
+        speaker = f"SPEAKER_{rng.integers(N_SPEAKERS):02d}"
+        # 2割程度は前の発話に重ねる
+        start = max(0.0, position - rng.uniform(0, 1.0)) if rng.random() < 0.2 else position
+        tracks.append((start, min(total, position + length), speaker))
+        position += length + rng.uniform(0, 0.5)
+
+    if long_turns:
+        tracks.append((0.0, total, f"SPEAKER_{N_SPEAKERS:02d}"))
+        for start in rng.uniform(0, total, size=max(1, int(minutes // 10))):
+            tracks.append((start, min(total, start + rng.uniform(60, 300)), f"SPEAKER_{N_SPEAKERS + 1:02d}"))
+        tracks.sort(key=lambda track: track[0])
+
+    segments = []
+    position = 0.0
+    while position < total:
+        length = rng.uniform(*SEGMENT_SECONDS)
+        segments.append({'start': position, 'end': min(total, position + length), 'text': ''})
+        position += length
+
+    return segments, tracks
+
+
+def assign_speakers_naive(segments: List[dict], speaker_tracks: List[tuple]) -> List[Optional[str]]:
+    """
+    比較用: セグメントごとに話者区間を先頭から走査する実装（O(n × m)）。
+    """
+    speakers = []
+    for segment in segments:
+        overlaps = defaultdict(float)
+        for start, end, speaker in speaker_tracks:
+            overlap = min(segment['end'], end) - max(segment['start'], start)
+            if overlap > 0:
+                overlaps[speaker] += overlap
+        speakers.append(max(overlaps, key=overlaps.get) if overlaps else None)
+    return speakers
@@ -0,0 +1,299 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from .alignment import assign_speakers_naive, synthetic_meeting
+from .synthetic import generate_recording
+
+BENCHMARK_DURATIONS_MINUTES = (5, 30, 60, 180)
+# パイプラインの各ステージで実際に使う関数
+BENCHMARK_CASES = (
+    'ingest_upload',
+    'reduce_noise_chunked',
+    'plan_chunks',
+    'export_chunks',
+    'merge_transcription_results',
+    'assign_speakers',
+    'assign_speakers_naive',
+)
+# 結合処理のベンチマークで使う1セグメントの長さ（秒）
+MERGE_SEGMENT_SECONDS = 4
+
+# 比較時に許容する悪化の割合
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.25
+
+
+@dataclass
+class BenchmarkResult:
+    case: str
+    minutes: float
+    seconds: float
+    peak_rss_mb: float
+    rss_delta_mb: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}@{self.minutes:g}min"
+
+
+def _max_rss_mb() -> float:
+    """
+    自プロセスと子プロセス（ノイズ除去のプロセスプールなど）のピークRSS（MB）。Linuxではru_maxrssはKB単位。
+    """
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, children_rss) / 1024
+
+
+def _measure_in_child(run: Callable[[], None], conn):
+    try:
+        start_rss = _max_rss_mb()
+        started_at = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - started_at
+        peak_rss = _max_rss_mb()
+        conn.send(('ok', seconds, peak_rss, peak_rss - start_rss))
+    except Exception as e:
+        conn.send(('error', repr(e)))
+    finally:
+        conn.close()
+
+
+def measure(run: Callable[[], None]) -> tuple:
+    """
+    runをforkした子プロセスで実行し、(経過秒数, ピークRSS, 実行中に増えたRSS)を返す。
+    ru_maxrssはプロセス単位でリセットできないため、ケースごとにプロセスを分ける。
+    """
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(run, child_conn))
+    process.start()
+    child_conn.close()
+    try:
+        message = parent_conn.recv()
+    except EOFError:
+        message = ('error', f"exit code {process.exitcode}")
+    process.join()
+    if message[0] != 'ok':
+        raise RuntimeError(f"ベンチマークの実行に失敗しました: {message[1]}")
+    return message[1:]
+
+
+class BenchmarkUpload:
+    """
+    ingest_uploadに渡すUploadedFileの代わり（計測のためにDBへ保存しない）。
+    ingest_uploadが使う元ファイルのパス・PCMアーティファクトのパス・再生時間の保存だけを持つ。
+    """
+
+    def __init__(self, source_path: str, pcm_path: str):
+        self.file = SimpleNamespace(path=source_path)
+        self.pcm_path = pcm_path
+        self.duration = None
+
+    def save(self, update_fields=None):
+        pass
+
+
+class AudioBenchmark:
+    """
+    合成音声を使って音声処理の各関数の処理時間とピークRSSを計測する。
+
+    元ファイル・PCMアーティファクトの作成（計測対象外の準備）は親プロセスで行い、
+    計測対象の関数だけを子プロセスで実行する。
+    """
+
+    def __init__(self, work_dir: str, seed: int = 0, repeat: int = 1):
+        self.work_dir = work_dir
+        self.seed = seed
+        self.repeat = max(1, repeat)
+
+    def _recording(self, minutes: float) -> str:
+        return generate_recording(os.path.join(self.work_dir, 'recordings'), minutes, self.seed)
+
+    def _artifact(self, minutes: float):
+        from voice_picker.services.pcm_artifact import PcmArtifact, build_pcm_artifact
+
+        path = os.path.join(self.work_dir, 'artifacts', f"synthetic_{minutes:g}min_seed{self.seed}.pcm")
+        artifact = PcmArtifact(path)
+        if not artifact.exists():
+            build_pcm_artifact(self._recording(minutes), path, denoise=False)
+        return artifact
+
+    def _input_copy(self, minutes: float, case: str) -> str:
+        """
+        元ファイルを置き換える関数（再多重化）のため、ケースごとの作業ディレクトリに元ファイルをコピーする。
+        """
+        case_dir = os.path.join(self.work_dir, case)
+        os.makedirs(case_dir, exist_ok=True)
+        input_path = os.path.join(case_dir, os.path.basename(self._recording(minutes)))
+        if not os.path.exists(input_path):
+            shutil.copyfile(self._recording(minutes), input_path)
+        return input_path
+
+    def prepare(self, case: str, minutes: float) -> Callable[[], None]:
+        """
+        ケースの準備を行い、計測対象の処理を返す。
+        """
+        from voice_picker import views
+        from voice_picker.services.chunk_planner import export_chunks, get_chunk_format, plan_chunks, remove_chunks
+        from voice_picker.services.silence_index import ensure_silence_index
+
+        if case == 'ingest_upload':
+            # 取り込みステージ（再多重化・PCMの抽出を1回の読み込みで行う）。ノイズ除去は別のケースで計測する
+            from voice_picker.services.ingest import ingest_upload
+
+            input_path = self._input_copy(minutes, case)
+            upload = BenchmarkUpload(input_path, os.path.join(self.work_dir, case, 'ingest.pcm'))
+            return lambda: ingest_upload(upload, denoise=False)
+
+        if case in ('assign_speakers', 'assign_speakers_naive'):
+            # 話者の割り当ては音声を使わないため、合成した話者区間・セグメントだけで計測する
+            from voice_picker.services.speaker_alignment import assign_speakers
+
+            segments, tracks = synthetic_meeting(minutes, self.seed)
+            target = assign_speakers if case == 'assign_speakers' else assign_speakers_naive
+            return lambda: target(segments, tracks)
+
+        artifact = self._artifact(minutes)
+        if case == 'reduce_noise_chunked':
+            # 取り込み時のノイズ除去（窓ごとにプロセスプールで処理し、結果を時間順に受け取る）
+            from voice_picker.services.noise_reduction import reduce_noise_chunked
+
+            def run():
+                for _ in reduce_noise_chunked(artifact.path, artifact.n_samples):
+                    pass
+            return run
+
+        chunk_format = get_chunk_format()
+        if case == 'plan_chunks':
+            # 無音インデックスの作成から計測する
+            if os.path.exists(artifact.silence_index_path):
+                os.remove(artifact.silence_index_path)
+            return lambda: plan_chunks(artifact.duration_ms, ensure_silence_index(artifact), bitrate=chunk_format['bitrate'])
+
+        chunks = plan_chunks(artifact.duration_ms, ensure_silence_index(artifact), bitrate=chunk_format['bitrate'])
+        if case == 'export_chunks':
+            output_dir = os.path.join(self.work_dir, case)
+            os.makedirs(output_dir, exist_ok=True)
+
+            def run():
+                remove_chunks(export_chunks(artifact, output_dir, chunks, chunk_format))
+            return run
+
+        if case == 'merge_transcription_results':
+            from voice_picker.services.chunk_planner import ChunkManifestEntry
+
+            manifest = [ChunkManifestEntry('', start_ms, end_ms, 0) for start_ms, end_ms in chunks]
+            results = [
+                {
+                    'text': '',
+                    'segments': [
+                        {'start': start, 'end': start + MERGE_SEGMENT_SECONDS, 'text': 'テスト'}
+                        for start in range(0, (end_ms - start_ms) // 1000, MERGE_SEGMENT_SECONDS)
+                    ],
+                }
+                for start_ms, end_ms in chunks
+            ]
+            return lambda: views.merge_transcription_results(results, manifest)
+
+        raise ValueError(f"不明なベンチマークケースです: {case}")
+
+    def run(self, cases=BENCHMARK_CASES, durations=BENCHMARK_DURATIONS_MINUTES, on_result=None) -> List[BenchmarkResult]:
+        results = []
+        for minutes in durations:
+            for case in cases:
+                measurements = [measure(self.prepare(case, minutes)) for _ in range(self.repeat)]
+                # 処理時間は最速の回、メモリは最大の回を採用する
+                result = BenchmarkResult(
+                    case=case,
+                    minutes=minutes,
+                    seconds=round(min(m[0] for m in measurements), 4),
+                    peak_rss_mb=round(max(m[1] for m in measurements), 1),
+                    rss_delta_mb=round(max(m[2] for m in measurements), 1),
+                )
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_baseline(results: List[BenchmarkResult], seed: int = 0) -> dict:
+    """
+    計測結果をコミット間で比較できるJSONの形式にする。
+    """
+    return {
+        'git_commit': _git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'results': {result.key: asdict(result) for result in results},
+    }
+
+
+def save_baseline(baseline: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_baselines(
+    current: dict,
+    previous: dict,
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+) -> List[Dict]:
+    """
+    2つのベースラインを比較し、許容範囲を超えて悪化した項目を返す。
+    メモリはフォーク元のプロセスの大きさに左右されないよう、実行中に増えたRSSで比較する。
+
+    Args:
+        current (dict): 今回のベースライン
+        previous (dict): 比較対象のベースライン
+        time_tolerance (float): 処理時間の許容する悪化の割合
+        memory_tolerance (float): メモリ使用量の許容する悪化の割合
+
+    Returns:
+        List[Dict]: 悪化した項目（key・metric・previous・current・ratio）のリスト
+    """
+    regressions = []
+    for key, result in current['results'].items():
+        before = previous['results'].get(key)
+        if before is None:
+            continue
+        for metric, tolerance in (('seconds', time_tolerance), ('rss_delta_mb', memory_tolerance)):
+            # ごく小さな値は誤差の影響が大きいため比較しない
+            floor = 0.05 if metric == 'seconds' else 5.0
+            if before[metric] < floor and result[metric] < floor:
+                continue
+            ratio = result[metric] / max(before[metric], floor)
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    'key': key,
+                    'metric': metric,
+                    'previous': before[metric],
+                    'current': result[metric],
+                    'ratio': round(ratio, 3),
+                })
+    return regressions
@@ -0,0 +1,104 @@
+import os
+import subprocess
+from typing import Iterator
+
+import numpy as np
+
+from voice_picker.services.audio_stream import PCM_SAMPLE_RATE, write_wav_blocks
+
+# 合成音声の構成（秒）
+UTTERANCE_SECONDS = (1.0, 8.0)
+PAUSE_SECONDS = (0.3, 2.5)
+# 会議の区切りを想定した長めの無音（分割ポイントの候補になる）
+LONG_PAUSE_EVERY = 20
+LONG_PAUSE_SECONDS = 1.5
+
+NOISE_FLOOR = 30  # 無音区間の背景ノイズ（int16の振幅、約-60dBFS）
+SPEECH_AMPLITUDE = 8000
+
+
+def _utterance(rng: np.random.Generator, n_samples: int, sample_rate: int) -> np.ndarray:
+    """
+    発話に似た信号（基本周波数と倍音・音節ごとの振幅変調・子音のノイズバースト）を作る。
+    """
+    t = np.arange(n_samples, dtype=np.float32) / sample_rate
+    f0 = rng.uniform(100, 250)
+    # 抑揚としてゆっくり基本周波数を揺らす
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t))) / sample_rate
+    voiced = sum(np.sin(phase * k) / k for k in range(1, 6))
+    # 1秒あたり約4音節
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t + rng.uniform(0, np.pi)), 0, None)
+    signal = voiced * envelope
+
+    for _ in range(max(1, int(n_samples / sample_rate * 3))):
+        start = rng.integers(0, max(1, n_samples - sample_rate // 20))
+        length = min(sample_rate // 20, n_samples - start)
+        signal[start:start + length] += rng.normal(0, 0.8, length)
+
+    return (signal / np.max(np.abs(signal)) * SPEECH_AMPLITUDE).astype(np.int16)
+
+
+def _pause(rng: np.random.Generator, n_samples: int) -> np.ndarray:
+    return rng.normal(0, NOISE_FLOOR, n_samples).astype(np.int16)
+
+
+def iter_synthetic_blocks(minutes: float, seed: int = 0, sample_rate: int = PCM_SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """
+    発話と無音が交互に続く合成音声をint16のブロックで返す。
+    同じminutes・seedからは常に同じ信号が生成される。
+
+    Args:
+        minutes (float): 長さ（分）
+        seed (int): 乱数のシード
+        sample_rate (int): サンプリングレート
+
+    Returns:
+        Iterator[np.ndarray]: int16のサンプル配列のイテレータ
+    """
+    rng = np.random.default_rng(seed)
+    remaining = int(minutes * 60 * sample_rate)
+    index = 0
+    while remaining > 0:
+        n_speech = min(remaining, int(rng.uniform(*UTTERANCE_SECONDS) * sample_rate))
+        yield _utterance(rng, n_speech, sample_rate)
+        remaining -= n_speech
+
+        pause_seconds = LONG_PAUSE_SECONDS if index % LONG_PAUSE_EVERY == LONG_PAUSE_EVERY - 1 else rng.uniform(*PAUSE_SECONDS)
+        n_pause = min(remaining, int(pause_seconds * sample_rate))
+        if n_pause > 0:
+            yield _pause(rng, n_pause)
+            remaining -= n_pause
+        index += 1
+
+
+def generate_recording(output_dir: str, minutes: float, seed: int = 0) -> str:
+    """
+    合成音声をMP3（アップロードされる録音に近い形式）で作成する。作成済みの場合はそのまま返す。
+
+    Args:
+        output_dir (str): 出力先のディレクトリ
+        minutes (float): 長さ（分）
+        seed (int): 乱数のシード
+
+    Returns:
+        str: MP3ファイルのパス
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    mp3_path = os.path.join(output_dir, f"synthetic_{minutes:g}min_seed{seed}.mp3")
+    if os.path.exists(mp3_path):
+        return mp3_path
+
+    wav_path = mp3_path[:-4] + '.wav'
+    try:
+        write_wav_blocks(wav_path, iter_synthetic_blocks(minutes, seed))
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+             '-i', wav_path, '-c:a', 'libmp3lame', '-b:a', '64k', '-y', mp3_path + '.tmp.mp3'],
+            check=True,
+        )
+        os.replace(mp3_path + '.tmp.mp3', mp3_path)
+    finally:
+        for path in (wav_path, mp3_path + '.tmp.mp3'):
+            if os.path.exists(path):
+                os.remove(path)
+    return mp3_path
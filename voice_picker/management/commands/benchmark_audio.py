@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voice_picker.benchmarks.runner import (
+    BENCHMARK_CASES,
+    BENCHMARK_DURATIONS_MINUTES,
+    DEFAULT_MEMORY_TOLERANCE,
+    DEFAULT_TIME_TOLERANCE,
+    AudioBenchmark,
+    build_baseline,
+    compare_baselines,
+    load_baseline,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = '合成音声で音声処理のベンチマーク（処理時間・ピークRSS）を実行し、JSONのベースラインを出力する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=float, nargs='+', default=list(BENCHMARK_DURATIONS_MINUTES),
+                            help='合成音声の長さ（分）')
+        parser.add_argument('--cases', nargs='+', choices=BENCHMARK_CASES, default=list(BENCHMARK_CASES),
+                            help='計測する関数')
+        parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'voice_picker_benchmark'),
+                            help='合成音声・中間ファイルの保存先（2回目以降は合成音声を再利用する）')
+        parser.add_argument('--seed', type=int, default=0, help='合成音声の乱数シード')
+        parser.add_argument('--repeat', type=int, default=1, help='各ケースの実行回数')
+        parser.add_argument('--output', help='ベースラインJSONの出力先')
+        parser.add_argument('--compare', help='比較対象のベースラインJSON')
+        parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+        parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE)
+
+    def handle(self, *args, **options):
+        benchmark = AudioBenchmark(options['work_dir'], seed=options['seed'], repeat=options['repeat'])
+
+        def report(result):
+            self.stdout.write(
+                f"{result.key:<45} {result.seconds:>10.3f}s "
+                f"peak {result.peak_rss_mb:>8.1f}MB (+{result.rss_delta_mb:.1f}MB)"
+            )
+
+        results = benchmark.run(options['cases'], options['minutes'], on_result=report)
+        baseline = build_baseline(results, seed=options['seed'])
+
+        if options['output']:
+            save_baseline(baseline, options['output'])
+            self.stdout.write(f"ベースラインを保存しました: {options['output']}")
+
+        if options['compare']:
+            regressions = compare_baselines(
+                baseline,
+                load_baseline(options['compare']),
+                options['time_tolerance'],
+                options['memory_tolerance'],
+            )
+            for regression in regressions:
+                self.stderr.write(
+                    f"悪化: {regression['key']} {regression['metric']} "
+                    f"{regression['previous']} -> {regression['current']} (x{regression['ratio']})"
+                )
+            if regressions:
+                raise CommandError(f"{len(regressions)}件の項目がベースラインより悪化しました")
+            self.stdout.write(self.style.SUCCESS('ベースラインからの悪化はありません'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from voice_picker.models import OrganizationUsage
+import logging
+
+processing_logger = logging.getLogger('processing')
+
+class Command(BaseCommand):
+    help = '利用時間の台帳をアップロードファイルから集計し直し、ずれを修正します'
+
+    def handle(self, *args, **options):
+        fixed = 0
+        for usage in OrganizationUsage.objects.select_related('organization').iterator():
+            before = usage.total_duration
+            after = OrganizationUsage.reconcile(usage.organization, usage.period_start, usage.period_end).total_duration
+            if abs(after - before) > 1e-6:
+                fixed += 1
+                processing_logger.warning(f"利用時間の台帳を修正しました: {usage} {before:.1f}秒 -> {after:.1f}秒")
+        self.stdout.write(f"利用時間の台帳を再集計しました（修正: {fixed}件）")
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from voice_picker.services.inference import InferenceServer
+
+
+class Command(BaseCommand):
+    help = 'WhisperとpyannoteのモデルをUnixソケット越しで共有する推論サーバーを起動する（ホストごとに1プロセス）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.INFERENCE_SOCKET_PATH, help='Unixソケットのパス')
+        parser.add_argument('--no-preload', action='store_true', help='最初のリクエストまでモデルを読み込まない')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"推論サーバーを起動します: {options['socket']}")
+        InferenceServer(options['socket'], preload=not options['no_preload']).serve_forever()
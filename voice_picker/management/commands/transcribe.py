@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from voice_picker.models import UploadedFile, Environment
-from voice_picker.views import transcribe_and_save, text_generation_save, transcribe_without_diarization
+from voice_picker.views import text_generation_save, transcribe_with_engine
 from voice_picker.models.uploaded_file import Status
 import logging
 import requests
@@ -52,7 +52,7 @@ class Command(BaseCommand):
                 if organization.is_free_user():
                     # 無料ユーザーの場合の処理
                     with transaction.atomic():
-                        transcribe_result = transcribe_without_diarization(file_path, file_id, is_free_user=True)
+                        transcribe_result = transcribe_with_engine(file_path, file_id)
                         if not transcribe_result:
                             UploadedFile.objects.filter(id=file_id).update(status=Status.UNPROCESSED)
                             processing_logger.error(f"文字起こしに失敗しました。File ID: {file_id}")
@@ -67,7 +67,7 @@ class Command(BaseCommand):
                     # 有料会員の場合
                     with transaction.atomic():
                         # transcribe_google_colab(file_path, file_id)
-                        transcribe_result = transcribe_without_diarization(file_path, file_id)
+                        transcribe_result = transcribe_with_engine(file_path, file_id)
                         if not transcribe_result:
                             UploadedFile.objects.filter(id=file_id).update(status=Status.UNPROCESSED)
                             processing_logger.error(f"文字起こしに失敗しました。File ID: {file_id}")
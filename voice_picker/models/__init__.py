@@ -1,4 +1,6 @@
 from .uploaded_file import UploadedFile
 from .transcription import Transcription
 from .environment import Environment
+from .processing_stage import ProcessingStage
+from .organization_usage import OrganizationUsage
 from .meeting_recording import MeetingRecording
\ No newline at end of file
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from member_management.models import Organization
+import uuid
+
+def usage_period(organization, at=None):
+    """
+    利用時間を集計する期間（開始, 終了）を返す。終了も期間に含む。
+    契約期間内のサブスクリプションがある場合はその契約期間、ない場合はatを含む月。
+    """
+    at = at or timezone.now()
+    subscription = organization.get_subscription()
+    if subscription and subscription.is_active() and subscription.is_within_contract_period():
+        return subscription.current_period_start, subscription.current_period_end
+
+    month_start = timezone.localtime(at).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, next_month_start - timedelta(microseconds=1)
+
+def usage_contribution(duration, exist) -> float:
+    """1ファイルが利用時間に占める秒数（削除済み・再生時間が未取得の場合は0）"""
+    return float(duration or 0) if exist else 0.0
+
+class OrganizationUsage(models.Model):
+    """
+    組織・集計期間ごとの利用時間（秒）の台帳。
+    ファイルの作成・削除・再生時間の更新時に差分を加算するため、上限の確認は1行の読み込みで済む。
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='usages', verbose_name='組織')
+    period_start = models.DateTimeField(verbose_name='期間開始日時')
+    period_end = models.DateTimeField(verbose_name='期間終了日時')
+    total_duration = models.FloatField(default=0, verbose_name='合計再生時間（秒）')  # 合計再生時間（秒）
+    reconciled_at = models.DateTimeField(null=True, blank=True, verbose_name='再集計日時')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    @classmethod
+    def apply_delta(cls, organization_id, created_at, delta: float):
+        """
+        ファイルの作成日時を含む期間の台帳に、利用時間の差分を加算する。
+        台帳がまだない期間は、最初に読み込む時にSumで集計して作成する。
+        """
+        if not delta:
+            return
+        cls.objects.filter(
+            organization_id=organization_id,
+            period_start__lte=created_at,
+            period_end__gte=created_at,
+        ).update(total_duration=F('total_duration') + delta, updated_at=timezone.now())
+
+    @classmethod
+    def aggregate(cls, organization, period_start, period_end) -> float:
+        """アップロードファイルから期間内の利用時間をSumで集計する（再生時間が未取得のファイルは0秒）"""
+        from .uploaded_file import UploadedFile
+
+        return UploadedFile.objects.filter(
+            organization=organization,
+            exist=True,
+            created_at__gte=period_start,
+            created_at__lte=period_end,
+        ).aggregate(total=Coalesce(Sum('duration'), Value(0.0)))['total']
+
+    @classmethod
+    def reconcile(cls, organization, period_start, period_end):
+        """
+        期間内の利用時間をSumで集計し直して台帳を作成・修正する。
+
+        Returns:
+            OrganizationUsage: 台帳
+        """
+        with transaction.atomic():
+            usage, _ = cls.objects.select_for_update().update_or_create(
+                organization=organization,
+                period_start=period_start,
+                period_end=period_end,
+                defaults={
+                    'total_duration': cls.aggregate(organization, period_start, period_end),
+                    'reconciled_at': timezone.now(),
+                },
+            )
+        return usage
+
+    @classmethod
+    def current(cls, organization):
+        """
+        現在の集計期間の台帳を取得する。ない場合はSumで集計して作成する。
+
+        Returns:
+            OrganizationUsage: 台帳
+        """
+        period_start, period_end = usage_period(organization)
+        usage = cls.objects.filter(organization=organization, period_start=period_start, period_end=period_end).first()
+        if usage is not None:
+            return usage
+        try:
+            return cls.reconcile(organization, period_start, period_end)
+        except IntegrityError:
+            # 同時に作成された場合は、作成された台帳を使う
+            return cls.objects.get(organization=organization, period_start=period_start, period_end=period_end)
+
+    def __str__(self):
+        return f"{self.organization_id}: {self.period_start:%Y-%m-%d} - {self.period_end:%Y-%m-%d}"
+
+    class Meta:
+        verbose_name = '利用時間'
+        verbose_name_plural = '利用時間'
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'period_start', 'period_end'], name='unique_organization_usage_period'),
+        ]
@@ -0,0 +1,35 @@
+from django.db import models
+from .uploaded_file import UploadedFile
+from django.utils.translation import gettext_lazy as _
+import uuid
+
+class StageStatus(models.IntegerChoices):
+    RUNNING = 1, _('実行中')
+    COMPLETED = 2, _('完了')
+    SKIPPED = 3, _('スキップ')
+    FAILED = 4, _('失敗')
+
+class ProcessingStage(models.Model):
+    """文字起こしパイプラインの各ステージの実行状況（リトライ時に完了済みのステージから再開するため）"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='processing_stages', verbose_name='アップロードファイル')
+    name = models.CharField(max_length=20, verbose_name='ステージ名')
+    status = models.IntegerField(choices=StageStatus.choices, default=StageStatus.RUNNING, verbose_name='ステータス')
+    artifact_path = models.CharField(max_length=500, null=True, blank=True, verbose_name='成果物のパス')  # ステージの出力（JSON）
+    attempts = models.IntegerField(default=0, verbose_name='実行回数')
+    error = models.TextField(null=True, blank=True, verbose_name='エラー内容')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='開始日時')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='終了日時')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    def __str__(self):
+        return f"{self.uploaded_file_id}: {self.name}"
+
+    class Meta:
+        verbose_name = '処理ステージ'
+        verbose_name_plural = '処理ステージ'
+        constraints = [
+            models.UniqueConstraint(fields=['uploaded_file', 'name'], name='unique_processing_stage'),
+        ]
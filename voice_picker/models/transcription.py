@@ -30,3 +30,9 @@ class Transcription(models.Model):
     class Meta:
         verbose_name = '文字起こしテキスト'
         verbose_name_plural = '文字起こしテキスト'
+        indexes = [
+            # ファイルの文字起こしを再生時間順に取得（議事録等の再生成）
+            models.Index(fields=['uploaded_file', 'start_time'], name='transcription_file_start'),
+            # ファイルの文字起こしを作成順（同じ作成日時の場合は開始時間順）に取得（TranscriptionViewSet）
+            models.Index(fields=['uploaded_file', 'created_at', 'start_time'], name='transcription_file_created'),
+        ]
@@ -1,7 +1,9 @@
-from django.db import models
-from django.db.models.signals import pre_save, post_delete
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.utils import timezone
 from django.dispatch import receiver
+import glob
 import os
 import uuid
 from member_management.models import Organization
@@ -43,6 +45,9 @@ class UploadedFile(models.Model):
         default=Status.UNPROCESSED,
         verbose_name='ステータス'
     )
+    engine = models.CharField(max_length=30, null=True, blank=True, verbose_name='文字起こしエンジン')  # パイプラインの前処理で選んだエンジン
+    # 同一内容の再アップロードを検出するためのハッシュ（処理済みの結果を再利用する）
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, verbose_name='ファイルのSHA-256')
     duration = models.FloatField(null=True, blank=True, verbose_name='再生時間（秒）')  # 再生時間（秒）
     summarization = models.TextField(null=True, blank=True, verbose_name='文書要約結果')  # 文書要約結果
     issue = models.TextField(null=True, blank=True, verbose_name='課題点')  # 課題点
@@ -56,10 +61,28 @@ class UploadedFile(models.Model):
         from .transcription import Transcription
         return Transcription.objects.filter(uploaded_file=self)
 
+    @property
+    def pcm_path(self):
+        """正規化・ノイズ除去済みの16kHzモノラルPCMアーティファクトのパス"""
+        pcm_root = getattr(settings, 'PCM_ARTIFACT_ROOT', os.path.join(settings.MEDIA_ROOT, 'pcm'))
+        return os.path.join(pcm_root, str(self.organization_id), f"{self.id}.pcm")
+
+    def delete_pcm_artifact(self):
+        """PCMアーティファクトと派生ファイル（無音インデックス等）を削除する（再処理時は元ファイルから再作成される）"""
+        for path in glob.glob(os.path.splitext(self.pcm_path)[0] + '.*'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def save(self, *args, **kwargs):
+        # 利用時間の台帳（post_saveで差分を加算）を同じトランザクションで更新する
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def delete(self, using=None, keep_parents=False):
         self.deleted_at = timezone.now()
         self.exist = False
-        self.transcriptions.all().delete()
+        self.transcriptions().delete()
+        self.delete_pcm_artifact()
         self.save()
 
     def is_exist(self):
@@ -72,29 +95,55 @@ class UploadedFile(models.Model):
     class Meta:
         verbose_name = 'アップロードファイル'
         verbose_name_plural = 'アップロードファイル'
+        indexes = [
+            # 組織の期間内の合計再生時間（total_duration）。durationまで含めてテーブルを読まずに集計する
+            models.Index(fields=['organization', 'exist', 'created_at', 'duration'], name='uploadedfile_org_exist_created'),
+            # 組織のファイル一覧（(作成日時, ID)の降順のキーセットページネーション。逆順に走査する）
+            models.Index(fields=['organization', 'created_at', 'id'], name='uploadedfile_org_created'),
+            # 未処理・処理中のファイルの取得（transcribeコマンド）、エンジンごとの処理中のファイル数（キューの混雑度）
+            models.Index(fields=['status', 'engine'], name='uploadedfile_status'),
+        ]
 
 # ファイルの更新
+def delete_replaced_file(instance, old_file_name):
+    """元ファイルが差し替えられた場合、古い元ファイル（他で使われていなければ）とPCMアーティファクトを削除する"""
+    if instance.file == old_file_name:
+        return
+    # 元ファイルが差し替えられた場合、PCMアーティファクトは古くなるため削除する
+    instance.delete_pcm_artifact()
+    if old_file_name:
+        old_file_path = instance.file.storage.path(old_file_name)
+        if os.path.isfile(old_file_path):
+            other_files_using_same_path = UploadedFile.objects.filter(
+                file=old_file_name
+            ).exclude(pk=instance.pk).exists()
+
+            if not other_files_using_same_path:
+                os.remove(old_file_path)
+
 @receiver(pre_save, sender=UploadedFile)
-def delete_old_file(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_file = UploadedFile.objects.get(pk=instance.pk).file
-        except UploadedFile.DoesNotExist:
-            return
-        else:
-            new_file = instance.file
-            if not old_file == new_file:
-                if old_file and os.path.isfile(old_file.path):
-                    other_files_using_same_path = UploadedFile.objects.filter(
-                        file=old_file.name
-                    ).exclude(pk=instance.pk).exists()
-                    
-                    if not other_files_using_same_path:
-                        os.remove(old_file.path)
+def load_state_before_save(sender, instance, **kwargs):
+    """
+    保存前の行を1回だけ読み込み、元ファイルの差し替えの後始末と、利用時間の台帳の差分の計算に使う。
+    saveはトランザクション内で実行するため、行をselect_for_updateでロックしておき、
+    同じファイルの保存が並行しても、差分は直前に確定した再生時間・存在フラグから計算する。
+    """
+    from .organization_usage import usage_contribution
+
+    instance._usage_before_save = 0.0
+    if instance._state.adding:
+        return
+    old = UploadedFile.objects.select_for_update().filter(pk=instance.pk).values('file', 'duration', 'exist').first()
+    if old is None:
+        return
+    instance._usage_before_save = usage_contribution(old['duration'], old['exist'])
+    delete_replaced_file(instance, old['file'])
 
 # ファイルの削除
 @receiver(post_delete, sender=UploadedFile)
 def delete_file_on_delete(sender, instance, **kwargs):
+    instance.delete_pcm_artifact()
+
     if instance.file:
         if os.path.isfile(instance.file.path):
             other_files_using_same_path = UploadedFile.objects.filter(
@@ -110,3 +159,18 @@ def delete_file_on_delete(sender, instance, **kwargs):
                         os.rmdir(dir_path)
                 except OSError:
                     pass
+
+# 利用時間の台帳の更新（load_state_before_saveで控えた保存前の利用時間との差分を加算する）
+# QuerySet.update()などシグナルを通らない更新は反映されないため、reconcile_usageコマンドで定期的に集計し直す
+@receiver(post_save, sender=UploadedFile)
+def update_usage_on_save(sender, instance, **kwargs):
+    from .organization_usage import OrganizationUsage, usage_contribution
+
+    delta = usage_contribution(instance.duration, instance.exist) - getattr(instance, '_usage_before_save', 0.0)
+    OrganizationUsage.apply_delta(instance.organization_id, instance.created_at, delta)
+
+@receiver(post_delete, sender=UploadedFile)
+def update_usage_on_delete(sender, instance, **kwargs):
+    from .organization_usage import OrganizationUsage, usage_contribution
+
+    OrganizationUsage.apply_delta(instance.organization_id, instance.created_at, -usage_contribution(instance.duration, instance.exist))
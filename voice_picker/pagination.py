@@ -0,0 +1,94 @@
+import base64
+import binascii
+from collections import OrderedDict
+from uuid import UUID
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    (created_at, id)の降順のキーセットページネーション。
+    カーソルには前のページの最後の行の(created_at, id)を入れ、その行より後ろだけを読むため、
+    OFFSETと違って何ページ目でも読み込む行数はページサイズ分で済む。
+    同じcreated_atの行はidで順序を決めるため、ページの境界で重複・欠落しない。
+    """
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(created_at, pk) -> str:
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """
+        カーソルを(created_at, id)に戻す。不正なカーソルの場合はNotFound。
+        """
+        try:
+            created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(cursor)
+            return created_at, UUID(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound('カーソルが不正です')
+
+    def keyset_queryset(self, queryset, cursor=None):
+        """
+        (created_at, id)の降順に並べ、カーソルの行より後ろだけに絞り込んだクエリセットを返す。
+        """
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = self.keyset_queryset(queryset, request.query_params.get(self.cursor_query_param))
+
+        # 1件多く読み、次のページがあるかどうかを判定する
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1].created_at, page[-1].pk) if len(rows) > page_size else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -9,18 +9,34 @@ class EnvironmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'value', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class UploadedFileSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """fields引数で返すフィールドを絞り込めるModelSerializer（?fields=による疎なフィールドセット用）"""
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class UploadedFileSerializer(DynamicFieldsModelSerializer):
     organization = serializers.PrimaryKeyRelatedField(queryset=Organization.objects.all(), required=False)
     file = serializers.FileField()
 
     class Meta:
         model = UploadedFile
         fields = '__all__'
-        read_only_fields = ['organization', 'created_at', 'updated_at', 'deleted_at', 'exist']
+        read_only_fields = ['organization', 'engine', 'content_hash', 'created_at', 'updated_at', 'deleted_at', 'exist']
 
     def get_file(self, obj):
         return os.path.basename(obj.file.name) if obj.file else None
 
+class UploadedFileListSerializer(serializers.ModelSerializer):
+    """一覧用。要約・課題点・取り組み案（大きなTEXT列）は含めない"""
+    class Meta:
+        model = UploadedFile
+        fields = ['id', 'organization', 'file', 'status', 'duration', 'created_at', 'updated_at', 'exist']
+        read_only_fields = fields
+
 class TranscriptionSerializer(serializers.ModelSerializer):
     uploaded_file = serializers.PrimaryKeyRelatedField(queryset=UploadedFile.objects.all())
 
@@ -0,0 +1,15 @@
+from .audio_stream import decode_to_wav, iter_pcm_blocks
+from .noise_reduction import reduce_noise_chunked
+from .pcm_artifact import PcmArtifact, build_pcm_artifact, ensure_pcm_artifact
+from .silence_index import SilenceIndex, ensure_silence_index
+from .media_probe import probe_duration
+from .ingest import ingest_upload
+from .chunk_planner import ChunkManifestEntry, encode_chunk, export_chunks, plan_chunks
+from .openai_dispatch import TokenBucket, transcribe_chunks
+from .inference import diarize_artifact, transcribe_artifact
+from .engines import ENGINE_REGISTRY, EngineCapabilities, register_engine, route_engine
+from .diarization_store import load_speaker_tracks, save_speaker_tracks
+from .dedup import hash_uploaded_file, reuse_processed_duplicate
+from .chunk_cache import load_chunk_result, save_chunk_result
+from .pipeline import PIPELINE_STAGES, run_pipeline
+from .segment_store import bulk_save_transcriptions
@@ -0,0 +1,302 @@
+import logging
+import os
+import subprocess
+import wave
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+processing_logger = logging.getLogger('processing')
+
+# 文字起こし・話者分離で使用する共通フォーマット（16kHz / モノラル / 16bit）
+PCM_SAMPLE_RATE = 16000
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+# 1ブロックあたりの秒数（ブロック単位で処理することでメモリ使用量を一定に保つ）
+PCM_BLOCK_SECONDS = 30
+
+# pydubのnormalize()と同じヘッドルーム（dB）
+NORMALIZE_HEADROOM_DB = 0.1
+
+INT16_MAX = np.iinfo(np.int16).max
+
+
+def ffmpeg_pcm_command(file_path: str, sample_rate: int = PCM_SAMPLE_RATE) -> list:
+    """
+    16kHzモノラルのPCM(s16le)を標準出力に書き出すffmpegコマンドを組み立てる。
+
+    Args:
+        file_path (str): 入力ファイルのパス
+        sample_rate (int): 出力サンプリングレート
+
+    Returns:
+        list: ffmpegコマンド
+    """
+    return [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', file_path,
+        '-vn',
+        '-ac', str(PCM_CHANNELS),
+        '-ar', str(sample_rate),
+        '-f', 's16le',
+        '-acodec', 'pcm_s16le',
+        'pipe:1',
+    ]
+
+
+def iter_pcm_blocks(
+    file_path: str,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    block_seconds: int = PCM_BLOCK_SECONDS,
+) -> Iterator[np.ndarray]:
+    """
+    ffmpegでデコードしたPCMを固定サイズのブロック単位で返す。
+    ファイル全体をメモリに展開しないため、録音の長さに関わらずメモリ使用量は一定。
+
+    Args:
+        file_path (str): 入力ファイルのパス
+        sample_rate (int): 出力サンプリングレート
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Yields:
+        np.ndarray: int16のサンプル配列
+    """
+    block_bytes = sample_rate * block_seconds * PCM_SAMPLE_WIDTH
+    process = subprocess.Popen(
+        ffmpeg_pcm_command(file_path, sample_rate),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=block_bytes,
+    )
+    remainder = b''
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            data = remainder + data
+            # 16bit境界に揃える（パイプの読み込みは奇数バイトで返ることがある）
+            usable = len(data) - (len(data) % PCM_SAMPLE_WIDTH)
+            remainder = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.int16)
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode('utf-8', errors='replace')
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpegによるデコードに失敗しました: {file_path}: {stderr.strip()}")
+
+
+def decode_to_raw_pcm(
+    file_path: str,
+    raw_path: str,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    block_seconds: int = PCM_BLOCK_SECONDS,
+) -> Tuple[int, int]:
+    """
+    入力ファイルをヘッダなしのPCM(s16le)としてディスクに書き出し、
+    サンプル数とピーク値を返す。
+
+    Args:
+        file_path (str): 入力ファイルのパス
+        raw_path (str): 出力するPCMファイルのパス
+        sample_rate (int): 出力サンプリングレート
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Returns:
+        Tuple[int, int]: (サンプル数, 絶対値の最大値)
+    """
+    n_samples = 0
+    peak = 0
+    with open(raw_path, 'wb') as raw_file:
+        for block in iter_pcm_blocks(file_path, sample_rate, block_seconds):
+            raw_file.write(block.tobytes())
+            n_samples += len(block)
+            if len(block):
+                # int16の-32768をabsするとオーバーフローするためint32で計算
+                peak = max(peak, int(np.abs(block.astype(np.int32)).max()))
+    return n_samples, peak
+
+
+def pcm_peak(raw_path: str, n_samples: int, block_seconds: int = PCM_BLOCK_SECONDS) -> int:
+    """
+    ヘッダなしPCMファイルの絶対値の最大値をブロック単位で求める。
+
+    Args:
+        raw_path (str): PCMファイルのパス
+        n_samples (int): サンプル数
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Returns:
+        int: 絶対値の最大値
+    """
+    if n_samples == 0:
+        return 0
+    block_size = PCM_SAMPLE_RATE * block_seconds
+    pcm = np.memmap(raw_path, dtype=np.int16, mode='r', shape=(n_samples,))
+    peak = 0
+    for start in range(0, n_samples, block_size):
+        peak = max(peak, int(np.abs(pcm[start:start + block_size].astype(np.int32)).max()))
+    return peak
+
+
+def normalize_gain(peak: int, headroom_db: float = NORMALIZE_HEADROOM_DB) -> float:
+    """
+    ピーク値から正規化用のゲインを計算する（pydubのnormalize()相当）。
+
+    Args:
+        peak (int): 絶対値の最大値
+        headroom_db (float): ヘッドルーム（dB）
+
+    Returns:
+        float: ゲイン倍率
+    """
+    if peak <= 0:
+        return 1.0
+    target = INT16_MAX * (10 ** (-headroom_db / 20))
+    return target / peak
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    """
+    float32のサンプルをクリップしてint16に変換する。
+    """
+    return np.clip(np.rint(samples), -INT16_MAX - 1, INT16_MAX).astype(np.int16)
+
+
+def write_wav_blocks(
+    output_path: str,
+    blocks: Iterator[np.ndarray],
+    sample_rate: int = PCM_SAMPLE_RATE,
+) -> int:
+    """
+    int16のブロックを順にWAVファイルへ書き出す。
+
+    Args:
+        output_path (str): 出力先のWAVファイルパス
+        blocks (Iterator[np.ndarray]): int16のサンプル配列のイテレータ
+        sample_rate (int): サンプリングレート
+
+    Returns:
+        int: 書き出したサンプル数
+    """
+    n_samples = 0
+    with wave.open(output_path, 'wb') as wav_file:
+        wav_file.setnchannels(PCM_CHANNELS)
+        wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        for block in blocks:
+            wav_file.writeframes(block.tobytes())
+            n_samples += len(block)
+    return n_samples
+
+
+def iter_gain_blocks(
+    raw_path: str,
+    n_samples: int,
+    gain: float,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    block_seconds: int = PCM_BLOCK_SECONDS,
+) -> Iterator[np.ndarray]:
+    """
+    ヘッダなしPCMファイルをnp.memmapで開き、ゲインを掛けたfloat32のブロックを返す。
+
+    Args:
+        raw_path (str): PCMファイルのパス
+        n_samples (int): サンプル数
+        gain (float): ゲイン倍率
+        sample_rate (int): サンプリングレート
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Yields:
+        np.ndarray: float32のサンプル配列
+    """
+    if n_samples == 0:
+        return
+    block_size = sample_rate * block_seconds
+    pcm = np.memmap(raw_path, dtype=np.int16, mode='r', shape=(n_samples,))
+    try:
+        for start in range(0, n_samples, block_size):
+            block = pcm[start:start + block_size].astype(np.float32)
+            block *= gain
+            yield block
+    finally:
+        del pcm
+
+
+BlockPipeline = Callable[[str, int, float, int], Iterator[np.ndarray]]
+
+
+def decode_to_wav(
+    file_path: str,
+    output_path: str,
+    normalize: bool = True,
+    block_pipeline: Optional[BlockPipeline] = None,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    block_seconds: int = PCM_BLOCK_SECONDS,
+) -> float:
+    """
+    ffmpegのストリーミングデコードで16kHzモノラルのWAVを作成する。
+
+    1パス目でPCMを一時ファイルに書き出してピーク値を求め、
+    2パス目でnp.memmapからブロック単位に正規化・加工してWAVへ書き出す。
+    どちらのパスも1ブロック分しかメモリに載せない。
+
+    Args:
+        file_path (str): 入力ファイルのパス
+        output_path (str): 出力先のWAVファイルパス
+        normalize (bool): 正規化を行うかどうか
+        block_pipeline (BlockPipeline, optional): (PCMファイルのパス, サンプル数, ゲイン, サンプリングレート)を受け取り、
+            加工済みのfloat32ブロックを順に返す関数。省略時はゲインのみ適用する
+        sample_rate (int): 出力サンプリングレート
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Returns:
+        float: 再生時間（秒）
+    """
+    raw_path = output_path + '.pcm'
+    try:
+        n_samples, peak = decode_to_raw_pcm(file_path, raw_path, sample_rate, block_seconds)
+        processing_logger.info(f"PCMデコード完了: {file_path} ({n_samples} samples, peak={peak})")
+
+        blocks = render_pcm_blocks(raw_path, n_samples, peak if normalize else None, block_pipeline, sample_rate, block_seconds)
+        write_wav_blocks(output_path, blocks, sample_rate)
+        return n_samples / sample_rate
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+def render_pcm_blocks(
+    raw_path: str,
+    n_samples: int,
+    peak: Optional[int] = None,
+    block_pipeline: Optional[BlockPipeline] = None,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    block_seconds: int = PCM_BLOCK_SECONDS,
+) -> Iterator[np.ndarray]:
+    """
+    ヘッダなしPCMファイルを正規化・加工し、int16のブロックとして順に返す。
+
+    Args:
+        raw_path (str): PCMファイルのパス
+        n_samples (int): サンプル数
+        peak (int, optional): 正規化に使うピーク値（Noneの場合は正規化しない）
+        block_pipeline (BlockPipeline, optional): 加工済みのfloat32ブロックを返す関数。省略時はゲインのみ適用する
+        sample_rate (int): サンプリングレート
+        block_seconds (int): 1ブロックあたりの秒数
+
+    Yields:
+        np.ndarray: int16のサンプル配列
+    """
+    gain = normalize_gain(peak) if peak is not None else 1.0
+    if block_pipeline is None:
+        blocks = iter_gain_blocks(raw_path, n_samples, gain, sample_rate, block_seconds)
+    else:
+        blocks = block_pipeline(raw_path, n_samples, gain, sample_rate)
+    for block in blocks:
+        yield to_int16(block)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from django.conf import settings
+
+processing_logger = logging.getLogger('processing')
+
+# 分割ファイルごとの文字起こし結果の保存期間（秒）のデフォルト
+CHUNK_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# 期限切れの結果の削除（キャッシュ全体の走査）を行う間隔（秒）のデフォルト
+CHUNK_CACHE_EVICT_INTERVAL_SECONDS = 24 * 60 * 60
+
+# 最後に削除を行った日時を、このファイルの更新日時として記録する
+EVICTION_STAMP_FILE_NAME = '.last_eviction'
+
+
+def get_chunk_cache_root() -> str:
+    return getattr(settings, 'TRANSCRIPTION_CHUNK_CACHE_ROOT', os.path.join(settings.MEDIA_ROOT, 'transcription_chunks'))
+
+
+def get_chunk_cache_ttl() -> int:
+    """
+    保存した結果の有効期間（秒）。0以下の場合はキャッシュを使わない。
+    """
+    return getattr(settings, 'TRANSCRIPTION_CHUNK_CACHE_TTL', CHUNK_CACHE_TTL_SECONDS)
+
+
+def get_chunk_cache_evict_interval() -> int:
+    return getattr(settings, 'TRANSCRIPTION_CHUNK_CACHE_EVICT_INTERVAL', CHUNK_CACHE_EVICT_INTERVAL_SECONDS)
+
+
+def chunk_cache_key(content_hash: str, start_ms: int, end_ms: int, chunk_format: dict, model: str, language: str) -> str:
+    """
+    分割ファイルの結果のキー。
+    PCMのSHA-256と分割区間で分割ファイルの音声の内容が決まるため、エンコード後のファイルは読まずにキーを作る
+    （OGGはストリームのシリアル番号が毎回変わり、同じ音声でもファイルの内容が一致しない）。
+
+    Args:
+        content_hash (str): PCMアーティファクトのSHA-256
+        start_ms (int): 分割区間の開始（ミリ秒）
+        end_ms (int): 分割区間の終了（ミリ秒）
+        chunk_format (dict): CHUNK_FORMATSの要素
+        model (str): 文字起こしのモデル名
+        language (str): 言語
+
+    Returns:
+        str: キー（SHA-256の16進数）
+    """
+    fields = [content_hash, start_ms, end_ms, chunk_format['extension'], ' '.join(chunk_format['codec_options']), chunk_format['bitrate'], model, language]
+    return hashlib.sha256('|'.join(str(field) for field in fields).encode('utf-8')).hexdigest()
+
+
+def chunk_result_path(key: str) -> str:
+    return os.path.join(get_chunk_cache_root(), key[:2], f"{key}.json")
+
+
+def load_chunk_result(key: str) -> Optional[dict]:
+    """
+    保存済みの分割ファイルの文字起こし結果を読み込む。ない場合・有効期間を過ぎた場合はNoneを返す。
+    """
+    ttl = get_chunk_cache_ttl()
+    if ttl <= 0:
+        return None
+    path = chunk_result_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            os.remove(path)
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        processing_logger.warning(f"分割ファイルの文字起こし結果を読み込めませんでした: {path}, エラー: {e}")
+        return None
+
+
+def save_chunk_result(key: str, result: dict):
+    """
+    分割ファイルの文字起こし結果を保存する（リトライ・再処理時に成功済みの分割ファイルを送り直さないため）。
+    """
+    if get_chunk_cache_ttl() <= 0:
+        return
+    path = chunk_result_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def evict_expired_chunk_results() -> int:
+    """
+    有効期間を過ぎた結果を削除する。
+
+    Returns:
+        int: 削除したファイル数
+    """
+    root = get_chunk_cache_root()
+    if not os.path.isdir(root):
+        return 0
+    expires_before = time.time() - max(get_chunk_cache_ttl(), 0)
+    removed = 0
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if file_name == EVICTION_STAMP_FILE_NAME:
+                continue
+            path = os.path.join(dir_path, file_name)
+            try:
+                if os.path.getmtime(path) < expires_before:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    if removed:
+        processing_logger.info(f"有効期間を過ぎた分割ファイルの文字起こし結果を{removed}件削除しました")
+    return removed
+
+
+def evict_expired_chunk_results_if_due() -> int:
+    """
+    前回の削除から一定の間隔が過ぎている場合だけ、有効期間を過ぎた結果を削除する。
+    文字起こしのたびにキャッシュ全体を走査しないよう、最後に削除した日時をスタンプファイルで記録する。
+
+    Returns:
+        int: 削除したファイル数（間隔が過ぎていない場合は0）
+    """
+    root = get_chunk_cache_root()
+    stamp_path = os.path.join(root, EVICTION_STAMP_FILE_NAME)
+    try:
+        if time.time() - os.path.getmtime(stamp_path) < get_chunk_cache_evict_interval():
+            return 0
+    except FileNotFoundError:
+        pass
+
+    # 同時に実行された他のワーカーが続けて走査しないよう、先にスタンプを更新する
+    os.makedirs(root, exist_ok=True)
+    with open(stamp_path, 'a'):
+        os.utime(stamp_path, None)
+    return evict_expired_chunk_results()
@@ -0,0 +1,212 @@
+import logging
+import math
+import subprocess
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from .audio_stream import PCM_BLOCK_SECONDS, PCM_CHANNELS
+from .pcm_artifact import PcmArtifact
+from .silence_index import SilenceIndex
+
+processing_logger = logging.getLogger('processing')
+
+# OpenAI APIのアップロード上限（25MB）に対する安全マージン込みの上限
+OPENAI_MAX_UPLOAD_MB = 24.0
+
+# コンテナのオーバーヘッドやVBRの揺らぎを吸収するための係数
+CHUNK_SIZE_SAFETY = 0.9
+
+# 分割ファイルの形式（音声認識向けの低ビットレート設定）
+CHUNK_FORMATS = {
+    'ogg': {
+        'extension': '.ogg',
+        'muxer': 'ogg',
+        'bitrate': 24000,
+        'codec_options': ['-c:a', 'libopus', '-vbr', 'off', '-application', 'voip'],
+    },
+    'mp3': {
+        'extension': '.mp3',
+        'muxer': 'mp3',
+        'bitrate': 32000,
+        'codec_options': ['-c:a', 'libmp3lame'],
+    },
+}
+
+
+class ChunkManifestEntry(NamedTuple):
+    """
+    分割ファイル1つ分の情報。start_ms / end_msは元の音声上の正確な位置で、結合時のオフセットに使う。
+    """
+    path: str
+    start_ms: int
+    end_ms: int
+    byte_size: int
+
+
+def get_chunk_format() -> dict:
+    """
+    設定（OPENAI_CHUNK_FORMAT）に対応する分割ファイルの形式を取得する。
+    """
+    return CHUNK_FORMATS[getattr(settings, 'OPENAI_CHUNK_FORMAT', 'ogg')]
+
+
+def max_chunk_duration_ms(max_size_mb: float = OPENAI_MAX_UPLOAD_MB, bitrate: Optional[int] = None) -> int:
+    """
+    ビットレートから、上限サイズに収まる1チャンクの最大時間を計算する（試し書き出しは行わない）。
+
+    Args:
+        max_size_mb (float): 最大ファイルサイズ（MB）
+        bitrate (int, optional): ビットレート（bps）。省略時は設定の形式のビットレート
+
+    Returns:
+        int: 1チャンクの最大時間（ミリ秒）
+    """
+    bitrate = bitrate or get_chunk_format()['bitrate']
+    max_bits = max_size_mb * 1024 * 1024 * 8 * CHUNK_SIZE_SAFETY
+    return int(max_bits / bitrate * 1000)
+
+
+def plan_chunks(
+    total_duration_ms: int,
+    silence_index: Optional[SilenceIndex] = None,
+    max_size_mb: float = OPENAI_MAX_UPLOAD_MB,
+    bitrate: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """
+    再生時間とビットレートだけから分割区間を決める。
+
+    Args:
+        total_duration_ms (int): 再生時間（ミリ秒）
+        silence_index (SilenceIndex, optional): 無音区間のインデックス
+        max_size_mb (float): 最大ファイルサイズ（MB）
+        bitrate (int, optional): ビットレート（bps）
+
+    Returns:
+        List[Tuple[int, int]]: (開始, 終了)のリスト（ミリ秒）
+    """
+    return plan_split_ranges(total_duration_ms, max_chunk_duration_ms(max_size_mb, bitrate), silence_index)
+
+
+def plan_split_ranges(
+    total_duration_ms: int,
+    max_duration_ms: int,
+    silence_index: Optional[SilenceIndex] = None,
+) -> List[Tuple[int, int]]:
+    """
+    音声をmax_duration_ms以下の区間に分割する。
+    区間数を最小にしたうえで長さを均等にし、境界は目標位置に最も近い無音区間に合わせる。
+
+    Args:
+        total_duration_ms (int): 再生時間（ミリ秒）
+        max_duration_ms (int): 1区間の最大長（ミリ秒）
+        silence_index (SilenceIndex, optional): 無音区間のインデックス
+
+    Returns:
+        List[Tuple[int, int]]: (開始, 終了)のリスト（ミリ秒）
+    """
+    if total_duration_ms <= max_duration_ms:
+        return [(0, total_duration_ms)]
+
+    n_chunks = math.ceil(total_duration_ms / max_duration_ms)
+    target_duration_ms = math.ceil(total_duration_ms / n_chunks)
+
+    chunks = []
+    start_ms = 0
+    while total_duration_ms - start_ms > max_duration_ms:
+        ideal_end_ms = start_ms + target_duration_ms
+        end_ms = None
+        if silence_index is not None:
+            # 後半（最大長の半分以降）の無音区間から、目標位置に最も近いものを選ぶ
+            end_ms = silence_index.nearest_split_point(ideal_end_ms, start_ms + max_duration_ms // 2, start_ms + max_duration_ms)
+        chunks.append((start_ms, end_ms or ideal_end_ms))
+        start_ms = chunks[-1][1]
+    chunks.append((start_ms, total_duration_ms))
+    return chunks
+
+
+def encode_chunk(artifact: PcmArtifact, output_path: str, start_ms: int, end_ms: int, chunk_format: Optional[dict] = None) -> str:
+    """
+    PCMアーティファクトの指定区間を圧縮形式（Opus/OGGまたはMP3）で書き出す。
+    PCMはnp.memmapからブロック単位でffmpegの標準入力に流し込む。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+        output_path (str): 出力先のパス
+        start_ms (int): 開始時間（ミリ秒）
+        end_ms (int): 終了時間（ミリ秒）
+        chunk_format (dict, optional): CHUNK_FORMATSの要素。省略時は設定の形式
+
+    Returns:
+        str: 出力先のパス
+    """
+    chunk_format = chunk_format or get_chunk_format()
+    # PCMを標準入力から読み込むため -nostdin は付けない
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(artifact.sample_rate), '-ac', str(PCM_CHANNELS),
+        '-i', 'pipe:0',
+        *chunk_format['codec_options'],
+        '-b:a', str(chunk_format['bitrate']),
+        '-f', chunk_format['muxer'], '-y', output_path,
+    ]
+    pcm = artifact.memmap()
+    start = artifact.ms_to_sample(start_ms)
+    end = artifact.ms_to_sample(end_ms)
+    block_size = artifact.sample_rate * PCM_BLOCK_SECONDS
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for offset in range(start, end, block_size):
+            process.stdin.write(pcm[offset:min(offset + block_size, end)].tobytes())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    stderr = process.stderr.read().decode('utf-8', errors='replace')
+    process.stderr.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"分割ファイルのエンコードに失敗しました: {output_path}: {stderr.strip()}")
+    return output_path
+
+
+def export_chunks(
+    artifact: PcmArtifact,
+    output_dir: str,
+    chunks: List[Tuple[int, int]],
+    chunk_format: Optional[dict] = None,
+) -> List[ChunkManifestEntry]:
+    """
+    分割区間ごとにファイルを書き出し、マニフェストを返す。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+        output_dir (str): 出力先のディレクトリ
+        chunks (List[Tuple[int, int]]): plan_chunksが返す(開始, 終了)のリスト（ミリ秒）
+        chunk_format (dict, optional): CHUNK_FORMATSの要素。省略時は設定の形式
+
+    Returns:
+        List[ChunkManifestEntry]: 分割ファイルのマニフェスト（元の音声上の順）
+    """
+    chunk_format = chunk_format or get_chunk_format()
+    base_name = os.path.splitext(os.path.basename(artifact.path))[0]
+    manifest = []
+    try:
+        for chunk_index, (start_ms, end_ms) in enumerate(chunks):
+            chunk_path = os.path.join(output_dir, f"{base_name}_chunk_{chunk_index:03d}{chunk_format['extension']}")
+            encode_chunk(artifact, chunk_path, start_ms, end_ms, chunk_format)
+            manifest.append(ChunkManifestEntry(chunk_path, start_ms, end_ms, os.path.getsize(chunk_path)))
+    except Exception:
+        # 途中で失敗した場合は書き出し済みのファイルを残さない
+        remove_chunks(manifest)
+        raise
+    return manifest
+
+
+def remove_chunks(manifest: List[ChunkManifestEntry]):
+    """
+    マニフェストに含まれる分割ファイルを削除する。
+    """
+    for chunk in manifest:
+        if os.path.exists(chunk.path):
+            os.remove(chunk.path)
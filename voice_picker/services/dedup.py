@@ -0,0 +1,108 @@
+import hashlib
+import logging
+from typing import Optional
+
+from django.db import transaction
+
+processing_logger = logging.getLogger('processing')
+
+# 解析結果としてコピーするUploadedFileのフィールド
+CLONED_RESULT_FIELDS = ('summarization', 'issue', 'solution')
+
+
+def hash_uploaded_file(file) -> str:
+    """
+    アップロードされたファイルのSHA-256を、全体をメモリに載せずにチャンク単位で計算する。
+
+    Args:
+        file: Djangoのアップロードファイル（UploadedFile / File）
+
+    Returns:
+        str: SHA-256（16進数）
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    # 保存時に先頭から読み直せるように戻しておく
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def find_processed_duplicate(uploaded_file):
+    """
+    同じ組織にある、内容が同一で処理済みのファイルを探す。
+
+    Args:
+        uploaded_file (UploadedFile): 新しくアップロードされたファイル
+
+    Returns:
+        Optional[UploadedFile]: 処理済みの同一ファイル（ない場合はNone）
+    """
+    from ..models.uploaded_file import Status, UploadedFile
+
+    if not uploaded_file.content_hash:
+        return None
+    return (
+        UploadedFile.objects
+        .filter(
+            organization_id=uploaded_file.organization_id,
+            content_hash=uploaded_file.content_hash,
+            status=Status.COMPLETED,
+            exist=True,
+        )
+        .exclude(pk=uploaded_file.pk)
+        .order_by('-updated_at')
+        .first()
+    )
+
+
+def clone_processed_upload(source, target) -> int:
+    """
+    処理済みのファイルの文字起こしと解析結果（要約・課題点・取り組み案）を新しいファイルにコピーし、処理済みにする。
+
+    Args:
+        source (UploadedFile): コピー元の処理済みファイル
+        target (UploadedFile): コピー先のファイル
+
+    Returns:
+        int: コピーした文字起こしの件数
+    """
+    from ..models.transcription import Transcription
+    from ..models.uploaded_file import Status
+
+    with transaction.atomic():
+        transcriptions = [
+            Transcription(
+                uploaded_file=target,
+                start_time=transcription.start_time,
+                text=transcription.text,
+                speaker=transcription.speaker,
+            )
+            for transcription in Transcription.objects.filter(uploaded_file=source, exist=True).order_by('start_time')
+        ]
+        Transcription.objects.bulk_create(transcriptions)
+
+        for field in CLONED_RESULT_FIELDS:
+            setattr(target, field, getattr(source, field))
+        # ヘッダから取得済みの再生時間は、コピー元にない場合でも残す
+        if source.duration is not None:
+            target.duration = source.duration
+        target.status = Status.COMPLETED
+        target.save()
+
+    processing_logger.info(f"同一内容の処理済みファイルから結果をコピーしました: {source.id} -> {target.id}, 文字起こし{len(transcriptions)}件")
+    return len(transcriptions)
+
+
+def reuse_processed_duplicate(uploaded_file) -> Optional[object]:
+    """
+    処理済みの同一ファイルがあれば結果をコピーする。
+
+    Returns:
+        Optional[UploadedFile]: コピー元のファイル（同一ファイルがない場合はNone）
+    """
+    duplicate = find_processed_duplicate(uploaded_file)
+    if duplicate is None:
+        return None
+    clone_processed_upload(duplicate, uploaded_file)
+    return duplicate
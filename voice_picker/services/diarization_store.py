@@ -0,0 +1,75 @@
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+processing_logger = logging.getLogger('processing')
+
+# 話者分離の結果（開始秒, 終了秒, 話者ラベル）
+SpeakerTrack = Tuple[float, float, str]
+
+
+def get_diarization_cache_root() -> str:
+    return getattr(settings, 'DIARIZATION_CACHE_ROOT', os.path.join(settings.MEDIA_ROOT, 'diarization'))
+
+
+def rttm_path(content_hash: str, model_name: str) -> str:
+    """
+    話者分離結果の保存先。モデルが変わった場合に古い結果を使わないよう、モデル名ごとにディレクトリを分ける。
+    """
+    model_dir = re.sub(r'[^0-9A-Za-z.-]+', '_', model_name)
+    return os.path.join(get_diarization_cache_root(), model_dir, content_hash[:2], f"{content_hash}.rttm")
+
+
+def tracks_to_rttm(tracks: List[SpeakerTrack], uri: str = 'audio') -> str:
+    """
+    話者分離の結果をRTTM形式の文字列にする。
+    """
+    return ''.join(
+        f"SPEAKER {uri} 1 {start:.3f} {end - start:.3f} <NA> <NA> {speaker} <NA> <NA>\n"
+        for start, end, speaker in tracks
+    )
+
+
+def parse_rttm(text: str) -> List[SpeakerTrack]:
+    """
+    RTTM形式の文字列を(開始秒, 終了秒, 話者ラベル)のリスト（開始時刻順）にする。
+    """
+    tracks = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 8 or fields[0] != 'SPEAKER':
+            continue
+        start, duration = float(fields[3]), float(fields[4])
+        tracks.append((start, start + duration, fields[7]))
+    tracks.sort(key=lambda track: track[0])
+    return tracks
+
+
+def load_speaker_tracks(content_hash: str, model_name: str) -> Optional[List[SpeakerTrack]]:
+    """
+    保存済みの話者分離の結果を読み込む。ない場合はNoneを返す。
+    """
+    path = rttm_path(content_hash, model_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return parse_rttm(f.read())
+    except (OSError, ValueError) as e:
+        processing_logger.warning(f"話者分離の結果を読み込めませんでした: {path}, エラー: {e}")
+        return None
+
+
+def save_speaker_tracks(content_hash: str, model_name: str, tracks: List[SpeakerTrack]):
+    """
+    話者分離の結果をRTTM形式で保存する（再処理・リトライ時に話者分離を省略するため）。
+    """
+    path = rttm_path(content_hash, model_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(tracks_to_rttm(tracks, uri=content_hash))
+    os.replace(temp_path, path)
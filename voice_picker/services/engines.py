@@ -0,0 +1,208 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .inference import transcribe_artifact
+from .pcm_artifact import PcmArtifact
+from .vosk_stream import is_vosk_available, transcribe_vosk
+
+processing_logger = logging.getLogger('processing')
+
+PLAN_TIER_FREE = 'free'
+PLAN_TIER_PAID = 'paid'
+
+
+@dataclass(frozen=True)
+class EngineCapabilities:
+    """
+    文字起こしエンジンの性能・制約。ルーターはこの情報だけを見てエンジンを選ぶ。
+
+    Attributes:
+        diarization (bool): 話者分離を行うかどうか（パイプラインの話者分離ステージを実行する）
+        max_file_size_mb (float, optional): 1ファイルの上限（MB）。Noneの場合は制限なし（分割して処理する場合を含む）
+        max_duration_seconds (float, optional): 1ファイルの再生時間の上限（秒）。Noneの場合は制限なし
+        realtime_factor (float): 再生時間1秒あたりの処理時間（秒）の目安
+        cost_per_minute (float): 再生時間1分あたりの費用（USD）
+        local (bool): このホストのCPUで処理するかどうか（キューの混雑の影響を受ける）
+        tiers (tuple): 利用できるプラン（PLAN_TIER_FREE / PLAN_TIER_PAID）
+    """
+    diarization: bool
+    max_file_size_mb: Optional[float]
+    max_duration_seconds: Optional[float]
+    realtime_factor: float
+    cost_per_minute: float
+    local: bool
+    tiers: Tuple[str, ...] = (PLAN_TIER_FREE, PLAN_TIER_PAID)
+
+
+@dataclass(frozen=True)
+class TranscriptionEngine:
+    """
+    文字起こしエンジン。transcribeはPCMアーティファクトを受け取り、
+    {"text", "segments"}を返す（話者分離はパイプラインの話者分離ステージで行う）。
+    """
+    name: str
+    capabilities: EngineCapabilities
+    transcribe: Callable[[PcmArtifact], dict]
+    available: Optional[Callable[[], bool]] = None
+
+    def supports(self, tier: str, duration_seconds: float, file_size_mb: Optional[float] = None) -> bool:
+        capabilities = self.capabilities
+        if self.available is not None and not self.available():
+            return False
+        if tier not in capabilities.tiers:
+            return False
+        if capabilities.max_duration_seconds is not None and duration_seconds > capabilities.max_duration_seconds:
+            return False
+        if capabilities.max_file_size_mb is not None and file_size_mb is not None and file_size_mb > capabilities.max_file_size_mb:
+            return False
+        return True
+
+
+ENGINE_REGISTRY: Dict[str, TranscriptionEngine] = {}
+
+
+def register_engine(name: str, capabilities: EngineCapabilities, available: Optional[Callable[[], bool]] = None):
+    """
+    文字起こしエンジンを登録するデコレーター。
+
+    Args:
+        name (str): エンジン名（設定のTRANSCRIPTION_ENGINEで指定する名前）
+        capabilities (EngineCapabilities): エンジンの性能・制約
+        available (Callable, optional): エンジンが使えるか（モデルが配置されているか等）を返す関数
+    """
+    def decorator(transcribe: Callable[[PcmArtifact], dict]):
+        ENGINE_REGISTRY[name] = TranscriptionEngine(name, capabilities, transcribe, available)
+        return transcribe
+    return decorator
+
+
+def get_engine(name: str) -> TranscriptionEngine:
+    try:
+        return ENGINE_REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"不明な文字起こしエンジンです: {name}")
+
+
+@register_engine('local-whisper', EngineCapabilities(
+    diarization=True,
+    max_file_size_mb=None,
+    max_duration_seconds=None,
+    realtime_factor=1.0,
+    cost_per_minute=0.0,
+    local=True,
+    tiers=(PLAN_TIER_PAID,),
+))
+def transcribe_local_whisper(artifact: PcmArtifact) -> dict:
+    """
+    ローカルのWhisper（推論サーバー）で文字起こしする。話者分離はパイプラインの話者分離ステージで行う。
+    """
+    return transcribe_artifact(artifact, language='ja')
+
+
+@register_engine('openai-api', EngineCapabilities(
+    diarization=False,
+    max_file_size_mb=None,  # 25MB以下に分割して送信する
+    max_duration_seconds=None,
+    realtime_factor=0.1,
+    cost_per_minute=0.006,
+    local=False,
+))
+def transcribe_openai_api(artifact: PcmArtifact) -> dict:
+    """
+    OpenAIのAPI（whisper-1）で文字起こしする。
+    """
+    from voice_picker.views import transcribe_openai
+
+    return transcribe_openai(artifact)
+
+
+@register_engine('vosk', EngineCapabilities(
+    diarization=False,
+    max_file_size_mb=None,
+    max_duration_seconds=None,
+    realtime_factor=0.3,
+    cost_per_minute=0.0,
+    local=True,
+    tiers=(PLAN_TIER_FREE,),
+), available=is_vosk_available)
+def transcribe_vosk_stream(artifact: PcmArtifact) -> dict:
+    """
+    Vosk（KaldiRecognizer）にPCMを逐次流し込んで文字起こしする。無料プランをAPIを使わずにこのホストだけで処理する。
+    """
+    return transcribe_vosk(artifact)
+
+
+def get_plan_tier(organization) -> str:
+    return PLAN_TIER_FREE if organization.is_free_user() else PLAN_TIER_PAID
+
+
+def get_local_queue_depth() -> int:
+    """
+    ローカルのエンジンに振り分けられて処理中のファイル数（ローカルエンジンの混雑度の目安）。
+    APIのエンジンで処理中のファイル・エンジンを選ぶ前のファイルは数えない。
+    """
+    from voice_picker.models import UploadedFile
+    from voice_picker.models.uploaded_file import Status
+
+    local_engines = [name for name, engine in ENGINE_REGISTRY.items() if engine.capabilities.local]
+    return UploadedFile.objects.filter(status=Status.PROCESSING, engine__in=local_engines).count()
+
+
+def route_engine(
+    organization,
+    duration_seconds: float,
+    file_size_mb: Optional[float] = None,
+    queue_depth: Optional[int] = None,
+) -> TranscriptionEngine:
+    """
+    プラン・再生時間・キューの混雑度から、ジョブごとに文字起こしエンジンを選ぶ。
+
+    設定のTRANSCRIPTION_ENGINEが指定されている場合はそのエンジンを使う。
+    それ以外は、プランと長さの条件を満たすエンジンのうち、
+    話者分離できるもの → 費用が安いもの → 処理が速いもの の順に優先する。
+    ただし有料プランで、再生時間がTRANSCRIPTION_LOCAL_MAX_SECONDSを超える場合、
+    またはローカルのエンジンで処理中のファイル数がTRANSCRIPTION_LOCAL_QUEUE_LIMIT以上の場合は、
+    ローカルのエンジンを候補から外してAPIで処理する（CPUで長時間の録音を処理するとキューが詰まるため）。
+    無料プランはOpenAIのクォータを消費しないよう、長くても混雑していてもローカル（Vosk）で処理する。
+
+    Args:
+        organization (Organization): ファイルを所有する組織
+        duration_seconds (float): 再生時間（秒）
+        file_size_mb (float, optional): ファイルサイズ（MB）
+        queue_depth (int, optional): ローカルのキューの長さ。省略時はローカルのエンジンで処理中のファイル数
+
+    Returns:
+        TranscriptionEngine: 選ばれたエンジン
+    """
+    forced = getattr(settings, 'TRANSCRIPTION_ENGINE', '')
+    if forced:
+        return get_engine(forced)
+
+    tier = get_plan_tier(organization)
+    candidates = [engine for engine in ENGINE_REGISTRY.values() if engine.supports(tier, duration_seconds, file_size_mb)]
+    if not candidates:
+        raise ValueError(f"条件を満たす文字起こしエンジンがありません: tier={tier}, duration={duration_seconds:.0f}秒")
+
+    if tier == PLAN_TIER_PAID:
+        remote = [engine for engine in candidates if not engine.capabilities.local]
+        local_max_seconds = getattr(settings, 'TRANSCRIPTION_LOCAL_MAX_SECONDS', 3600)
+        if remote and local_max_seconds and duration_seconds > local_max_seconds:
+            processing_logger.info(f"再生時間が長いため（{duration_seconds:.0f}秒）、APIのエンジンに振り分けます")
+            candidates = remote
+        elif remote:
+            if queue_depth is None:
+                queue_depth = get_local_queue_depth()
+            if queue_depth >= getattr(settings, 'TRANSCRIPTION_LOCAL_QUEUE_LIMIT', 2):
+                processing_logger.info(f"ローカルのキューが混雑しているため（{queue_depth}件）、APIのエンジンに振り分けます")
+                candidates = remote
+
+    def priority(engine: TranscriptionEngine):
+        capabilities = engine.capabilities
+        return (not capabilities.diarization, capabilities.cost_per_minute, capabilities.realtime_factor)
+
+    engine = min(candidates, key=priority)
+    processing_logger.info(f"文字起こしエンジン: {engine.name} (tier={tier}, duration={duration_seconds:.0f}秒, queue={queue_depth})")
+    return engine
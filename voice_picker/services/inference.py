@@ -0,0 +1,313 @@
+import logging
+import os
+import threading
+from functools import lru_cache
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .audio_stream import PCM_SAMPLE_RATE
+from .diarization_store import SpeakerTrack, load_speaker_tracks, save_speaker_tracks
+from .pcm_artifact import PcmArtifact
+
+processing_logger = logging.getLogger('processing')
+
+WHISPER_MODEL_NAME = 'small'
+
+# ローカルWhisperの実行エンジン（設定: WHISPER_BACKEND）
+WHISPER_BACKEND_OPENAI = 'openai-whisper'  # PyTorch（FP32）
+WHISPER_BACKEND_CTRANSLATE2 = 'faster-whisper'  # CTranslate2（int8量子化）
+
+DIARIZATION_MODEL_NAME = 'pyannote/speaker-diarization-3.1'
+
+
+class InferenceError(Exception):
+    """推論サーバーでの処理に失敗した場合の例外"""
+
+
+def _authkey() -> bytes:
+    return settings.SECRET_KEY.encode('utf-8')
+
+
+@lru_cache(maxsize=1)
+def get_whisper_model():
+    """
+    オープンソースWhisperモデルをロードする（推論サーバー、またはサーバーがない場合のみ呼び出し元のプロセスで使う）。
+    """
+    import torch
+    import whisper
+
+    # GPUを使用する場合
+    # device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # CPUを使用するように設定
+    device = torch.device("cpu")
+    return whisper.load_model(WHISPER_MODEL_NAME).to(device)
+
+
+def get_whisper_backend() -> str:
+    return getattr(settings, 'WHISPER_BACKEND', WHISPER_BACKEND_OPENAI)
+
+
+@lru_cache(maxsize=1)
+def get_ctranslate2_whisper_model(cpu_threads: Optional[int] = None):
+    """
+    CTranslate2（faster-whisper）形式のWhisperモデルをロードする。
+    CPUではint8量子化により、PyTorchのFP32推論より高速かつ省メモリで動作する。
+
+    Args:
+        cpu_threads (int, optional): スレッド数。省略時は設定値（WHISPER_CPU_THREADS）
+    """
+    from faster_whisper import WhisperModel
+
+    if cpu_threads is None:
+        cpu_threads = getattr(settings, 'WHISPER_CPU_THREADS', 0)
+    return WhisperModel(
+        WHISPER_MODEL_NAME,
+        device='cpu',
+        compute_type=getattr(settings, 'WHISPER_COMPUTE_TYPE', 'int8'),
+        cpu_threads=cpu_threads,
+    )
+
+
+def load_whisper_model(cpu_threads: Optional[int] = None):
+    """設定のエンジンのWhisperモデルを読み込む（推論サーバー・シャードのワーカーの起動時）"""
+    if get_whisper_backend() == WHISPER_BACKEND_CTRANSLATE2:
+        return get_ctranslate2_whisper_model(cpu_threads)
+    return get_whisper_model()
+
+
+def transcribe_samples(samples, language: str = 'ja', cpu_threads: Optional[int] = None) -> dict:
+    """
+    float32のサンプル配列を設定のエンジンで文字起こしする。
+    どのエンジンでも{"text", "segments"}（各segmentはstart・end・text）の形式で返す。
+
+    Args:
+        samples (np.ndarray): 16kHzモノラルのfloat32のサンプル配列
+        language (str): 言語
+        cpu_threads (int, optional): faster-whisperのスレッド数。省略時は設定値（WHISPER_CPU_THREADS）
+
+    Returns:
+        dict: 文字起こし結果
+    """
+    if get_whisper_backend() == WHISPER_BACKEND_CTRANSLATE2:
+        # faster-whisperのsegmentsは遅延評価のジェネレーターのため、ここで最後まで推論する
+        segments, _ = get_ctranslate2_whisper_model(cpu_threads).transcribe(samples, language=language)
+        segments = [
+            {'start': float(segment.start), 'end': float(segment.end), 'text': segment.text}
+            for segment in segments
+        ]
+        return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
+
+    result = get_whisper_model().transcribe(samples, language=language)
+    # 呼び出し元がtorch・whisperを読み込まなくて済むよう、素のdict・listだけを返す
+    return {
+        'text': result['text'],
+        'segments': [
+            {'start': float(segment['start']), 'end': float(segment['end']), 'text': segment['text']}
+            for segment in result['segments']
+        ],
+    }
+
+
+@lru_cache(maxsize=1)
+def get_diarization_model():
+    """
+    pyannoteの話者分離パイプラインをロードする。
+    """
+    from pyannote.audio import Pipeline
+
+    return Pipeline.from_pretrained(DIARIZATION_MODEL_NAME, use_auth_token=os.getenv('PYANNOTE_AUTH_TOKEN'))
+
+
+def run_transcribe(pcm_path: str, language: str = 'ja') -> dict:
+    """
+    PCMアーティファクト全体をWhisperで文字起こしする（モデルを持つプロセス側の処理）。
+    推論サーバーでは、長い録音を無音区間でシャードに分割し、サーバーが保持するワーカープールで並列に処理する。
+    """
+    from .sharded_whisper import should_shard, transcribe_sharded
+
+    artifact = PcmArtifact(pcm_path)
+    if should_shard(artifact):
+        return transcribe_sharded(artifact, language)
+    return transcribe_samples(artifact.float32(), language)
+
+
+def diarize_waveform(samples: np.ndarray, sample_rate: int = PCM_SAMPLE_RATE) -> List[SpeakerTrack]:
+    """
+    メモリ上の波形（float32のモノラル）をキャッシュ済みのpyannoteパイプラインで話者分離する。
+
+    Args:
+        samples (np.ndarray): [-1, 1]のfloat32のサンプル配列
+        sample_rate (int): サンプリングレート
+
+    Returns:
+        List[SpeakerTrack]: (開始秒, 終了秒, 話者ラベル)のリスト（開始時刻順）
+    """
+    import torch
+
+    waveform = torch.from_numpy(np.ascontiguousarray(samples, dtype=np.float32)).unsqueeze(0)
+    diarization = get_diarization_model()({"waveform": waveform, "sample_rate": sample_rate})
+    return [
+        (float(segment.start), float(segment.end), speaker)
+        for segment, _, speaker in diarization.itertracks(yield_label=True)
+    ]
+
+
+def run_diarize(pcm_path: str) -> List[SpeakerTrack]:
+    """
+    PCMアーティファクト全体をpyannoteで話者分離する（モデルを持つプロセス側の処理）。
+    """
+    artifact = PcmArtifact(pcm_path)
+    return diarize_waveform(artifact.float32(), artifact.sample_rate)
+
+
+INFERENCE_HANDLERS = {
+    'transcribe': run_transcribe,
+    'diarize': run_diarize,
+}
+
+
+class InferenceServer:
+    """
+    WhisperとpyannoteのモデルをホストごとにUnixソケット越しで共有する推論サーバー。
+
+    Celeryの各ワーカープロセスやWebプロセスがそれぞれモデルを読み込むと、その数だけメモリを消費する。
+    モデルはこのプロセスだけが保持し、他のプロセスはPCMアーティファクトのパスを送って結果を受け取る。
+    推論は同時に1件ずつ行う（CPU推論を並行させても速くならず、メモリが増えるだけのため）。
+    長時間モードが有効な場合は、シャードのワーカープールも起動時に作成し、サーバーが終了するまで保持する。
+    """
+
+    def __init__(self, socket_path: str, preload: bool = True):
+        self.socket_path = socket_path
+        self.preload = preload
+        self.inference_lock = threading.Lock()
+        self.shard_pool = None
+
+    def handle(self, conn):
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+                operation = request.get('op')
+                if operation == 'ping':
+                    conn.send({'ok': True, 'result': 'pong'})
+                    continue
+                handler = INFERENCE_HANDLERS.get(operation)
+                if handler is None:
+                    conn.send({'ok': False, 'error': f"不明な処理です: {operation}"})
+                    continue
+                try:
+                    with self.inference_lock:
+                        result = handler(**request['kwargs'])
+                    conn.send({'ok': True, 'result': result})
+                except Exception as e:
+                    processing_logger.error(f"推論サーバーでエラーが発生しました: {operation}, エラー: {e}")
+                    conn.send({'ok': False, 'error': str(e)})
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        from .sharded_whisper import start_shard_pool
+
+        if self.preload:
+            load_whisper_model()
+            get_diarization_model()
+            processing_logger.info("推論サーバー: モデルを読み込みました")
+        self.shard_pool = start_shard_pool(warm_up=self.preload)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+
+        try:
+            with Listener(self.socket_path, family='AF_UNIX', authkey=_authkey()) as listener:
+                processing_logger.info(f"推論サーバーを起動しました: {self.socket_path}")
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except Exception as e:
+                        # 認証に失敗した接続などはサーバーを止めずに破棄する
+                        processing_logger.warning(f"推論サーバーへの接続を受け付けられませんでした: {e}")
+                        continue
+                    threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            if self.shard_pool is not None:
+                self.shard_pool.shutdown()
+
+
+def get_inference_socket_path() -> str:
+    return getattr(settings, 'INFERENCE_SOCKET_PATH', '')
+
+
+def _call_server(operation: str, **kwargs):
+    """
+    推論サーバーに処理を依頼する。サーバーが起動していない場合はNoneを返す。
+    """
+    socket_path = get_inference_socket_path()
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    try:
+        conn = Client(socket_path, family='AF_UNIX', authkey=_authkey())
+    except OSError as e:
+        processing_logger.warning(f"推論サーバーに接続できませんでした: {socket_path}, エラー: {e}")
+        return None
+
+    with conn:
+        conn.send({'op': operation, 'kwargs': kwargs})
+        response = conn.recv()
+    if not response['ok']:
+        raise InferenceError(response['error'])
+    return response
+
+
+def transcribe_artifact(artifact: PcmArtifact, language: str = 'ja') -> dict:
+    """
+    PCMアーティファクト全体をWhisperで文字起こしする。
+    推論サーバーが起動していればそちらに依頼し、なければこのプロセスでモデルを読み込む。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+        language (str): 言語
+
+    Returns:
+        dict: 文字起こし結果（text・segments）
+    """
+    response = _call_server('transcribe', pcm_path=artifact.path, language=language)
+    if response is not None:
+        return response['result']
+    processing_logger.warning("推論サーバーが起動していないため、このプロセスでWhisperモデルを読み込みます")
+    return run_transcribe(artifact.path, language)
+
+
+def diarize_artifact(artifact: PcmArtifact) -> List[SpeakerTrack]:
+    """
+    PCMアーティファクト全体をpyannoteで話者分離する。
+    結果は音声のSHA-256をキーにRTTM形式で保存し、同じ音声では話者分離を省略する。
+    推論サーバーが起動していればそちらに依頼し、なければこのプロセスでモデルを読み込む。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+
+    Returns:
+        List[SpeakerTrack]: (開始秒, 終了秒, 話者ラベル)のリスト（開始時刻順）
+    """
+    # 同じ音声の話者分離の結果が保存されていれば、モデルを使わずに返す（リトライ・再処理時）
+    content_hash = artifact.content_hash()
+    tracks = load_speaker_tracks(content_hash, DIARIZATION_MODEL_NAME)
+    if tracks is not None:
+        processing_logger.info(f"保存済みの話者分離の結果を使用します: {content_hash}")
+        return tracks
+
+    response = _call_server('diarize', pcm_path=artifact.path)
+    if response is not None:
+        tracks = [tuple(track) for track in response['result']]
+    else:
+        processing_logger.warning("推論サーバーが起動していないため、このプロセスで話者分離モデルを読み込みます")
+        tracks = run_diarize(artifact.path)
+
+    save_speaker_tracks(content_hash, DIARIZATION_MODEL_NAME, tracks)
+    return tracks
@@ -0,0 +1,132 @@
+import logging
+import os
+import subprocess
+from typing import Optional
+
+from .audio_stream import PCM_CHANNELS, PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH, decode_to_raw_pcm, pcm_peak
+from .pcm_artifact import PcmArtifact, finalize_pcm_artifact
+
+processing_logger = logging.getLogger('processing')
+
+INGEST_TIMEOUT_SECONDS = 1800
+
+# 再生用ファイルのシーク精度を上げるための再多重化オプション（元のファイル形式・コーデックは変更しない）
+PLAYBACK_REMUX_OPTIONS = {
+    '.mp3': ['-write_xing', '1'],
+    '.m4a': ['-movflags', 'faststart'],
+    '.mp4': ['-movflags', 'faststart'],
+    '.wav': [],
+    '.ogg': [],
+    '.avi': [],
+    '.mov': ['-movflags', 'faststart'],
+    '.wmv': [],
+}
+
+
+def ingest_command(source_path: str, playback_path: str, decoded_path: str) -> list:
+    """
+    1回の読み込みで「再生用ファイルの再多重化」と「16kHzモノラルPCMの抽出」を行うffmpegコマンドを組み立てる。
+
+    Args:
+        source_path (str): アップロードされたファイルのパス
+        playback_path (str): 再多重化した再生用ファイルの出力先
+        decoded_path (str): ヘッダなしPCM(s16le)の出力先
+
+    Returns:
+        list: ffmpegコマンド
+    """
+    file_extension = os.path.splitext(source_path)[1].lower()
+    return [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', source_path,
+        # 出力1: 再生用ファイル（ストリームコピー）
+        '-map', '0', '-c', 'copy', *PLAYBACK_REMUX_OPTIONS[file_extension],
+        '-f', _muxer_for(file_extension), '-y', playback_path,
+        # 出力2: 処理用のPCM
+        '-map', '0:a:0', '-vn',
+        '-ac', str(PCM_CHANNELS), '-ar', str(PCM_SAMPLE_RATE),
+        '-acodec', 'pcm_s16le', '-f', 's16le', '-y', decoded_path,
+    ]
+
+
+def _muxer_for(file_extension: str) -> str:
+    """
+    一時ファイル名から出力形式を推測できないため、拡張子に対応するffmpegのmuxer名を返す。
+    """
+    return {
+        '.mp3': 'mp3',
+        '.m4a': 'ipod',
+        '.mp4': 'mp4',
+        '.wav': 'wav',
+        '.ogg': 'ogg',
+        '.avi': 'avi',
+        '.mov': 'mov',
+        '.wmv': 'asf',
+    }[file_extension]
+
+
+def ingest_upload(uploaded_file, source_path: Optional[str] = None, denoise: bool = True) -> PcmArtifact:
+    """
+    アップロードされたファイルを1回だけ読み込み、以下をまとめて作成する。
+
+    - faststart / xingインデックス付きの再生用ファイル（元ファイルを置き換える）
+    - 処理用の16kHzモノラルPCMアーティファクト
+    - PCMのサンプル数から求めた正確な再生時間（UploadedFile.durationに保存）
+
+    再多重化に失敗した場合は、再生用ファイルはそのままにしてPCMの抽出のみ行う。
+
+    Args:
+        uploaded_file (UploadedFile): UploadedFileのインスタンス
+        source_path (str, optional): 元ファイルのパス（省略時はuploaded_file.file.path）
+        denoise (bool): ノイズ除去を行うかどうか
+
+    Returns:
+        PcmArtifact: 作成したアーティファクト
+    """
+    source_path = source_path or uploaded_file.file.path
+    artifact_path = uploaded_file.pcm_path
+    os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+
+    file_extension = os.path.splitext(source_path)[1].lower()
+    playback_path = source_path + '.tmp'
+    decoded_path = artifact_path + '.decode'
+
+    try:
+        remuxed = False
+        if file_extension in PLAYBACK_REMUX_OPTIONS:
+            result = subprocess.run(
+                ingest_command(source_path, playback_path, decoded_path),
+                capture_output=True,
+                text=True,
+                timeout=INGEST_TIMEOUT_SECONDS,
+            )
+            if result.returncode == 0:
+                os.replace(playback_path, source_path)
+                remuxed = True
+                processing_logger.info(f"Audio index improved for: {source_path}")
+            else:
+                processing_logger.error(f"ffmpeg failed for {source_path}: {result.stderr}")
+        else:
+            processing_logger.warning(f"Unsupported format for index improvement: {file_extension}")
+
+        if remuxed:
+            n_samples = os.path.getsize(decoded_path) // PCM_SAMPLE_WIDTH
+            # ピークはデコード済みPCMから求める（アップロードされたファイルは再読み込みしない）
+            peak = pcm_peak(decoded_path, n_samples)
+        else:
+            n_samples, peak = decode_to_raw_pcm(source_path, decoded_path)
+
+        artifact = finalize_pcm_artifact(decoded_path, artifact_path, n_samples, peak, denoise)
+    finally:
+        for path in (playback_path, decoded_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # 再生時間はPCMのサンプル数から求めた正確な値で更新する
+    duration = artifact.duration
+    # 利用時間の台帳も更新されるよう、シグナルが発火する保存を使う（他のフィールドは上書きしない）
+    uploaded_file.duration = duration
+    uploaded_file.save(update_fields=['duration'])
+    processing_logger.info(f"取り込み処理が完了しました: {source_path} ({duration:.1f}秒)")
+
+    return artifact
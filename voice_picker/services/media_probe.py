@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import struct
+import subprocess
+from typing import Optional
+
+processing_logger = logging.getLogger('processing')
+
+FFPROBE_TIMEOUT_SECONDS = 10
+
+MP4_EXTENSIONS = ('.mp4', '.m4a', '.mov')
+
+# MPEG Audio Layer IIIのビットレート（kbps）とサンプリングレート（Hz）
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],  # MPEG1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],      # MPEG2 / MPEG2.5
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG1
+    2: [22050, 24000, 16000],  # MPEG2
+    0: [11025, 12000, 8000],   # MPEG2.5
+}
+
+
+def probe_duration(file_path: str) -> Optional[float]:
+    """
+    コンテナのメタデータから再生時間を取得する（音声のデコードは行わない）。
+    ffprobeを優先し、使えない場合はWAV/MP3/MP4のヘッダを直接解析する。
+
+    Args:
+        file_path (str): 音声・動画ファイルのパス
+
+    Returns:
+        Optional[float]: 再生時間（秒）、メタデータから取得できない場合はNone
+    """
+    duration = probe_duration_ffprobe(file_path)
+    if duration is not None:
+        return duration
+
+    file_extension = os.path.splitext(file_path)[1].lower()
+    try:
+        if file_extension == '.wav':
+            return parse_wav_duration(file_path)
+        if file_extension == '.mp3':
+            return parse_mp3_duration(file_path)
+        if file_extension in MP4_EXTENSIONS:
+            return parse_mp4_duration(file_path)
+    except (OSError, struct.error, ValueError) as e:
+        processing_logger.warning(f"ヘッダから再生時間を取得できませんでした: {file_path}, エラー: {e}")
+    return None
+
+
+def probe_duration_ffprobe(file_path: str) -> Optional[float]:
+    """
+    ffprobeのJSON出力から再生時間を取得する。
+
+    Args:
+        file_path (str): 音声・動画ファイルのパス
+
+    Returns:
+        Optional[float]: 再生時間（秒）、取得できない場合はNone
+    """
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        file_path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=FFPROBE_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        processing_logger.warning(f"ffprobeの実行に失敗しました: {file_path}, エラー: {e}")
+        return None
+
+    if result.returncode != 0:
+        processing_logger.warning(f"ffprobe failed for {file_path}: {result.stderr.strip()}")
+        return None
+
+    try:
+        info = json.loads(result.stdout)
+    except ValueError:
+        return None
+
+    candidates = [info.get('format', {}).get('duration')]
+    candidates += [stream.get('duration') for stream in info.get('streams', []) if stream.get('codec_type') == 'audio']
+    for candidate in candidates:
+        try:
+            duration = float(candidate)
+        except (TypeError, ValueError):
+            continue
+        if duration > 0:
+            return duration
+    return None
+
+
+def parse_wav_duration(file_path: str) -> Optional[float]:
+    """
+    RIFF/WAVEのfmtチャンクとdataチャンクから再生時間を計算する。
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12:
+            return None
+        riff, _, wave_id = struct.unpack('<4sI4s', header)
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            return None
+
+        byte_rate = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 12:
+                    return None
+                byte_rate = struct.unpack('<I', fmt[8:12])[0]
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                # ストリーミング書き込みでサイズが未確定の場合はファイル末尾までをデータとみなす
+                if chunk_size in (0, 0xFFFFFFFF):
+                    chunk_size = file_size - f.tell()
+                chunk_size = min(chunk_size, file_size - f.tell())
+                return chunk_size / byte_rate
+            else:
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def _iter_mp4_boxes(f, end: int):
+    """
+    MP4のボックスを(種類, データ開始位置, 終了位置)で順に返す（データは読み込まない）。
+    """
+    while f.tell() + 8 <= end:
+        box_start = f.tell()
+        size, box_type = struct.unpack('>I4s', f.read(8))
+        header_size = 8
+        if size == 1:
+            large_size = f.read(8)
+            if len(large_size) < 8:
+                return
+            size = struct.unpack('>Q', large_size)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - box_start
+        if size < header_size:
+            return
+        yield box_type, box_start + header_size, box_start + size
+        f.seek(box_start + size)
+
+
+def parse_mp4_duration(file_path: str) -> Optional[float]:
+    """
+    MP4/M4A/MOVのmoov/mvhdボックスから再生時間を取得する。
+    moovがファイル末尾にある場合も、ボックスのヘッダだけを辿って読み飛ばす。
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        for box_type, data_start, box_end in _iter_mp4_boxes(f, file_size):
+            if box_type != b'moov':
+                continue
+            f.seek(data_start)
+            for child_type, child_start, _ in _iter_mp4_boxes(f, box_end):
+                if child_type != b'mvhd':
+                    continue
+                f.seek(child_start)
+                version_flags = f.read(4)
+                if not version_flags:
+                    return None
+                fields_format = '>QQIQ' if version_flags[0] == 1 else '>IIII'
+                fields = f.read(struct.calcsize(fields_format))
+                if len(fields) < struct.calcsize(fields_format):
+                    return None
+                _, _, timescale, duration = struct.unpack(fields_format, fields)
+                if not timescale:
+                    return None
+                return duration / timescale
+            return None
+    return None
+
+
+def _skip_id3v2(f) -> int:
+    """
+    ID3v2タグを読み飛ばし、音声フレームの開始位置を返す。
+    """
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        # サイズはsyncsafe integer（各バイト7bit）
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        footer = 10 if header[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def parse_mp3_duration(file_path: str) -> Optional[float]:
+    """
+    MP3の先頭フレームのヘッダから再生時間を計算する。
+    Xing/Info/VBRIヘッダがあればフレーム数から、なければCBRとしてビットレートから求める。
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        audio_start = _skip_id3v2(f)
+        f.seek(audio_start)
+        data = f.read(4096)
+        # 末尾のID3v1タグ（128バイト）は音声データに含めない
+        if file_size >= 128:
+            f.seek(file_size - 128)
+            if f.read(3) == b'TAG':
+                file_size -= 128
+
+    # 先頭のフレーム同期ワードを探す
+    for offset in range(len(data) - 4):
+        if data[offset] == 0xFF and (data[offset + 1] & 0xE0) == 0xE0:
+            header = struct.unpack('>I', data[offset:offset + 4])[0]
+            version_bits = (header >> 19) & 0x3
+            layer_bits = (header >> 17) & 0x3
+            bitrate_index = (header >> 12) & 0xF
+            sample_rate_index = (header >> 10) & 0x3
+            channel_mode = (header >> 6) & 0x3
+            if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+                # Layer III以外、または不正なヘッダ
+                continue
+            break
+    else:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    bitrate = MP3_BITRATES[1 if is_mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    samples_per_frame = 1152 if is_mpeg1 else 576
+
+    # Xing/Infoヘッダの位置はバージョンとチャンネル構成で決まる
+    is_mono = channel_mode == 3
+    side_info = (17 if is_mono else 32) if is_mpeg1 else (9 if is_mono else 17)
+    xing_offset = offset + 4 + side_info
+    tag = data[xing_offset:xing_offset + 4]
+    if tag in (b'Xing', b'Info'):
+        # ヘッダが途中で切れている場合はフレーム数が分からないためNone
+        if len(data) < xing_offset + 8:
+            return None
+        flags = struct.unpack('>I', data[xing_offset + 4:xing_offset + 8])[0]
+        if flags & 0x1:
+            if len(data) < xing_offset + 12:
+                return None
+            frames = struct.unpack('>I', data[xing_offset + 8:xing_offset + 12])[0]
+            return frames * samples_per_frame / sample_rate
+
+    vbri_offset = offset + 4 + 32
+    if data[vbri_offset:vbri_offset + 4] == b'VBRI':
+        if len(data) < vbri_offset + 18:
+            return None
+        frames = struct.unpack('>I', data[vbri_offset + 14:vbri_offset + 18])[0]
+        return frames * samples_per_frame / sample_rate
+
+    audio_bytes = file_size - audio_start - offset
+    return audio_bytes * 8 / bitrate
@@ -0,0 +1,232 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .audio_stream import PCM_SAMPLE_RATE
+
+processing_logger = logging.getLogger('processing')
+
+# ノイズ除去の窓の長さと、隣接する窓とのクロスフェード区間（秒）
+DENOISE_WINDOW_SECONDS = 60
+DENOISE_OVERLAP_SECONDS = 2
+
+# すべてのファイルサイズで共通のスペクトルゲーティング設定
+NOISE_REDUCTION_PARAMS = {
+    'prop_decrease': 0.5,
+    'time_constant_s': 4,
+    'freq_mask_smooth_hz': 500,
+    'time_mask_smooth_ms': 50,
+    'thresh_n_mult_nonstationary': 1.5,
+    'sigmoid_slope_nonstationary': 15,
+    'n_std_thresh_stationary': 1.5,
+    'clip_noise_stationary': True,
+    'use_tqdm': False,
+    'n_jobs': 1,
+    'use_torch': False,  # torchを使用しない
+    'device': 'cpu',     # CPUのみ使用
+}
+
+
+def get_audio_processing_workers() -> int:
+    """
+    音声処理のプロセスプールのワーカー数を取得する（0以下の場合はCPUコア数）。
+    """
+    workers = getattr(settings, 'AUDIO_PROCESSING_WORKERS', 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def reduce_noise_samples(samples: np.ndarray, sample_rate: int = PCM_SAMPLE_RATE) -> np.ndarray:
+    """
+    サンプル配列にノイズ除去を適用する。
+
+    Args:
+        samples (np.ndarray): float32のサンプル配列
+        sample_rate (int): サンプリングレート
+
+    Returns:
+        np.ndarray: ノイズ除去後のfloat32のサンプル配列
+    """
+    # noisereduceはscipy等を読み込むため、ノイズ除去を行うプロセスでのみ読み込む
+    import noisereduce as nr
+
+    return nr.reduce_noise(y=samples, sr=sample_rate, **NOISE_REDUCTION_PARAMS).astype(np.float32)
+
+
+def plan_denoise_windows(
+    n_samples: int,
+    window_size: int,
+    overlap_size: int,
+) -> List[Tuple[int, int]]:
+    """
+    信号を重なりのある窓に分割する。
+    最後以外の窓は次の窓とちょうどoverlap_sizeだけ重なる。
+
+    Args:
+        n_samples (int): サンプル数
+        window_size (int): 窓の長さ（サンプル数）
+        overlap_size (int): 重なりの長さ（サンプル数）
+
+    Returns:
+        List[Tuple[int, int]]: (開始サンプル, 終了サンプル)のリスト
+    """
+    if n_samples <= 0:
+        return []
+    if overlap_size >= window_size:
+        raise ValueError("overlap_sizeはwindow_sizeより小さくする必要があります")
+
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_size, n_samples)
+        windows.append((start, end))
+        if end >= n_samples:
+            break
+        start = end - overlap_size
+    return windows
+
+
+def _denoise_window(raw_path: str, n_samples: int, start: int, end: int, gain: float, sample_rate: int) -> np.ndarray:
+    """
+    PCMファイルの指定区間を読み込み、ノイズ除去した結果を返す（ワーカープロセスで実行）。
+    配列をプロセス間で受け渡さないよう、各ワーカーがnp.memmapで必要な区間だけを読む。
+    """
+    pcm = np.memmap(raw_path, dtype=np.int16, mode='r', shape=(n_samples,))
+    try:
+        window = pcm[start:end].astype(np.float32)
+    finally:
+        del pcm
+    window *= gain
+    return reduce_noise_samples(window, sample_rate)
+
+
+def _overlap_add(
+    denoised_windows: Iterator[np.ndarray],
+    windows: List[Tuple[int, int]],
+    overlap_size: int,
+) -> Iterator[np.ndarray]:
+    """
+    ノイズ除去済みの窓を順に受け取り、重なり区間を線形クロスフェードしながら出力する。
+    保持するのは直前の窓の末尾（overlap_size分）のみ。
+    """
+    fade_in = np.linspace(0.0, 1.0, overlap_size, endpoint=False, dtype=np.float32) if overlap_size else None
+    tail = None
+    last_index = len(windows) - 1
+
+    for index, denoised in enumerate(denoised_windows):
+        body_start = 0
+        if tail is not None:
+            head = denoised[:overlap_size]
+            yield tail * (1.0 - fade_in) + head * fade_in
+            body_start = overlap_size
+
+        if index == last_index or not overlap_size:
+            yield denoised[body_start:]
+            tail = None
+        else:
+            yield denoised[body_start:len(denoised) - overlap_size]
+            tail = denoised[len(denoised) - overlap_size:].copy()
+
+
+class _BilliardFuture:
+    """billiardのAsyncResultを、concurrent.futuresと同じく.result()で受け取れるようにする"""
+
+    def __init__(self, async_result):
+        self.async_result = async_result
+
+    def result(self):
+        return self.async_result.get()
+
+
+@contextmanager
+def _window_pool(workers: int):
+    """
+    ノイズ除去の窓を処理するプロセスプール。submit(関数, *引数)を返し、戻り値は.result()で結果を受け取れる。
+    デーモンプロセス（Celeryのpreforkワーカー）では標準のmultiprocessingで子プロセスを作れないため、
+    Celeryと同じbilliardのプールを使う（billiardはデーモンプロセスからの子プロセスの作成を許可している）。
+    """
+    if not multiprocessing.current_process().daemon:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield executor.submit
+        return
+
+    import billiard
+
+    pool = billiard.Pool(processes=workers)
+    try:
+        yield lambda function, *args: _BilliardFuture(pool.apply_async(function, args))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def reduce_noise_chunked(
+    raw_path: str,
+    n_samples: int,
+    gain: float = 1.0,
+    sample_rate: int = PCM_SAMPLE_RATE,
+    window_seconds: int = DENOISE_WINDOW_SECONDS,
+    overlap_seconds: int = DENOISE_OVERLAP_SECONDS,
+    max_workers: Optional[int] = None,
+) -> Iterator[np.ndarray]:
+    """
+    PCMファイルをクロスフェード付きの窓に分割し、プロセスプールでノイズ除去する（オーバーラップアド方式）。
+
+    同時に処理中の窓はワーカー数の2倍までに制限するため、
+    ファイルの長さに関わらずメモリ使用量は一定に保たれる。
+    decode_to_wavのblock_pipelineとしてそのまま渡せる。
+
+    Args:
+        raw_path (str): ヘッダなしPCM(s16le)ファイルのパス
+        n_samples (int): サンプル数
+        gain (float): ノイズ除去前に掛けるゲイン倍率
+        sample_rate (int): サンプリングレート
+        window_seconds (int): 窓の長さ（秒）
+        overlap_seconds (int): 隣接する窓の重なり（秒）
+        max_workers (int, optional): ワーカー数（省略時は設定値）
+
+    Yields:
+        np.ndarray: ノイズ除去後のfloat32のサンプル配列（時間順）
+    """
+    overlap_size = overlap_seconds * sample_rate
+    windows = plan_denoise_windows(n_samples, window_seconds * sample_rate, overlap_size)
+    if not windows:
+        return
+
+    workers = min(max_workers or get_audio_processing_workers(), len(windows))
+    processing_logger.info(f"ノイズ除去: {len(windows)}窓 / {workers}ワーカー")
+
+    if workers <= 1:
+        denoised = (
+            _denoise_window(raw_path, n_samples, start, end, gain, sample_rate)
+            for start, end in windows
+        )
+        yield from _overlap_add(denoised, windows, overlap_size)
+        return
+
+    with _window_pool(workers) as submit:
+        def ordered_results():
+            pending = deque()
+            queue = iter(windows)
+            for start, end in queue:
+                pending.append(submit(_denoise_window, raw_path, n_samples, start, end, gain, sample_rate))
+                if len(pending) >= workers * 2:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                next_window = next(queue, None)
+                if next_window is not None:
+                    start, end = next_window
+                    pending.append(submit(_denoise_window, raw_path, n_samples, start, end, gain, sample_rate))
+                yield result
+
+        yield from _overlap_add(ordered_results(), windows, overlap_size)
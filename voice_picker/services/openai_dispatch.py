@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from django.conf import settings
+
+from .chunk_planner import ChunkManifestEntry
+
+processing_logger = logging.getLogger('processing')
+
+
+class TokenBucket:
+    """
+    スレッド間で共有するトークンバケット（1分あたりのリクエスト数の制限）。
+
+    capacity個までのリクエストは即座に通し、それ以降は1分あたりrate_per_minute個の速度でトークンを補充する。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, int(rate_per_minute))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def acquire(self):
+        """
+        トークンを1つ取得する。トークンがない場合は補充されるまで待機する。
+        """
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait)
+
+
+def get_openai_max_in_flight() -> int:
+    """
+    同時に送信するOpenAI APIリクエスト数の上限を取得する。
+    """
+    return max(1, getattr(settings, 'OPENAI_MAX_IN_FLIGHT', 4))
+
+
+@lru_cache(maxsize=1)
+def get_openai_rate_limiter() -> TokenBucket:
+    """
+    プロセス内で共有するOpenAI APIのレート制限（設定: OPENAI_REQUESTS_PER_MINUTE）を取得する。
+    """
+    return TokenBucket(getattr(settings, 'OPENAI_REQUESTS_PER_MINUTE', 50))
+
+
+def transcribe_chunks(
+    manifest: List[ChunkManifestEntry],
+    transcribe: Callable[[str], Optional[dict]],
+    max_in_flight: Optional[int] = None,
+) -> List[Optional[dict]]:
+    """
+    分割ファイルをスレッドプールで並行して文字起こしする。
+    同時実行数はmax_in_flightまでに制限し、結果はマニフェストと同じ順で返す。
+    処理が終わった分割ファイルはその場で削除する。
+
+    Args:
+        manifest (List[ChunkManifestEntry]): 分割ファイルのマニフェスト
+        transcribe (Callable): ファイルパスを受け取り、文字起こし結果（失敗時はNone）を返す関数
+        max_in_flight (int, optional): 同時実行数の上限。省略時は設定値
+
+    Returns:
+        List[Optional[dict]]: 各分割ファイルの文字起こし結果（失敗したものはNone）
+    """
+    max_in_flight = max_in_flight or get_openai_max_in_flight()
+
+    def run(chunk_index: int, chunk: ChunkManifestEntry) -> Optional[dict]:
+        try:
+            processing_logger.info(f"分割ファイル {chunk_index + 1}/{len(manifest)} を処理中...")
+            result = transcribe(chunk.path)
+            if result is None:
+                processing_logger.error(f"分割ファイル {chunk.path} の文字起こしに失敗しました")
+            else:
+                processing_logger.info(f"分割ファイル {chunk_index + 1}/{len(manifest)} の処理が完了しました")
+            return result
+        except Exception as e:
+            processing_logger.error(f"分割ファイル {chunk.path} の処理中にエラーが発生しました: {e}")
+            return None
+        finally:
+            # 一時ファイルを削除
+            if os.path.exists(chunk.path):
+                os.remove(chunk.path)
+
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(manifest)) or 1) as executor:
+        futures = [executor.submit(run, chunk_index, chunk) for chunk_index, chunk in enumerate(manifest)]
+        return [future.result() for future in futures]
@@ -0,0 +1,232 @@
+import hashlib
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from .audio_stream import (
+    PCM_BLOCK_SECONDS,
+    PCM_SAMPLE_RATE,
+    PCM_SAMPLE_WIDTH,
+    decode_to_raw_pcm,
+    render_pcm_blocks,
+    write_wav_blocks,
+)
+from .noise_reduction import reduce_noise_chunked
+
+processing_logger = logging.getLogger('processing')
+
+
+class PcmArtifact:
+    """
+    UploadedFileごとに1つだけ作成する、正規化・ノイズ除去済みの16kHzモノラルPCM(s16le)。
+
+    ヘッダを持たない生のPCMとして保存し、各処理（話者分離・文字起こし・分割・再生時間の取得）は
+    np.memmapで必要な区間だけを読み込む。デコードはアップロードごとに1回で済む。
+    """
+
+    def __init__(self, path: str, sample_rate: int = PCM_SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def silence_index_path(self) -> str:
+        """無音インデックスの保存先（アーティファクトと同じディレクトリ）"""
+        return os.path.splitext(self.path)[0] + '.silence.npz'
+
+    @property
+    def content_hash_path(self) -> str:
+        """PCMのSHA-256の保存先"""
+        return os.path.splitext(self.path)[0] + '.sha256'
+
+    def content_hash(self) -> str:
+        """
+        PCMのSHA-256（16進数）。作成時に保存したものを返し、ない場合は計算して保存する。
+        同じ音声からは同じ値になるため、話者分離などの結果のキャッシュのキーに使う。
+        """
+        if os.path.exists(self.content_hash_path):
+            with open(self.content_hash_path) as f:
+                return f.read().strip()
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        _write_content_hash(self.content_hash_path, content_hash)
+        return content_hash
+
+    @property
+    def n_samples(self) -> int:
+        return os.path.getsize(self.path) // PCM_SAMPLE_WIDTH
+
+    @property
+    def duration(self) -> float:
+        """再生時間（秒）"""
+        return self.n_samples / self.sample_rate
+
+    @property
+    def duration_ms(self) -> int:
+        """再生時間（ミリ秒）"""
+        return self.n_samples * 1000 // self.sample_rate
+
+    @property
+    def wav_size(self) -> int:
+        """WAVとして書き出した場合のバイト数"""
+        return self.n_samples * PCM_SAMPLE_WIDTH + 44
+
+    def memmap(self) -> np.memmap:
+        """
+        int16のサンプル配列をnp.memmapで開く（ファイル全体は読み込まない）。
+        """
+        return np.memmap(self.path, dtype=np.int16, mode='r', shape=(self.n_samples,))
+
+    def ms_to_sample(self, ms: int) -> int:
+        return min(self.n_samples, max(0, int(ms) * self.sample_rate // 1000))
+
+    def read_ms(self, start_ms: int, end_ms: Optional[int] = None) -> np.ndarray:
+        """
+        指定区間のサンプルをint16で返す。
+
+        Args:
+            start_ms (int): 開始時間（ミリ秒）
+            end_ms (int, optional): 終了時間（ミリ秒）。省略時は末尾まで
+
+        Returns:
+            np.ndarray: int16のサンプル配列
+        """
+        start = self.ms_to_sample(start_ms)
+        end = self.n_samples if end_ms is None else self.ms_to_sample(end_ms)
+        return np.array(self.memmap()[start:end])
+
+    def float32(self) -> np.ndarray:
+        """
+        Whisper・pyannoteに渡すための[-1, 1]のfloat32配列を返す。
+        """
+        samples = np.empty(self.n_samples, dtype=np.float32)
+        pcm = self.memmap()
+        block_size = self.sample_rate * PCM_BLOCK_SECONDS
+        for start in range(0, self.n_samples, block_size):
+            np.divide(pcm[start:start + block_size], 32768.0, out=samples[start:start + block_size], dtype=np.float32)
+        return samples
+
+    def export_wav(self, output_path: str, start_ms: int = 0, end_ms: Optional[int] = None) -> str:
+        """
+        指定区間をWAVファイルとして書き出す（デコードは行わない）。
+
+        Args:
+            output_path (str): 出力先のWAVファイルパス
+            start_ms (int): 開始時間（ミリ秒）
+            end_ms (int, optional): 終了時間（ミリ秒）。省略時は末尾まで
+
+        Returns:
+            str: 出力先のWAVファイルパス
+        """
+        pcm = self.memmap()
+        start = self.ms_to_sample(start_ms)
+        end = self.n_samples if end_ms is None else self.ms_to_sample(end_ms)
+        block_size = self.sample_rate * PCM_BLOCK_SECONDS
+        blocks = (pcm[offset:min(offset + block_size, end)] for offset in range(start, end, block_size))
+        write_wav_blocks(output_path, blocks, self.sample_rate)
+        return output_path
+
+    def delete(self):
+        for path in (self.path, self.silence_index_path, self.content_hash_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _write_content_hash(path: str, content_hash: str):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(content_hash)
+    os.replace(temp_path, path)
+
+
+def build_pcm_artifact(source_path: str, artifact_path: str, denoise: bool = True) -> PcmArtifact:
+    """
+    元ファイルをデコードし、正規化・ノイズ除去したPCMアーティファクトを作成する。
+
+    Args:
+        source_path (str): 元の音声・動画ファイルのパス
+        artifact_path (str): アーティファクトの保存先
+        denoise (bool): ノイズ除去を行うかどうか
+
+    Returns:
+        PcmArtifact: 作成したアーティファクト
+    """
+    os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+    decoded_path = artifact_path + '.decode'
+    try:
+        n_samples, peak = decode_to_raw_pcm(source_path, decoded_path)
+        return finalize_pcm_artifact(decoded_path, artifact_path, n_samples, peak, denoise)
+    finally:
+        if os.path.exists(decoded_path):
+            os.remove(decoded_path)
+
+
+def finalize_pcm_artifact(
+    decoded_path: str,
+    artifact_path: str,
+    n_samples: int,
+    peak: int,
+    denoise: bool = True,
+) -> PcmArtifact:
+    """
+    デコード済みのPCMを正規化・ノイズ除去し、アーティファクトとして保存する。
+    作成途中のファイルが他の処理から見えないよう、一時ファイルに書き出してから置き換える。
+
+    Args:
+        decoded_path (str): デコード済みのヘッダなしPCMファイルのパス
+        artifact_path (str): アーティファクトの保存先
+        n_samples (int): サンプル数
+        peak (int): 絶対値の最大値
+        denoise (bool): ノイズ除去を行うかどうか
+
+    Returns:
+        PcmArtifact: 作成したアーティファクト
+    """
+    temp_path = artifact_path + '.tmp'
+    # 書き出しと同時にSHA-256を計算する（後から読み直さない）
+    digest = hashlib.sha256()
+    try:
+        block_pipeline = reduce_noise_chunked if denoise else None
+        with open(temp_path, 'wb') as artifact_file:
+            for block in render_pcm_blocks(decoded_path, n_samples, peak, block_pipeline):
+                data = block.tobytes()
+                digest.update(data)
+                artifact_file.write(data)
+        os.replace(temp_path, artifact_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    artifact = PcmArtifact(artifact_path)
+    # 作り直した場合、古いアーティファクトから計算した無音インデックスは使えない
+    if os.path.exists(artifact.silence_index_path):
+        os.remove(artifact.silence_index_path)
+    _write_content_hash(artifact.content_hash_path, digest.hexdigest())
+    processing_logger.info(f"PCMアーティファクトを作成しました: {artifact_path} ({artifact.duration:.1f}秒)")
+    return artifact
+
+
+def ensure_pcm_artifact(uploaded_file, source_path: Optional[str] = None) -> PcmArtifact:
+    """
+    UploadedFileのPCMアーティファクトを取得する。存在しない場合は作成する。
+
+    Args:
+        uploaded_file (UploadedFile): UploadedFileのインスタンス
+        source_path (str, optional): 元ファイルのパス（省略時はuploaded_file.file.path）
+
+    Returns:
+        PcmArtifact: アーティファクト
+    """
+    artifact = PcmArtifact(uploaded_file.pcm_path)
+    if artifact.exists():
+        return artifact
+    # 未作成の場合は取り込み処理（再生用の再多重化・PCM抽出・再生時間の取得）を1回のffmpegで行う
+    from .ingest import ingest_upload
+    return ingest_upload(uploaded_file, source_path)
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from django.utils import timezone
+
+from .diarization_store import parse_rttm, tracks_to_rttm
+from .engines import get_engine, route_engine
+from .inference import diarize_artifact
+from .pcm_artifact import PcmArtifact, ensure_pcm_artifact
+from .silence_index import ensure_silence_index
+
+processing_logger = logging.getLogger('processing')
+
+STAGE_INGEST = 'ingest'
+STAGE_PREPROCESS = 'preprocess'
+STAGE_DIARIZE = 'diarize'
+STAGE_TRANSCRIBE = 'transcribe'
+STAGE_ALIGN = 'align'
+STAGE_PERSIST = 'persist'
+STAGE_ANALYZE = 'analyze'
+
+# 実行順。あるステージをやり直した場合、それ以降のステージもすべてやり直す
+PIPELINE_STAGES = (
+    STAGE_INGEST,
+    STAGE_PREPROCESS,
+    STAGE_DIARIZE,
+    STAGE_TRANSCRIBE,
+    STAGE_ALIGN,
+    STAGE_PERSIST,
+    STAGE_ANALYZE,
+)
+
+
+class PipelineError(Exception):
+    """パイプラインのステージが失敗した場合の例外"""
+
+
+@dataclass
+class PipelineContext:
+    """
+    パイプラインの実行中に各ステージへ渡す情報。outputsには実行済み（または再開した）ステージの出力が入る。
+    """
+    uploaded_file: object
+    file_path: Optional[str] = None
+    engine_name: Optional[str] = None
+    outputs: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def artifact(self) -> PcmArtifact:
+        return PcmArtifact(self.outputs[STAGE_INGEST]['pcm_path'])
+
+    @property
+    def engine(self):
+        return get_engine(self.outputs[STAGE_PREPROCESS]['engine'])
+
+
+def stage_output_path(uploaded_file, stage: str) -> str:
+    """
+    ステージの出力（JSON）の保存先。PCMアーティファクトの派生ファイルとして置くため、
+    元ファイルの差し替え・削除でアーティファクトと一緒に削除され、全ステージがやり直しになる。
+    """
+    return os.path.splitext(uploaded_file.pcm_path)[0] + f".{stage}.json"
+
+
+def _ingest(context: PipelineContext) -> dict:
+    """デコード・再生用ファイルの再多重化・PCMアーティファクトの作成"""
+    artifact = ensure_pcm_artifact(context.uploaded_file, context.file_path)
+    return {'pcm_path': artifact.path, 'duration': artifact.duration}
+
+
+def _preprocess(context: PipelineContext) -> dict:
+    """無音インデックス・PCMのSHA-256の作成と、エンジンの選択（リトライ時も同じエンジンを使う）"""
+    from voice_picker.models import UploadedFile
+
+    artifact = context.artifact
+    ensure_silence_index(artifact)
+    content_hash = artifact.content_hash()
+
+    if context.engine_name:
+        engine = get_engine(context.engine_name)
+    else:
+        file_path = context.file_path or context.uploaded_file.file.path
+        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        engine = route_engine(context.uploaded_file.organization, artifact.duration, file_size_mb)
+
+    # ローカルのキューの混雑度をエンジンごとに数えられるよう、選んだエンジンをファイルにも記録する
+    UploadedFile.objects.filter(id=context.uploaded_file.id).update(engine=engine.name)
+    return {'content_hash': content_hash, 'engine': engine.name}
+
+
+def _diarize(context: PipelineContext) -> Optional[dict]:
+    """話者分離（話者分離に対応していないエンジンの場合はスキップ）"""
+    if not context.engine.capabilities.diarization:
+        return None
+    return {'rttm': tracks_to_rttm(diarize_artifact(context.artifact))}
+
+
+def _transcribe(context: PipelineContext) -> dict:
+    """選択したエンジンでの文字起こし"""
+    result = context.engine.transcribe(context.artifact)
+    return {'text': result['text'], 'segments': result['segments']}
+
+
+def _align(context: PipelineContext) -> dict:
+    """話者の割り当てと、保存するレコード（30秒単位）へのまとめ"""
+    from voice_picker.views import build_diarized_rows, build_rows_without_speaker
+
+    result = context.outputs[STAGE_TRANSCRIBE]
+    diarization = context.outputs.get(STAGE_DIARIZE)
+    if diarization:
+        rows = build_diarized_rows(result, parse_rttm(diarization['rttm']))
+    else:
+        rows = build_rows_without_speaker(result)
+    return {'rows': rows}
+
+
+def _persist(context: PipelineContext) -> dict:
+    """文字起こしレコードの保存（既存のレコードは1トランザクションで置き換える）"""
+    from voice_picker.views import replace_transcriptions
+
+    count = replace_transcriptions(context.uploaded_file.id, context.outputs[STAGE_ALIGN]['rows'])
+    return {'count': count}
+
+
+def _analyze(context: PipelineContext) -> Optional[dict]:
+    """要約・課題点・取り組み案の作成（文字起こしが空の場合はスキップ）"""
+    from voice_picker.models import UploadedFile
+    from voice_picker.views import text_generation_save
+
+    if not context.outputs[STAGE_PERSIST]['count']:
+        return None
+    if not isinstance(text_generation_save(context.uploaded_file), UploadedFile):
+        raise PipelineError("テキスト生成に失敗しました")
+    return {'analyzed': True}
+
+
+STAGE_RUNNERS: Dict[str, Callable[[PipelineContext], Optional[dict]]] = {
+    STAGE_INGEST: _ingest,
+    STAGE_PREPROCESS: _preprocess,
+    STAGE_DIARIZE: _diarize,
+    STAGE_TRANSCRIBE: _transcribe,
+    STAGE_ALIGN: _align,
+    STAGE_PERSIST: _persist,
+    STAGE_ANALYZE: _analyze,
+}
+
+
+def _load_stage_output(record) -> Optional[dict]:
+    """
+    完了済みのステージの出力を読み込む。未完了・出力が失われている場合はNone（やり直しが必要）。
+    """
+    from voice_picker.models.processing_stage import StageStatus
+
+    if record is None or record.status not in (StageStatus.COMPLETED, StageStatus.SKIPPED):
+        return None
+    if not record.artifact_path:
+        return {}
+    try:
+        with open(record.artifact_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stage_output(path: str, output: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _run_stage(record, context: PipelineContext) -> dict:
+    """
+    ステージを実行し、実行状況と出力をProcessingStageに記録する。
+    """
+    from voice_picker.models.processing_stage import StageStatus
+
+    record.status = StageStatus.RUNNING
+    record.attempts += 1
+    record.error = None
+    record.started_at = timezone.now()
+    record.finished_at = None
+    record.save()
+
+    try:
+        output = STAGE_RUNNERS[record.name](context)
+    except Exception as e:
+        record.status = StageStatus.FAILED
+        record.error = str(e)
+        record.finished_at = timezone.now()
+        record.save()
+        raise
+
+    if output is None:
+        record.status = StageStatus.SKIPPED
+        record.artifact_path = None
+        output = {}
+    else:
+        record.status = StageStatus.COMPLETED
+        record.artifact_path = stage_output_path(context.uploaded_file, record.name)
+        _write_stage_output(record.artifact_path, output)
+    record.finished_at = timezone.now()
+    record.save()
+    return output
+
+
+def run_pipeline(
+    uploaded_file,
+    file_path: Optional[str] = None,
+    engine_name: Optional[str] = None,
+    until: str = STAGE_ANALYZE,
+) -> Dict[str, dict]:
+    """
+    アップロードされたファイルを、取り込みから解析までのステージに分けて処理する。
+
+    各ステージの実行状況と出力はProcessingStageとJSONファイルに記録し、
+    リトライやワーカーの異常終了後は、最後に完了したステージの次から再開する。
+
+    Args:
+        uploaded_file (UploadedFile): UploadedFileのインスタンス
+        file_path (str, optional): 元ファイルのパス（省略時はuploaded_file.file.path）
+        engine_name (str, optional): 使用するエンジン名。記録済みのエンジンと異なる場合は前処理からやり直す
+        until (str): ここまでのステージを実行する
+
+    Returns:
+        Dict[str, dict]: ステージ名ごとの出力
+    """
+    from voice_picker.models.processing_stage import ProcessingStage
+
+    stages = PIPELINE_STAGES[:PIPELINE_STAGES.index(until) + 1]
+    records = {record.name: record for record in ProcessingStage.objects.filter(uploaded_file=uploaded_file)}
+    context = PipelineContext(uploaded_file, file_path, engine_name)
+
+    resuming = True
+    for stage in stages:
+        record = records.get(stage) or ProcessingStage(uploaded_file=uploaded_file, name=stage)
+        if resuming:
+            output = _load_stage_output(record)
+            if output is not None and stage == STAGE_INGEST and not PcmArtifact(output['pcm_path']).exists():
+                output = None
+            if output is not None and stage == STAGE_PREPROCESS and engine_name and output.get('engine') != engine_name:
+                output = None
+            if output is not None:
+                processing_logger.info(f"ステージ {stage} は完了済みのため再開します: {uploaded_file.id}")
+                context.outputs[stage] = output
+                continue
+            # ここから先のステージはすべてやり直す
+            resuming = False
+
+        processing_logger.info(f"ステージ {stage} を実行します: {uploaded_file.id}")
+        context.outputs[stage] = _run_stage(record, context)
+
+    return context.outputs
@@ -0,0 +1,84 @@
+import logging
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+
+processing_logger = logging.getLogger('processing')
+
+# 1回のINSERTでまとめて書き込む件数（MySQLのmax_allowed_packetに収まる大きさ）
+BULK_CREATE_BATCH_SIZE = 500
+
+
+def validate_segment(row: dict) -> Optional[dict]:
+    """
+    保存する文字起こしレコードをメモリ上で検証・正規化する（TranscriptionSerializerと同じ条件）。
+
+    Args:
+        row (dict): start_time・text・speakerを持つレコード
+
+    Returns:
+        Optional[dict]: 正規化したレコード（保存できない場合はNone）
+    """
+    from ..models.transcription import Transcription
+
+    try:
+        start_time = int(row.get('start_time'))
+    except (TypeError, ValueError):
+        return None
+
+    # CharFieldと同じく前後の空白を除き、空白だけのテキストは保存しない
+    text = row.get('text')
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    if not text:
+        return None
+
+    speaker = row.get('speaker') or None
+    if speaker is not None:
+        speaker = str(speaker)
+        if len(speaker) > Transcription._meta.get_field('speaker').max_length:
+            return None
+
+    return {'start_time': start_time, 'text': text, 'speaker': speaker}
+
+
+def build_transcriptions(uploaded_file_id, rows: Iterable[dict]) -> List:
+    """
+    レコードを検証し、保存するTranscriptionのインスタンス（未保存）のリストにする。
+    保存できないレコードはログに残して除く。
+    """
+    from ..models.transcription import Transcription
+
+    transcriptions = []
+    for row in rows:
+        segment = validate_segment(row)
+        if segment is None:
+            processing_logger.error(f"Validation error: 保存できない文字起こしレコードです: {row}")
+            continue
+        transcriptions.append(Transcription(uploaded_file_id=uploaded_file_id, **segment))
+    return transcriptions
+
+
+def bulk_save_transcriptions(uploaded_file_id, rows: Iterable[dict], replace: bool = False) -> int:
+    """
+    文字起こしレコードを1トランザクションでまとめて保存する。
+    UploadedFileの存在確認やINSERTをレコードごとに行わず、bulk_createで分割してまとめて書き込む。
+
+    Args:
+        uploaded_file_id (str): アップロードファイルのID
+        rows (Iterable[dict]): start_time・text・speakerを持つレコード
+        replace (bool): Trueの場合、ファイルの既存のレコードを削除してから保存する
+
+    Returns:
+        int: 保存したレコード数
+    """
+    from ..models.transcription import Transcription
+
+    transcriptions = build_transcriptions(uploaded_file_id, rows)
+    with transaction.atomic():
+        if replace:
+            Transcription.objects.filter(uploaded_file_id=uploaded_file_id).delete()
+        Transcription.objects.bulk_create(transcriptions, batch_size=BULK_CREATE_BATCH_SIZE)
+    processing_logger.info(f"文字起こしレコードを{len(transcriptions)}件保存しました: {uploaded_file_id}")
+    return len(transcriptions)
@@ -0,0 +1,194 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from .chunk_planner import plan_split_ranges
+from .inference import load_whisper_model, transcribe_samples
+from .pcm_artifact import PcmArtifact
+from .silence_index import ensure_silence_index
+
+processing_logger = logging.getLogger('processing')
+
+# シャードの長さの範囲（秒）。短すぎると文脈が途切れて精度が落ち、長すぎると並列度が下がる
+SHARD_MIN_SECONDS = 120
+SHARD_MAX_SECONDS = 900
+
+
+def get_shard_threads() -> int:
+    """1シャード（1ワーカー）あたりのtorch / CTranslate2のスレッド数"""
+    return max(1, getattr(settings, 'WHISPER_SHARD_THREADS', 2))
+
+
+def get_shard_workers() -> int:
+    """
+    シャードを処理するワーカー数（0以下の場合はCPUコア数 / 1ワーカーあたりのスレッド数）。
+    """
+    workers = getattr(settings, 'WHISPER_SHARD_WORKERS', 0)
+    if workers <= 0:
+        workers = (os.cpu_count() or 1) // get_shard_threads()
+    return max(1, workers)
+
+
+def should_shard(artifact: PcmArtifact) -> bool:
+    """
+    長時間モード（シャード分割・並列文字起こし）を使うかどうか。
+    推論サーバーがシャードのワーカープールを起動している場合だけ使う（ジョブごとにワーカーを起動しない）。
+    """
+    min_seconds = getattr(settings, 'WHISPER_SHARD_MIN_SECONDS', 600)
+    if not min_seconds or artifact.duration < min_seconds:
+        return False
+    return get_shard_pool() is not None
+
+
+def plan_shards(artifact: PcmArtifact, workers: int) -> List[Tuple[int, int]]:
+    """
+    ワーカー数に合わせてシャードの長さを決め、無音区間の境界で分割する（発話の途中では切らない）。
+
+    Returns:
+        List[Tuple[int, int]]: (開始, 終了)のリスト（ミリ秒）
+    """
+    duration_ms = artifact.duration_ms
+    shard_ms = -(-duration_ms // workers)
+    shard_ms = min(max(shard_ms, SHARD_MIN_SECONDS * 1000), SHARD_MAX_SECONDS * 1000)
+    return plan_split_ranges(duration_ms, shard_ms, ensure_silence_index(artifact))
+
+
+# ワーカープロセス内で使う1ワーカーあたりのスレッド数（_init_shard_workerで設定する）
+_worker_threads: Optional[int] = None
+
+
+def _init_shard_worker(threads: int):
+    """
+    ワーカープロセスの初期化（spawnで起動するため、Djangoの設定を読み込み直す）。
+    モデルもここで読み込み、以降のシャードではワーカーが保持したモデルを使い回す。
+    """
+    global _worker_threads
+
+    import django
+    import torch
+
+    django.setup()
+    torch.set_num_threads(threads)
+    _worker_threads = threads
+    load_whisper_model(threads)
+
+
+def _warm_up_shard_worker(_):
+    """ワーカーの起動・モデルの読み込みを待つための空の処理"""
+    return os.getpid()
+
+
+def _transcribe_shard(pcm_path: str, start_ms: int, end_ms: int, language: str) -> List[dict]:
+    """
+    シャード1つを文字起こしし、元の音声上の時刻に直したセグメントを返す（ワーカープロセスで実行）。
+    """
+    artifact = PcmArtifact(pcm_path)
+    samples = artifact.read_ms(start_ms, end_ms).astype('float32') / 32768.0
+    result = transcribe_samples(samples, language, cpu_threads=_worker_threads)
+
+    offset = start_ms / 1000
+    shard_end = end_ms / 1000
+    return [
+        {
+            'start': min(segment['start'] + offset, shard_end),
+            'end': min(segment['end'] + offset, shard_end),
+            'text': segment['text'],
+        }
+        for segment in result['segments']
+    ]
+
+
+class ShardPool:
+    """
+    シャードを文字起こしするワーカープロセスのプール。
+    推論サーバーが起動時に1つだけ作成して保持し、ワーカーはモデルを読み込んだまま次のジョブを待つ。
+    ジョブごとにプロセスを起動してモデルを読み込み直すことはしない。
+    """
+
+    def __init__(self, workers: int, threads: int):
+        self.workers = workers
+        self.threads = threads
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # torchを読み込んだプロセスからのforkは安全でないため、spawnでワーカーを起動する
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_shard_worker,
+            initargs=(self.threads,),
+        )
+
+    def warm_up(self):
+        """すべてのワーカーを起動し、モデルの読み込みが終わるまで待つ"""
+        list(self.executor.map(_warm_up_shard_worker, range(self.workers)))
+
+    def map_shards(self, pcm_path: str, shards: List[Tuple[int, int]], language: str) -> List[List[dict]]:
+        """
+        シャードを並列に文字起こしし、シャードの順に結果を返す。
+        ワーカーが異常終了した場合はプールを作り直してから例外を送出する（次のジョブは新しいプールで処理する）。
+        """
+        try:
+            futures = [
+                self.executor.submit(_transcribe_shard, pcm_path, start_ms, end_ms, language)
+                for start_ms, end_ms in shards
+            ]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            processing_logger.error("シャードのワーカーが異常終了したため、ワーカープールを作り直します")
+            self.executor.shutdown(wait=False)
+            self.executor = self._create_executor()
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+_shard_pool: Optional[ShardPool] = None
+
+
+def get_shard_pool() -> Optional[ShardPool]:
+    return _shard_pool
+
+
+def start_shard_pool(warm_up: bool = True) -> Optional[ShardPool]:
+    """
+    シャードのワーカープールを起動する（推論サーバーの起動時に1回だけ呼ぶ）。
+    長時間モードが無効な場合、ワーカーが1つしか使えない場合はNoneを返す。
+    """
+    global _shard_pool
+
+    if not getattr(settings, 'WHISPER_SHARD_MIN_SECONDS', 600) or get_shard_workers() <= 1:
+        return None
+    if _shard_pool is None:
+        _shard_pool = ShardPool(get_shard_workers(), get_shard_threads())
+        if warm_up:
+            _shard_pool.warm_up()
+        processing_logger.info(f"シャードのワーカープールを起動しました: {_shard_pool.workers}ワーカー（{_shard_pool.threads}スレッド）")
+    return _shard_pool
+
+
+def transcribe_sharded(artifact: PcmArtifact, language: str = 'ja') -> dict:
+    """
+    PCMアーティファクトを無音区間でシャードに分割し、推論サーバーのワーカープールで並列に文字起こしする。
+    結果はシャードの順に結合し、各セグメントの時刻にシャードの開始位置を加算する。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+        language (str): 言語
+
+    Returns:
+        dict: 文字起こし結果（text・segments）
+    """
+    pool = get_shard_pool()
+    shards = plan_shards(artifact, pool.workers)
+    processing_logger.info(f"長時間モード: {artifact.duration:.0f}秒を{len(shards)}シャード / {pool.workers}ワーカー（{pool.threads}スレッド）で文字起こしします")
+
+    segments = [segment for shard_segments in pool.map_shards(artifact.path, shards, language) for segment in shard_segments]
+    return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
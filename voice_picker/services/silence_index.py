@@ -0,0 +1,226 @@
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .audio_stream import PCM_BLOCK_SECONDS
+from .pcm_artifact import PcmArtifact
+
+processing_logger = logging.getLogger('processing')
+
+# 無音判定のデフォルト値（pydub.silenceと同じ単位: ミリ秒 / dBFS）
+SILENCE_FRAME_MS = 10
+SILENCE_THRESH_DBFS = -40
+MIN_SILENCE_LEN_MS = 1000
+
+
+def frame_dbfs(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """
+    サンプル配列をフレームに区切り、フレームごとのRMSをdBFSで返す（端数のフレームも含む）。
+
+    Args:
+        samples (np.ndarray): int16のサンプル配列
+        frame_size (int): 1フレームのサンプル数
+
+    Returns:
+        np.ndarray: フレームごとのdBFS
+    """
+    n_frames = -(-len(samples) // frame_size)
+    padded = np.zeros(n_frames * frame_size, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(n_frames, frame_size)
+    # 端数フレームはゼロ埋め分を除いた実サンプル数で平均する
+    counts = np.full(n_frames, frame_size, dtype=np.float32)
+    if len(samples) % frame_size:
+        counts[-1] = len(samples) % frame_size
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / counts)
+    with np.errstate(divide='ignore'):
+        return 20 * np.log10(rms / 32768.0)
+
+
+def runs_of_true(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    真偽値配列から連続してTrueとなる区間の(開始, 終了)インデックスを返す。
+    """
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class SilenceIndex:
+    """
+    音声全体の無音区間をミリ秒単位で保持するインデックス。
+
+    フレームRMSによる判定をNumPyでまとめて計算し、結果をアーティファクトの隣に保存する。
+    分割・チャンク計画・トリミングは音声を再走査せずにこのインデックスを参照する。
+    """
+
+    def __init__(
+        self,
+        silences: np.ndarray,
+        duration_ms: int,
+        silence_thresh: float = SILENCE_THRESH_DBFS,
+        min_silence_len: int = MIN_SILENCE_LEN_MS,
+    ):
+        self.silences = np.asarray(silences, dtype=np.int64).reshape(-1, 2)
+        self.duration_ms = int(duration_ms)
+        self.silence_thresh = silence_thresh
+        self.min_silence_len = min_silence_len
+
+    @classmethod
+    def compute(
+        cls,
+        artifact: PcmArtifact,
+        silence_thresh: float = SILENCE_THRESH_DBFS,
+        min_silence_len: int = MIN_SILENCE_LEN_MS,
+        frame_ms: int = SILENCE_FRAME_MS,
+    ) -> 'SilenceIndex':
+        """
+        PCMアーティファクトから無音区間を検出する。
+
+        Args:
+            artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+            silence_thresh (float): 無音判定の閾値（dBFS）
+            min_silence_len (int): 最小無音長（ミリ秒）
+            frame_ms (int): フレーム長（ミリ秒）
+
+        Returns:
+            SilenceIndex: 無音区間のインデックス
+        """
+        frame_size = artifact.sample_rate * frame_ms // 1000
+        # ブロックはフレーム長の倍数にして、フレームがブロックをまたがないようにする
+        block_size = (artifact.sample_rate * PCM_BLOCK_SECONDS // frame_size) * frame_size
+        n_samples = artifact.n_samples
+
+        pcm = artifact.memmap() if n_samples else np.zeros(0, dtype=np.int16)
+        levels = np.concatenate([
+            frame_dbfs(pcm[start:start + block_size], frame_size)
+            for start in range(0, n_samples, block_size)
+        ] or [np.zeros(0, dtype=np.float32)])
+
+        starts, ends = runs_of_true(levels < silence_thresh)
+        min_frames = max(1, -(-min_silence_len // frame_ms))
+        keep = (ends - starts) >= min_frames
+        silences = np.stack([starts[keep] * frame_ms, ends[keep] * frame_ms], axis=1)
+        duration_ms = artifact.duration_ms
+        silences = np.minimum(silences, duration_ms)
+
+        return cls(silences, duration_ms, silence_thresh, min_silence_len)
+
+    @classmethod
+    def load(cls, path: str) -> 'SilenceIndex':
+        with np.load(path) as data:
+            return cls(
+                data['silences'],
+                int(data['duration_ms']),
+                float(data['silence_thresh']),
+                int(data['min_silence_len']),
+            )
+
+    def save(self, path: str):
+        temp_path = path + '.tmp.npz'
+        np.savez(
+            temp_path,
+            silences=self.silences,
+            duration_ms=self.duration_ms,
+            silence_thresh=self.silence_thresh,
+            min_silence_len=self.min_silence_len,
+        )
+        os.replace(temp_path, path)
+
+    def matches(self, silence_thresh: float, min_silence_len: int) -> bool:
+        return self.silence_thresh == silence_thresh and self.min_silence_len == min_silence_len
+
+    def silence_ranges(self) -> List[Tuple[int, int]]:
+        """無音区間の(開始, 終了)のリスト（ミリ秒）"""
+        return [(int(start), int(end)) for start, end in self.silences]
+
+    def speech_ranges(self) -> List[Tuple[int, int]]:
+        """発話区間の(開始, 終了)のリスト（ミリ秒）"""
+        bounds = np.concatenate(([0], self.silences.ravel(), [self.duration_ms]))
+        return [(int(start), int(end)) for start, end in bounds.reshape(-1, 2) if end > start]
+
+    def split_points(self) -> List[int]:
+        """無音区間の中央（ミリ秒）のリスト"""
+        return [int(point) for point in self.silences.sum(axis=1) // 2]
+
+    def best_split_point(self, start_ms: int, end_ms: int) -> Optional[int]:
+        """
+        (start_ms, end_ms)の範囲内で、end_msに最も近い無音区間の中央を返す。
+
+        Args:
+            start_ms (int): 範囲の開始（ミリ秒、この値自体は含まない）
+            end_ms (int): 範囲の終了（ミリ秒、この値自体は含まない）
+
+        Returns:
+            Optional[int]: 分割ポイント（ミリ秒）。範囲内に無音区間がない場合はNone
+        """
+        points = self.silences.sum(axis=1) // 2
+        lo = np.searchsorted(points, start_ms, side='right')
+        hi = np.searchsorted(points, end_ms, side='left')
+        if lo >= hi:
+            return None
+        # 中央値は昇順なので、範囲内で最後の点がend_msに最も近い
+        return int(points[hi - 1])
+
+    def nearest_split_point(self, target_ms: int, start_ms: int, end_ms: int) -> Optional[int]:
+        """
+        (start_ms, end_ms]の範囲内で、target_msに最も近い無音区間の中央を返す。
+
+        Args:
+            target_ms (int): 理想の分割位置（ミリ秒）
+            start_ms (int): 範囲の開始（ミリ秒、この値自体は含まない）
+            end_ms (int): 範囲の終了（ミリ秒、この値を含む）
+
+        Returns:
+            Optional[int]: 分割ポイント（ミリ秒）。範囲内に無音区間がない場合はNone
+        """
+        points = self.silences.sum(axis=1) // 2
+        lo = np.searchsorted(points, start_ms, side='right')
+        hi = np.searchsorted(points, end_ms, side='right')
+        if lo >= hi:
+            return None
+        candidates = points[lo:hi]
+        return int(candidates[np.argmin(np.abs(candidates - target_ms))])
+
+    def speech_bounds(self) -> Tuple[int, int]:
+        """
+        先頭と末尾の無音を除いた発話範囲（ミリ秒）を返す（トリミング用）。
+        """
+        speech = self.speech_ranges()
+        if not speech:
+            return 0, 0
+        return speech[0][0], speech[-1][1]
+
+
+def ensure_silence_index(
+    artifact: PcmArtifact,
+    silence_thresh: float = SILENCE_THRESH_DBFS,
+    min_silence_len: int = MIN_SILENCE_LEN_MS,
+) -> SilenceIndex:
+    """
+    PCMアーティファクトの無音インデックスを取得する。保存済みのものがなければ計算して保存する。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+        silence_thresh (float): 無音判定の閾値（dBFS）
+        min_silence_len (int): 最小無音長（ミリ秒）
+
+    Returns:
+        SilenceIndex: 無音区間のインデックス
+    """
+    path = artifact.silence_index_path
+    if os.path.exists(path):
+        try:
+            index = SilenceIndex.load(path)
+            if index.matches(silence_thresh, min_silence_len) and index.duration_ms == artifact.duration_ms:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            processing_logger.warning(f"無音インデックスの読み込みに失敗したため再計算します: {path}, エラー: {e}")
+
+    index = SilenceIndex.compute(artifact, silence_thresh, min_silence_len)
+    # 既定の閾値で計算したものだけを保存する
+    if silence_thresh == SILENCE_THRESH_DBFS and min_silence_len == MIN_SILENCE_LEN_MS:
+        index.save(path)
+    processing_logger.info(f"無音インデックスを作成しました: {len(index.silences)}区間")
+    return index
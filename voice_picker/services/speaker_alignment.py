@@ -0,0 +1,65 @@
+import heapq
+from collections import defaultdict
+from typing import List, Optional, Sequence
+
+from .diarization_store import SpeakerTrack
+
+
+def assign_speakers(segments: Sequence[dict], speaker_tracks: Sequence[SpeakerTrack]) -> List[Optional[str]]:
+    """
+    文字起こしの各セグメントに、時間の重なりが最も大きい話者を割り当てる。
+
+    セグメントと話者区間を開始時刻順に走査し、まだ終わっていない話者区間だけを終了時刻のヒープに保持する。
+    終わった区間はヒープから取り除くため、長い話者区間や重なった区間があっても、
+    各セグメントで見るのはその時点で続いている区間だけになる。
+    並べ替えを除いた計算量はO((n + m) log m + 重なりの数)。
+
+    Args:
+        segments (Sequence[dict]): startとend（秒）を持つセグメントのリスト
+        speaker_tracks (Sequence[SpeakerTrack]): (開始秒, 終了秒, 話者ラベル)のリスト
+
+    Returns:
+        List[Optional[str]]: セグメントと同じ順の話者ラベル（重なる区間がない場合はNone）
+    """
+    tracks = sorted(speaker_tracks, key=lambda track: track[0])
+
+    # セグメントが開始時刻順でない場合に備えて、走査順だけを並べ替える
+    order = sorted(range(len(segments)), key=lambda index: segments[index]['start'])
+    speakers: List[Optional[str]] = [None] * len(segments)
+
+    # active: (終了時刻, 区間の番号)のヒープ。開始済みで、まだ終わっていない区間
+    active = []
+    next_track = 0
+    for index in order:
+        segment_start = segments[index]['start']
+        segment_end = segments[index]['end']
+
+        # セグメントの終了までに始まる区間をヒープに加える
+        while next_track < len(tracks) and (tracks[next_track][0] < segment_end or tracks[next_track][0] <= segment_start):
+            heapq.heappush(active, (tracks[next_track][1], next_track))
+            next_track += 1
+
+        # セグメントの開始より前に終わった区間は、以降のセグメントとも重ならない
+        while active and active[0][0] < segment_start:
+            heapq.heappop(active)
+
+        # 重なりが同じ場合は開始の早い区間の話者を優先するため、区間の順に集計する
+        candidates = sorted(track_index for _, track_index in active)
+        overlaps = defaultdict(float)
+        for track_index in candidates:
+            track_start, track_end, speaker = tracks[track_index]
+            overlap = min(segment_end, track_end) - max(segment_start, track_start)
+            if overlap > 0:
+                overlaps[speaker] += overlap
+
+        if overlaps:
+            speakers[index] = max(overlaps, key=overlaps.get)
+        elif segment_end <= segment_start:
+            # 長さ0のセグメントは、その時刻を含む区間の話者にする
+            for track_index in candidates:
+                track_start, track_end, speaker = tracks[track_index]
+                if track_start <= segment_start <= track_end:
+                    speakers[index] = speaker
+                    break
+
+    return speakers
@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from .pcm_artifact import PcmArtifact
+
+processing_logger = logging.getLogger('processing')
+
+# KaldiRecognizerに一度に渡す長さ（秒）。短いほど発話の区切りを早く検出できる
+VOSK_FEED_SECONDS = 0.5
+
+
+def get_vosk_model_path() -> str:
+    return getattr(settings, 'VOSK_MODEL_PATH', '')
+
+
+def is_vosk_available() -> bool:
+    """
+    voskがインストールされ、モデルが配置されているかどうか。
+    """
+    model_path = get_vosk_model_path()
+    if not model_path or not os.path.isdir(model_path):
+        return False
+    try:
+        import vosk  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=1)
+def get_vosk_model():
+    from vosk import Model
+
+    return Model(get_vosk_model_path())
+
+
+def _segment_from_result(result_json: str) -> Optional[dict]:
+    """
+    KaldiRecognizerの結果（JSON）を{"start", "end", "text"}のセグメントにする。単語がない場合はNone。
+    """
+    result = json.loads(result_json)
+    words = result.get('result') or []
+    if not words:
+        return None
+    # 日本語モデルは単語ごとに空白で区切って返すため、空白を取り除く
+    text = ''.join(word['word'] for word in words)
+    return {'start': float(words[0]['start']), 'end': float(words[-1]['end']), 'text': text}
+
+
+def iter_vosk_segments(artifact: PcmArtifact) -> Iterator[dict]:
+    """
+    PCMアーティファクトをブロック単位でKaldiRecognizerに流し込み、発話の区切りごとにセグメントを返す。
+    音声全体を読み込まないため、メモリ使用量は録音の長さに関わらずほぼ一定。
+
+    Args:
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
+
+    Returns:
+        Iterator[dict]: {"start", "end", "text"}のセグメント（開始時刻順）
+    """
+    from vosk import KaldiRecognizer
+
+    recognizer = KaldiRecognizer(get_vosk_model(), artifact.sample_rate)
+    recognizer.SetWords(True)
+
+    pcm = artifact.memmap() if artifact.n_samples else []
+    block_size = int(artifact.sample_rate * VOSK_FEED_SECONDS)
+    for start in range(0, len(pcm), block_size):
+        if recognizer.AcceptWaveform(pcm[start:start + block_size].tobytes()):
+            segment = _segment_from_result(recognizer.Result())
+            if segment:
+                yield segment
+
+    segment = _segment_from_result(recognizer.FinalResult())
+    if segment:
+        yield segment
+
+
+def transcribe_vosk(artifact: PcmArtifact) -> dict:
+    """
+    Voskで文字起こしする（{"text", "segments"}の形式）。
+    """
+    segments = []
+    for segment in iter_vosk_segments(artifact):
+        segments.append(segment)
+        processing_logger.debug(f"[{segment['start']:.1f}s - {segment['end']:.1f}s] {segment['text']}")
+    return {'text': ' '.join(segment['text'] for segment in segments), 'segments': segments}
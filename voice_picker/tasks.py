@@ -4,7 +4,8 @@ import logging
 from celery import shared_task
 from django.conf import settings
 from .models import UploadedFile, Transcription
-from .views import transcribe_and_save
+from .models.uploaded_file import Status
+from .services.pipeline import STAGE_PERSIST, run_pipeline
 
 processing_logger = logging.getLogger('processing')
 
@@ -12,6 +13,8 @@ processing_logger = logging.getLogger('processing')
 def transcribe_and_save_async(self, file_path, uploaded_file_id):
     """
     音声ファイルの文字起こしを非同期で実行するCeleryタスク
+    取り込み・前処理・話者分離・文字起こし・話者の割り当て・保存・解析の各ステージの完了状況を記録し、
+    リトライ時は完了済みのステージを飛ばして続きから再開する。
 
     Args:
         file_path (str): 音声ファイルのパス
@@ -25,39 +28,31 @@ def transcribe_and_save_async(self, file_path, uploaded_file_id):
 
         # UploadedFileの状態を処理中に更新
         try:
-            uploaded_file = UploadedFile.objects.get(id=uploaded_file_id)
-            uploaded_file.status = UploadedFile.Status.PROCESSING
-            uploaded_file.save()
+            uploaded_file = UploadedFile.objects.select_related('organization').get(id=uploaded_file_id)
         except UploadedFile.DoesNotExist:
             processing_logger.error(f"UploadedFile with id {uploaded_file_id} not found")
             return {"success": False, "error": "UploadedFile not found"}
+        UploadedFile.objects.filter(id=uploaded_file_id).update(status=Status.PROCESSING)
 
-        # 文字起こし実行
-        success = transcribe_and_save(file_path, uploaded_file_id)
-
-        if success:
-            # 成功時はステータスを完了に更新
-            uploaded_file.status = UploadedFile.Status.COMPLETED
-            uploaded_file.save()
-            processing_logger.info(f"Transcription completed successfully for uploaded_file_id: {uploaded_file_id}")
-            return {"success": True, "uploaded_file_id": uploaded_file_id}
-        else:
-            # 失敗時はステータスをエラーに更新
-            uploaded_file.status = UploadedFile.Status.ERROR
-            uploaded_file.save()
-            processing_logger.error(f"Transcription failed for uploaded_file_id: {uploaded_file_id}")
-            return {"success": False, "error": "Transcription failed"}
+        # 文字起こし実行（エンジンはプラン・再生時間・キューの混雑度から選ぶ）
+        outputs = run_pipeline(uploaded_file, file_path)
+
+        # 保存した文字起こしが0件の場合は処理済みにしない（無音などで文字起こし結果が空）
+        if not outputs[STAGE_PERSIST]['count']:
+            processing_logger.error(f"文字起こし結果が空のため処理済みにしません: uploaded_file_id: {uploaded_file_id}")
+            UploadedFile.objects.filter(id=uploaded_file_id).update(status=Status.ERROR)
+            return {"success": False, "error": "Empty transcription"}
+
+        # 解析ステージで保存した要約等を上書きしないよう、ステータスだけを更新する
+        UploadedFile.objects.filter(id=uploaded_file_id).update(status=Status.COMPLETED)
+        processing_logger.info(f"Transcription completed successfully for uploaded_file_id: {uploaded_file_id}")
+        return {"success": True, "uploaded_file_id": uploaded_file_id}
 
     except Exception as e:
         processing_logger.error(f"Error in async transcription task: {e}")
 
         # エラー時もステータスを更新
-        try:
-            uploaded_file = UploadedFile.objects.get(id=uploaded_file_id)
-            uploaded_file.status = UploadedFile.Status.ERROR
-            uploaded_file.save()
-        except UploadedFile.DoesNotExist:
-            pass
+        UploadedFile.objects.filter(id=uploaded_file_id).update(status=Status.ERROR)
 
-        # Celeryの自動リトライ機能を使用
+        # Celeryの自動リトライ機能を使用（完了済みのステージからは再開する）
         raise self.retry(exc=e, countdown=60, max_retries=3)
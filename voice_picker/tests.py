@@ -1,3 +1,1057 @@
-from django.test import TestCase
+import dataclasses
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from django.utils import timezone
+
+import numpy as np
+
+from member_management.models import Organization, User
+
+from voice_picker.benchmarks.alignment import assign_speakers_naive, synthetic_meeting
+from voice_picker.benchmarks.runner import compare_baselines
+from voice_picker.benchmarks.synthetic import iter_synthetic_blocks
+from voice_picker.services.chunk_cache import (
+    chunk_cache_key,
+    chunk_result_path,
+    evict_expired_chunk_results,
+    evict_expired_chunk_results_if_due,
+    load_chunk_result,
+    save_chunk_result,
+)
+from voice_picker.services.chunk_planner import (
+    CHUNK_FORMATS,
+    OPENAI_MAX_UPLOAD_MB,
+    ChunkManifestEntry,
+    max_chunk_duration_ms,
+    plan_chunks,
+    plan_split_ranges,
+)
+from voice_picker.models import OrganizationUsage, Transcription, UploadedFile
+from voice_picker.models.organization_usage import usage_period
+from voice_picker.pagination import KeysetCursorPagination
+from voice_picker.serializers import UploadedFileListSerializer, UploadedFileSerializer
+from voice_picker.models.processing_stage import ProcessingStage, StageStatus
+from voice_picker.models.uploaded_file import Status
+from voice_picker.services.dedup import hash_uploaded_file, reuse_processed_duplicate
+from voice_picker.services.diarization_store import load_speaker_tracks, parse_rttm, save_speaker_tracks, tracks_to_rttm
+from voice_picker.services.media_probe import probe_duration
+from voice_picker.services.openai_dispatch import TokenBucket, transcribe_chunks
+from voice_picker.services.noise_reduction import DENOISE_OVERLAP_SECONDS, DENOISE_WINDOW_SECONDS, reduce_noise_chunked
+from voice_picker.services.engines import ENGINE_REGISTRY, route_engine
+from voice_picker.services.pcm_artifact import PcmArtifact
+from voice_picker.services.pipeline import PipelineError, _load_stage_output
+from voice_picker.services.segment_store import build_transcriptions, validate_segment
+from voice_picker.services.sharded_whisper import _transcribe_shard, transcribe_sharded
+from voice_picker.services.silence_index import SilenceIndex, ensure_silence_index
+from voice_picker.services.speaker_alignment import assign_speakers
+from voice_picker.services.vosk_stream import _segment_from_result
+from voice_picker.views import UploadedFileViewSet
+
+
+class SyntheticRecordingTest(SimpleTestCase):
+    def test_same_seed_generates_same_signal(self):
+        """同じシードからは同じ合成音声が生成される"""
+        first = np.concatenate(list(iter_synthetic_blocks(0.5, seed=1)))
+        second = np.concatenate(list(iter_synthetic_blocks(0.5, seed=1)))
+        np.testing.assert_array_equal(first, second)
+
+    def test_length_matches_minutes(self):
+        """指定した長さのサンプル数が生成される"""
+        samples = sum(len(block) for block in iter_synthetic_blocks(0.5, seed=0, sample_rate=16000))
+        self.assertEqual(samples, 30 * 16000)
+
+
+class ReduceNoiseChunkedTest(SimpleTestCase):
+    SAMPLE_RATE = 16000
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.raw_path = os.path.join(temp_dir.name, 'audio.raw')
+        # ノイズ除去を恒等変換にし、窓の分割・クロスフェードだけを確認する
+        patcher = mock.patch('voice_picker.services.noise_reduction.reduce_noise_samples', side_effect=lambda samples, sample_rate: samples)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertReconstructs(self, n_samples):
+        pcm = np.random.default_rng(n_samples).integers(-32768, 32767, size=n_samples, dtype=np.int16)
+        pcm.tofile(self.raw_path)
+        output = np.concatenate(list(reduce_noise_chunked(self.raw_path, n_samples, sample_rate=self.SAMPLE_RATE, max_workers=1)))
+        self.assertEqual(len(output), n_samples)
+        np.testing.assert_allclose(output, pcm.astype(np.float32), rtol=1e-6, atol=1e-2)
+        # 窓の境界（クロスフェードの開始・終了）の前後のサンプル
+        window_size = DENOISE_WINDOW_SECONDS * self.SAMPLE_RATE
+        overlap_size = DENOISE_OVERLAP_SECONDS * self.SAMPLE_RATE
+        for edge in (window_size - overlap_size, window_size):
+            for index in (edge - 1, edge):
+                if 0 <= index < n_samples:
+                    self.assertAlmostEqual(float(output[index]), float(pcm[index]), delta=1e-2)
+
+    def test_single_sample(self):
+        """1サンプルの信号もそのまま出力される"""
+        self.assertReconstructs(1)
+
+    def test_exactly_one_window(self):
+        """ちょうど窓1つ分（60秒）の信号は分割せずに出力される"""
+        self.assertReconstructs(60 * self.SAMPLE_RATE)
+
+    def test_window_boundaries(self):
+        """窓の長さを1秒・2秒超える信号も、長さ・境界のサンプルが元の信号と一致する"""
+        self.assertReconstructs(61 * self.SAMPLE_RATE)
+        self.assertReconstructs(62 * self.SAMPLE_RATE)
+
+
+class CompareBaselinesTest(SimpleTestCase):
+    def _baseline(self, seconds, rss_delta_mb):
+        return {'results': {'export_chunks@60min': {'seconds': seconds, 'rss_delta_mb': rss_delta_mb}}}
+
+    def test_detects_regression(self):
+        """許容範囲を超えて遅くなった項目を検出する"""
+        regressions = compare_baselines(self._baseline(2.0, 50.0), self._baseline(1.0, 50.0))
+        self.assertEqual([r['metric'] for r in regressions], ['seconds'])
+
+    def test_within_tolerance(self):
+        """許容範囲内の変化は検出しない"""
+        self.assertEqual(compare_baselines(self._baseline(1.1, 55.0), self._baseline(1.0, 50.0)), [])
+
+
+class AssignSpeakersTest(SimpleTestCase):
+    def test_picks_speaker_with_most_overlap(self):
+        """最初に重なる話者ではなく、重なりが最も大きい話者を割り当てる"""
+        segments = [{'start': 0.0, 'end': 10.0}]
+        tracks = [(0.0, 2.0, 'SPEAKER_00'), (1.5, 10.0, 'SPEAKER_01')]
+        self.assertEqual(assign_speakers(segments, tracks), ['SPEAKER_01'])
+
+    def test_turn_covering_whole_segment(self):
+        """セグメント全体を覆う話者区間も割り当てる"""
+        segments = [{'start': 3.0, 'end': 4.0}]
+        self.assertEqual(assign_speakers(segments, [(0.0, 10.0, 'SPEAKER_00')]), ['SPEAKER_00'])
+
+    def test_no_overlap(self):
+        """重なる話者区間がない場合はNone"""
+        segments = [{'start': 5.0, 'end': 6.0}]
+        self.assertEqual(assign_speakers(segments, [(0.0, 1.0, 'SPEAKER_00')]), [None])
+
+    def test_matches_naive_implementation(self):
+        """合成した3時間の会議で、総当たりの実装と同じ結果になる"""
+        segments, tracks = synthetic_meeting(180, seed=3)
+        self.assertEqual(assign_speakers(segments, tracks), assign_speakers_naive(segments, tracks))
+
+    def test_matches_naive_implementation_with_long_turns(self):
+        """会議全体にわたる区間・長く重なる区間があっても、総当たりの実装と同じ結果になる"""
+        segments, tracks = synthetic_meeting(180, seed=4, long_turns=True)
+        self.assertEqual(assign_speakers(segments, tracks), assign_speakers_naive(segments, tracks))
+
+    def test_long_turn_does_not_slow_down(self):
+        """長い話者区間が1つあっても、短い区間を毎回走査し直さない"""
+        tracks = [(0.0, 100000.0, 'SPEAKER_00')] + [(i * 2.0, i * 2.0 + 0.5, 'SPEAKER_01') for i in range(4000)]
+        segments = [{'start': i * 2.0, 'end': i * 2.0 + 1.0} for i in range(4000)]
+        started_at = time.perf_counter()
+        speakers = assign_speakers(segments, tracks)
+        self.assertLess(time.perf_counter() - started_at, 1.0)
+        self.assertEqual(speakers, ['SPEAKER_00'] * 4000)
+
+
+class HashUploadedFileTest(SimpleTestCase):
+    def test_matches_whole_file_digest(self):
+        """チャンク単位で計算したハッシュがファイル全体のSHA-256と一致する"""
+        content = bytes(range(256)) * 1024
+        upload = ContentFile(content, name='meeting.mp3')
+        self.assertEqual(hash_uploaded_file(upload), hashlib.sha256(content).hexdigest())
+
+    def test_rewinds_file(self):
+        """ハッシュ計算後も先頭から読み直せる"""
+        upload = ContentFile(b'voice', name='meeting.mp3')
+        hash_uploaded_file(upload)
+        self.assertEqual(upload.read(), b'voice')
+
+
+class ChunkResultCacheTest(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.settings_override = override_settings(TRANSCRIPTION_CHUNK_CACHE_ROOT=temp_dir.name, TRANSCRIPTION_CHUNK_CACHE_TTL=60)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.key = chunk_cache_key('0' * 64, 0, 60000, CHUNK_FORMATS['ogg'], 'whisper-1', 'ja')
+
+    def test_round_trip(self):
+        """保存した結果をそのまま読み込める"""
+        result = {'text': 'こんにちは', 'segments': [{'start': 0.0, 'end': 1.5, 'text': 'こんにちは'}]}
+        save_chunk_result(self.key, result)
+        self.assertEqual(load_chunk_result(self.key), result)
+
+    def test_key_depends_on_parameters(self):
+        """区間・形式・言語が違えば別のキーになる"""
+        keys = {
+            self.key,
+            chunk_cache_key('0' * 64, 0, 60001, CHUNK_FORMATS['ogg'], 'whisper-1', 'ja'),
+            chunk_cache_key('0' * 64, 0, 60000, CHUNK_FORMATS['mp3'], 'whisper-1', 'ja'),
+            chunk_cache_key('0' * 64, 0, 60000, CHUNK_FORMATS['ogg'], 'whisper-1', 'en'),
+        }
+        self.assertEqual(len(keys), 4)
+
+    def test_expired_result_is_evicted(self):
+        """有効期間を過ぎた結果は読み込まず、削除する"""
+        save_chunk_result(self.key, {'text': '', 'segments': []})
+        path = chunk_result_path(self.key)
+        expired = os.path.getmtime(path) - 120
+        os.utime(path, (expired, expired))
+        self.assertEqual(evict_expired_chunk_results(), 1)
+        self.assertIsNone(load_chunk_result(self.key))
+
+    def test_eviction_is_throttled(self):
+        """前回の削除から間隔が過ぎていない場合は、キャッシュを走査しない"""
+        evict_expired_chunk_results_if_due()
+        save_chunk_result(self.key, {'text': '', 'segments': []})
+        path = chunk_result_path(self.key)
+        expired = os.path.getmtime(path) - 120
+        os.utime(path, (expired, expired))
+        self.assertEqual(evict_expired_chunk_results_if_due(), 0)
+        self.assertTrue(os.path.exists(path))
+
+
+class TranscribeOpenAIRetryTest(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.settings_override = override_settings(TRANSCRIPTION_CHUNK_CACHE_ROOT=temp_dir.name, TRANSCRIPTION_CHUNK_CACHE_TTL=60)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.artifact = mock.Mock(path=os.path.join(temp_dir.name, 'audio.pcm'), duration_ms=120000)
+        self.artifact.content_hash.return_value = '0' * 64
+
+    @staticmethod
+    def _export_chunks(artifact, output_dir, chunks, chunk_format):
+        return [ChunkManifestEntry(f"{start_ms}.ogg", start_ms, end_ms, 0) for start_ms, end_ms in chunks]
+
+    def test_retry_sends_only_failed_chunks(self):
+        """一部の分割ファイルが失敗した場合はステージを失敗させ、リトライ時は失敗した分割ファイルだけを送る"""
+        from voice_picker import views
+
+        first = {'text': 'こんにちは', 'segments': [{'start': 0.0, 'end': 1.0, 'text': 'こんにちは'}]}
+        second = {'text': 'さようなら', 'segments': [{'start': 0.0, 'end': 1.0, 'text': 'さようなら'}]}
+        with mock.patch.object(views, 'plan_audio_chunks', return_value=[(0, 60000), (60000, 120000)]), \
+                mock.patch.object(views, 'export_chunks', side_effect=self._export_chunks), \
+                mock.patch.object(views, 'transcribe_chunks', side_effect=[[first, None], [second]]) as transcribe_chunks:
+            with self.assertRaises(PipelineError):
+                views.transcribe_openai(self.artifact)
+            result = views.transcribe_openai(self.artifact)
+
+        retried_manifest = transcribe_chunks.call_args_list[1].args[0]
+        self.assertEqual([(chunk.start_ms, chunk.end_ms) for chunk in retried_manifest], [(60000, 120000)])
+        self.assertEqual([segment['start'] for segment in result['segments']], [0.0, 60.0])
+        self.assertEqual(result['text'], 'こんにちは さようなら')
+
+
+class LoadStageOutputTest(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'audio.transcribe.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"text": "こんにちは", "segments": []}')
+
+    def test_completed_stage_is_resumed(self):
+        """完了済みのステージは保存した出力から再開する"""
+        record = ProcessingStage(name='transcribe', status=StageStatus.COMPLETED, artifact_path=self.path)
+        self.assertEqual(_load_stage_output(record), {'text': 'こんにちは', 'segments': []})
+
+    def test_unfinished_stage_is_rerun(self):
+        """実行中のまま止まったステージ・失敗したステージはやり直す"""
+        for status in (StageStatus.RUNNING, StageStatus.FAILED):
+            record = ProcessingStage(name='transcribe', status=status, artifact_path=self.path)
+            self.assertIsNone(_load_stage_output(record))
+
+    def test_missing_output_is_rerun(self):
+        """出力が失われている場合は完了済みでもやり直す"""
+        os.remove(self.path)
+        record = ProcessingStage(name='transcribe', status=StageStatus.COMPLETED, artifact_path=self.path)
+        self.assertIsNone(_load_stage_output(record))
+
+    def test_skipped_stage_has_empty_output(self):
+        """スキップしたステージは空の出力で再開する"""
+        self.assertEqual(_load_stage_output(ProcessingStage(name='diarize', status=StageStatus.SKIPPED)), {})
+
+
+class SegmentValidationTest(SimpleTestCase):
+    def test_normalizes_segment(self):
+        """開始時間は整数に、テキストは前後の空白を除き、空の話者はNoneにする"""
+        self.assertEqual(
+            validate_segment({'start_time': 12.7, 'text': ' こんにちは\n', 'speaker': ''}),
+            {'start_time': 12, 'text': 'こんにちは', 'speaker': None},
+        )
+
+    def test_rejects_invalid_segments(self):
+        """開始時間・テキストがない、話者ラベルが長すぎるレコードは保存しない"""
+        self.assertIsNone(validate_segment({'start_time': None, 'text': 'a', 'speaker': None}))
+        self.assertIsNone(validate_segment({'start_time': 0, 'text': '', 'speaker': None}))
+        self.assertIsNone(validate_segment({'start_time': 0, 'text': ' \n\t', 'speaker': None}))
+        self.assertIsNone(validate_segment({'start_time': 0, 'text': 'a', 'speaker': 'S' * 101}))
+
+    def test_builds_unsaved_instances(self):
+        """保存できるレコードだけを、DBに問い合わせずにインスタンスにする"""
+        rows = [
+            {'start_time': 0, 'text': 'はじめに', 'speaker': 'SPEAKER_00'},
+            {'start_time': 30, 'text': '', 'speaker': 'SPEAKER_01'},
+        ]
+        transcriptions = build_transcriptions('00000000-0000-0000-0000-000000000000', rows)
+        self.assertEqual([(t.start_time, t.text, t.speaker) for t in transcriptions], [(0, 'はじめに', 'SPEAKER_00')])
+
+
+class ModelIndexDefinitionTest(SimpleTestCase):
+    """主要な検索に対応する複合インデックスが定義されていることを確認する（DBの実行計画に依存しない）"""
+
+    def assertIndex(self, model, index_name, fields):
+        indexes = {index.name: list(index.fields) for index in model._meta.indexes}
+        self.assertEqual(indexes.get(index_name), fields)
+
+    def test_uploaded_file_indexes(self):
+        """ファイル一覧（キーセット）・利用時間の再集計・ステータスとエンジンごとの件数"""
+        self.assertIndex(UploadedFile, 'uploadedfile_org_created', ['organization', 'created_at', 'id'])
+        self.assertIndex(UploadedFile, 'uploadedfile_org_exist_created', ['organization', 'exist', 'created_at', 'duration'])
+        self.assertIndex(UploadedFile, 'uploadedfile_status', ['status', 'engine'])
+
+    def test_transcription_indexes(self):
+        """ファイルの文字起こしを再生時間順・作成順に取得"""
+        self.assertIndex(Transcription, 'transcription_file_start', ['uploaded_file', 'start_time'])
+        self.assertIndex(Transcription, 'transcription_file_created', ['uploaded_file', 'created_at', 'start_time'])
+
+
+@skipUnless(connection.vendor == 'mysql', '実行計画の確認は本番と同じMySQLでのみ行う')
+class QueryPlanIndexTest(TestCase):
+    """主要な検索が複合インデックスを使うことを、実行計画で確認する"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizations = [
+            Organization.objects.create(name=f"組織{index}", phone_number='090-0000-0000')
+            for index in range(20)
+        ]
+        UploadedFile.objects.bulk_create([
+            UploadedFile(
+                organization=organization,
+                file=f"{organization.id}/meeting_{index}.mp3",
+                status=Status.COMPLETED if index % 5 else Status.UNPROCESSED,
+                duration=float(index * 60),
+                exist=index % 7 != 0,
+            )
+            for organization in organizations
+            for index in range(50)
+        ])
+        cls.organization = organizations[0]
+        cls.uploaded_file = UploadedFile.objects.filter(organization=cls.organization).first()
+        Transcription.objects.bulk_create([
+            Transcription(uploaded_file=uploaded_file, start_time=index * 30, text='テスト', speaker='SPEAKER_00')
+            for uploaded_file in UploadedFile.objects.all()[:40]
+            for index in range(50)
+        ])
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+
+    def test_usage_aggregate(self):
+        """利用時間の台帳の再集計（OrganizationUsage.aggregate）"""
+        period_start, period_end = usage_period(self.organization)
+        queryset = UploadedFile.objects.filter(
+            organization=self.organization,
+            exist=True,
+            created_at__gte=period_start,
+            created_at__lte=period_end,
+        ).values_list('duration', flat=True)
+        self.assertUsesIndex(queryset, 'uploadedfile_org_exist_created')
+
+    def test_list(self):
+        """組織のファイル一覧（2ページ目以降のキーセットページネーション）"""
+        last = UploadedFile.objects.filter(organization=self.organization).order_by('-created_at', '-id')[10]
+        cursor = KeysetCursorPagination.encode_cursor(last.created_at, last.pk)
+        queryset = KeysetCursorPagination().keyset_queryset(UploadedFile.objects.filter(organization=self.organization), cursor)
+        self.assertUsesIndex(queryset, 'uploadedfile_org_created')
+
+    def test_local_queue_depth(self):
+        """ローカルのエンジンで処理中のファイル数（キューの混雑度）"""
+        queryset = UploadedFile.objects.filter(status=Status.PROCESSING, engine__in=['local-whisper', 'vosk'])
+        self.assertUsesIndex(queryset, 'uploadedfile_status')
+
+    def test_transcriptions_by_start_time(self):
+        """ファイルの文字起こしを再生時間順に取得"""
+        queryset = self.uploaded_file.transcription.all().order_by('start_time')
+        self.assertUsesIndex(queryset, 'transcription_file_start')
+
+    def test_transcriptions_by_created_at(self):
+        """ファイルの文字起こしを作成順に取得"""
+        queryset = Transcription.objects.filter(uploaded_file__id=self.uploaded_file.id).order_by('created_at', 'start_time', 'id')
+        self.assertUsesIndex(queryset, 'transcription_file_created')
+
+
+class OrganizationUsageTest(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name='テスト組織', phone_number='090-0000-0000')
+        # 台帳を先に作っておき、以降は差分の加算で更新されることを確認する
+        self.usage = OrganizationUsage.current(self.organization)
+
+    def create_file(self, duration):
+        return UploadedFile.objects.create(organization=self.organization, file=f"{self.organization.id}/meeting.mp3", duration=duration)
+
+    def assertLedgerMatchesSum(self):
+        self.usage.refresh_from_db()
+        expected = OrganizationUsage.aggregate(self.organization, self.usage.period_start, self.usage.period_end)
+        self.assertAlmostEqual(self.usage.total_duration, expected)
+
+    def test_create_and_reprobe(self):
+        """作成・再生時間の更新で台帳が加算される（再生時間が未取得のファイルは0秒）"""
+        uploaded_file = self.create_file(None)
+        self.assertLedgerMatchesSum()
+        uploaded_file.duration = 120.0
+        uploaded_file.save(update_fields=['duration'])
+        self.create_file(30.0)
+        self.assertLedgerMatchesSum()
+        self.assertAlmostEqual(self.usage.total_duration, 150.0)
+
+    def test_soft_delete(self):
+        """論理削除したファイルは台帳から差し引く"""
+        uploaded_file = self.create_file(60.0)
+        self.create_file(45.0)
+        uploaded_file.delete()
+        self.assertLedgerMatchesSum()
+        self.assertAlmostEqual(self.usage.total_duration, 45.0)
+
+    def test_current_reads_single_row(self):
+        """台帳がある場合、利用時間の取得はファイル数によらず一定のクエリ数で済む"""
+        for _ in range(5):
+            self.create_file(10.0)
+        with self.assertNumQueries(2):
+            self.assertAlmostEqual(OrganizationUsage.current(self.organization).total_duration, 50.0)
+
+    def test_reconcile_fixes_drift(self):
+        """台帳がずれた場合は、Sumで集計し直して修正する"""
+        self.create_file(90.0)
+        OrganizationUsage.objects.filter(pk=self.usage.pk).update(total_duration=0)
+        usage = OrganizationUsage.reconcile(self.organization, self.usage.period_start, self.usage.period_end)
+        self.assertAlmostEqual(usage.total_duration, 90.0)
+
+
+class KeysetCursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='テスト組織', phone_number='090-0000-0000')
+        UploadedFile.objects.bulk_create([
+            UploadedFile(organization=cls.organization, file=f"{cls.organization.id}/meeting_{index}.mp3")
+            for index in range(7)
+        ])
+        # 作成日時が同じ行をページの境界に置く
+        UploadedFile.objects.filter(organization=cls.organization).update(created_at=timezone.now())
+
+    def paginate(self, **params):
+        paginator = KeysetCursorPagination()
+        request = Request(APIRequestFactory().get('/api/uploadedfiles/', params))
+        page = paginator.paginate_queryset(UploadedFile.objects.filter(organization=self.organization), request)
+        return page, paginator.next_cursor
+
+    def test_walks_all_rows_without_duplicates(self):
+        """作成日時が同じ行があっても、全ページで重複・欠落なく1回ずつ返す"""
+        seen = []
+        page, cursor = self.paginate(page_size=3)
+        seen.extend(page)
+        while cursor:
+            page, cursor = self.paginate(page_size=3, cursor=cursor)
+            seen.extend(page)
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len({uploaded_file.id for uploaded_file in seen}), 7)
+        self.assertEqual(seen, sorted(seen, key=lambda uploaded_file: (uploaded_file.created_at, uploaded_file.id), reverse=True))
+
+    def test_cursor_round_trip(self):
+        """カーソルから(作成日時, ID)を復元できる"""
+        created_at, pk = timezone.now(), uuid.uuid4()
+        self.assertEqual(KeysetCursorPagination.decode_cursor(KeysetCursorPagination.encode_cursor(created_at, pk)), (created_at, pk))
+
+    def test_invalid_cursor(self):
+        """不正なカーソルはNotFound"""
+        with self.assertRaises(NotFound):
+            KeysetCursorPagination.decode_cursor('invalid')
+
+
+class UploadedFileSerializerFieldsTest(SimpleTestCase):
+    def test_list_serializer_omits_analysis_text(self):
+        """一覧用のシリアライザは要約・課題点・取り組み案を含めない"""
+        fields = set(UploadedFileListSerializer().fields)
+        self.assertFalse(fields & {'summarization', 'issue', 'solution'})
+
+    def test_sparse_fieldset(self):
+        """fieldsを指定した場合は指定したフィールドだけを返す"""
+        self.assertEqual(set(UploadedFileSerializer(fields=['id', 'summarization']).fields), {'id', 'summarization'})
+
+    def test_all_fields_by_default(self):
+        """fieldsを指定しない場合はすべてのフィールドを返す"""
+        self.assertIn('solution', UploadedFileSerializer().fields)
+
+
+class UploadedFileListQueryTest(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name='テスト組織', phone_number='090-0000-0000')
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123',
+            organization=self.organization,
+            is_active=True,
+        )
+        UploadedFile.objects.create(organization=self.organization, file=f"{self.organization.id}/meeting.mp3", summarization='要約' * 1000)
+
+    def get(self, action, path='/api/uploaded-files/', **kwargs):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=self.user)
+        return UploadedFileViewSet.as_view({'get': action})(request, **kwargs)
+
+    def test_list_defers_text_columns(self):
+        """一覧のビューは大きなTEXT列を読み込まずに返す"""
+        pages = []
+        paginate_queryset = KeysetCursorPagination.paginate_queryset
+
+        def capture_page(paginator, queryset, request, view=None):
+            page = paginate_queryset(paginator, queryset, request, view)
+            pages.append(page)
+            return page
+
+        with mock.patch.object(KeysetCursorPagination, 'paginate_queryset', capture_page):
+            response = self.get('list')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertNotIn('summarization', response.data['results'][0])
+        [uploaded_file] = pages[0]
+        self.assertTrue({'summarization', 'issue', 'solution'} <= uploaded_file.get_deferred_fields())
+
+    def test_list_ignores_fields_param(self):
+        """?fields=は詳細だけの指定のため、一覧では無視する"""
+        response = self.get('list', path='/api/uploaded-files/?fields=unknown')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(TRANSCRIPTION_ENGINE='', TRANSCRIPTION_LOCAL_QUEUE_LIMIT=2, TRANSCRIPTION_LOCAL_MAX_SECONDS=3600)
+class RouteEngineTest(SimpleTestCase):
+    def setUp(self):
+        # Voskのモデルが配置されている環境として扱う
+        registry = dict(ENGINE_REGISTRY, vosk=dataclasses.replace(ENGINE_REGISTRY['vosk'], available=lambda: True))
+        patcher = mock.patch.dict(ENGINE_REGISTRY, registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, free: bool, duration_seconds: float, queue_depth: int = 0) -> str:
+        organization = mock.Mock(is_free_user=mock.Mock(return_value=free))
+        return route_engine(organization, duration_seconds, queue_depth=queue_depth).name
+
+    def test_paid_plan_uses_local_whisper(self):
+        """有料プランで短い録音・キューが空いている場合は、話者分離できるローカルのWhisperを使う"""
+        self.assertEqual(self.route(free=False, duration_seconds=600), 'local-whisper')
+
+    def test_free_plan_uses_vosk(self):
+        """無料プランは長くても混雑していてもVoskで処理する"""
+        self.assertEqual(self.route(free=True, duration_seconds=600), 'vosk')
+        self.assertEqual(self.route(free=True, duration_seconds=3 * 3600, queue_depth=10), 'vosk')
+
+    def test_queue_pressure_routes_paid_plan_to_api(self):
+        """ローカルのキューが上限以上の場合、有料プランはAPIに振り分ける"""
+        self.assertEqual(self.route(free=False, duration_seconds=600, queue_depth=1), 'local-whisper')
+        self.assertEqual(self.route(free=False, duration_seconds=600, queue_depth=2), 'openai-api')
+
+    def test_long_recording_routes_paid_plan_to_api(self):
+        """有料プランで上限より長い録音は、キューが空いていてもAPIに振り分ける"""
+        self.assertEqual(self.route(free=False, duration_seconds=3600), 'local-whisper')
+        self.assertEqual(self.route(free=False, duration_seconds=3601), 'openai-api')
+        with override_settings(TRANSCRIPTION_LOCAL_MAX_SECONDS=0):
+            self.assertEqual(self.route(free=False, duration_seconds=3 * 3600), 'local-whisper')
+
+    def test_forced_engine(self):
+        """TRANSCRIPTION_ENGINEを指定した場合は、プラン・長さ・混雑度によらずそのエンジンを使う"""
+        with override_settings(TRANSCRIPTION_ENGINE='openai-api'):
+            self.assertEqual(self.route(free=True, duration_seconds=60), 'openai-api')
+        with override_settings(TRANSCRIPTION_ENGINE='local-whisper'):
+            self.assertEqual(self.route(free=False, duration_seconds=3 * 3600, queue_depth=10), 'local-whisper')
+
+
+class SilenceIndexTest(SimpleTestCase):
+    SAMPLE_RATE = 16000
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.artifact = PcmArtifact(os.path.join(temp_dir.name, 'audio.pcm'), sample_rate=self.SAMPLE_RATE)
+        # 音2秒・無音2秒・音1秒・無音0.5秒（最小無音長未満）・音1秒
+        np.concatenate([
+            self.tone(2), self.silence(2), self.tone(1), self.silence(0.5), self.tone(1),
+        ]).tofile(self.artifact.path)
+
+    def tone(self, seconds: float) -> np.ndarray:
+        t = np.arange(int(seconds * self.SAMPLE_RATE)) / self.SAMPLE_RATE
+        return (10000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+    def silence(self, seconds: float) -> np.ndarray:
+        return np.zeros(int(seconds * self.SAMPLE_RATE), dtype=np.int16)
+
+    def test_compute(self):
+        """最小無音長以上の無音だけを無音区間として検出する"""
+        index = SilenceIndex.compute(self.artifact)
+        self.assertEqual(index.duration_ms, 6500)
+        self.assertEqual(index.silence_ranges(), [(2000, 4000)])
+        self.assertEqual(index.split_points(), [3000])
+        self.assertEqual(index.speech_ranges(), [(0, 2000), (4000, 6500)])
+
+    def test_shorter_min_silence_len(self):
+        """最小無音長を短くすると、短い無音も無音区間になる"""
+        index = SilenceIndex.compute(self.artifact, min_silence_len=500)
+        self.assertEqual(index.silence_ranges(), [(2000, 4000), (5000, 5500)])
+        self.assertEqual(index.speech_ranges(), [(0, 2000), (4000, 5000), (5500, 6500)])
+
+    def test_speech_ranges_with_leading_and_trailing_silence(self):
+        """先頭・末尾の無音は発話区間に含めない"""
+        index = SilenceIndex(np.array([[0, 1000], [3000, 4000], [5000, 6000]]), 6000)
+        self.assertEqual(index.speech_ranges(), [(1000, 3000), (4000, 5000)])
+        self.assertEqual(index.speech_bounds(), (1000, 5000))
+
+    def test_best_split_point(self):
+        """範囲内（両端を含まない）で終了位置に最も近い無音区間の中央を返す"""
+        index = SilenceIndex(np.array([[1000, 2000], [5000, 6000], [9000, 10000]]), 12000)
+        self.assertEqual(index.best_split_point(0, 9000), 5500)
+        self.assertEqual(index.best_split_point(0, 12000), 9500)
+        self.assertIsNone(index.best_split_point(0, 1500))
+        self.assertIsNone(index.best_split_point(1500, 5500))
+
+    def test_nearest_split_point(self):
+        """範囲内（開始を含まず終了を含む）で目標位置に最も近い無音区間の中央を返す"""
+        index = SilenceIndex(np.array([[1000, 2000], [5000, 6000], [9000, 10000]]), 12000)
+        self.assertEqual(index.nearest_split_point(5000, 0, 12000), 5500)
+        self.assertEqual(index.nearest_split_point(8000, 0, 12000), 9500)
+        self.assertEqual(index.nearest_split_point(1000, 1500, 5500), 5500)
+        self.assertIsNone(index.nearest_split_point(3000, 1500, 5000))
+
+    def test_save_load_round_trip(self):
+        """保存した無音インデックスを読み込むと同じ内容になる"""
+        index = SilenceIndex.compute(self.artifact, silence_thresh=-35, min_silence_len=500)
+        index.save(self.artifact.silence_index_path)
+        loaded = SilenceIndex.load(self.artifact.silence_index_path)
+        np.testing.assert_array_equal(loaded.silences, index.silences)
+        self.assertEqual(loaded.duration_ms, index.duration_ms)
+        self.assertTrue(loaded.matches(-35, 500))
+
+    def test_ensure_saves_and_reuses_default_index(self):
+        """既定の閾値で計算した無音インデックスは保存し、次回は再計算しない"""
+        index = ensure_silence_index(self.artifact)
+        self.assertTrue(os.path.exists(self.artifact.silence_index_path))
+        with mock.patch.object(SilenceIndex, 'compute') as compute:
+            reused = ensure_silence_index(self.artifact)
+        compute.assert_not_called()
+        self.assertEqual(reused.silence_ranges(), index.silence_ranges())
+
+    def test_ensure_skips_saving_non_default_index(self):
+        """既定以外の閾値で計算した無音インデックスは保存しない"""
+        index = ensure_silence_index(self.artifact, min_silence_len=500)
+        self.assertEqual(index.silence_ranges(), [(2000, 4000), (5000, 5500)])
+        self.assertFalse(os.path.exists(self.artifact.silence_index_path))
+
+
+class ProbeDurationTest(SimpleTestCase):
+    # MPEG1 Layer III・128kbps・44.1kHz・ステレオのフレームヘッダ
+    MP3_FRAME_HEADER = b'\xff\xfb\x90\x00'
+    MP3_SIDE_INFO = bytes(32)
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        # ffprobeを使わず、ヘッダの解析だけを確認する
+        patcher = mock.patch('voice_picker.services.media_probe.probe_duration_ffprobe', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def probe(self, name: str, data: bytes):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return probe_duration(path)
+
+    def wav(self, byte_rate: int, data_size: int, data: bytes) -> bytes:
+        fmt = struct.pack('<HHIIHH', 1, 1, byte_rate // 2, byte_rate, 2, 16)
+        chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+        chunks += b'LIST' + struct.pack('<I', 3) + b'abc\x00'
+        chunks += b'data' + struct.pack('<I', data_size) + data
+        return b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks
+
+    def box(self, box_type: bytes, payload: bytes) -> bytes:
+        return struct.pack('>I', 8 + len(payload)) + box_type + payload
+
+    def test_wav(self):
+        """fmtのバイトレートとdataチャンクのサイズから再生時間を計算する"""
+        self.assertEqual(self.probe('audio.wav', self.wav(32000, 48000, bytes(48000))), 1.5)
+
+    def test_wav_with_unknown_data_size(self):
+        """dataチャンクのサイズが未確定の場合はファイル末尾までをデータとみなす"""
+        self.assertEqual(self.probe('audio.wav', self.wav(32000, 0xFFFFFFFF, bytes(16000))), 0.5)
+
+    def test_mp4_mvhd(self):
+        """moovがmdatより後ろにあっても、mvhdのtimescaleとdurationから再生時間を取得する"""
+        mvhd_v0 = self.box(b'mvhd', bytes(4) + struct.pack('>IIII', 0, 0, 1000, 90500) + bytes(80))
+        data = self.box(b'ftyp', b'M4A \x00\x00\x00\x00') + self.box(b'mdat', bytes(1024)) + self.box(b'moov', mvhd_v0)
+        self.assertEqual(self.probe('audio.m4a', data), 90.5)
+
+        mvhd_v1 = self.box(b'mvhd', b'\x01\x00\x00\x00' + struct.pack('>QQIQ', 0, 0, 600, 5 * 3600 * 600) + bytes(80))
+        self.assertEqual(self.probe('video.mp4', self.box(b'moov', mvhd_v1)), 5 * 3600)
+
+    def test_mp3_xing(self):
+        """Xingヘッダがある場合はフレーム数から再生時間を計算する"""
+        xing = b'Xing' + struct.pack('>II', 0x1, 100)
+        data = self.MP3_FRAME_HEADER + self.MP3_SIDE_INFO + xing + bytes(1000)
+        self.assertAlmostEqual(self.probe('audio.mp3', data), 100 * 1152 / 44100)
+
+    def test_mp3_vbri(self):
+        """VBRIヘッダがある場合はフレーム数から再生時間を計算する"""
+        vbri = b'VBRI' + struct.pack('>HHHII', 1, 0, 75, 0, 250)
+        data = self.MP3_FRAME_HEADER + self.MP3_SIDE_INFO + vbri + bytes(1000)
+        self.assertAlmostEqual(self.probe('audio.mp3', data), 250 * 1152 / 44100)
+
+    def test_mp3_cbr(self):
+        """Xing/VBRIヘッダがない場合は、ID3タグを除いたサイズとビットレートから計算する"""
+        id3v2 = b'ID3\x03\x00\x00' + bytes([0, 0, 0, 100]) + bytes(100)
+        id3v1 = b'TAG' + bytes(125)
+        data = id3v2 + self.MP3_FRAME_HEADER + bytes(16000 - 4) + id3v1
+        self.assertEqual(self.probe('audio.mp3', data), 1.0)
+
+    def test_truncated_or_garbage_returns_none(self):
+        """ヘッダが途中で切れている・解析できない場合は例外を送出せずNoneを返す"""
+        garbage = b'not an audio file' * 100
+        for name in ('audio.wav', 'audio.mp3', 'audio.m4a'):
+            self.assertIsNone(self.probe(name, b''))
+            self.assertIsNone(self.probe(name, garbage))
+
+        wav = self.wav(32000, 48000, bytes(48000))
+        self.assertIsNone(self.probe('audio.wav', wav[:8]))
+        self.assertIsNone(self.probe('audio.wav', wav[:24]))
+
+        mvhd = self.box(b'mvhd', bytes(4) + struct.pack('>IIII', 0, 0, 1000, 90500))
+        moov = self.box(b'moov', mvhd)
+        self.assertIsNone(self.probe('audio.m4a', moov[:-8]))
+        self.assertIsNone(self.probe('audio.m4a', moov[:-16]))
+        self.assertIsNone(self.probe('audio.m4a', moov[:16]))
+        self.assertIsNone(self.probe('audio.m4a', struct.pack('>I', 1) + b'moov' + bytes(4)))
+
+        xing = self.MP3_FRAME_HEADER + self.MP3_SIDE_INFO + b'Xing' + struct.pack('>II', 0x1, 100)
+        self.assertIsNone(self.probe('audio.mp3', xing[:-2]))
+        self.assertIsNone(self.probe('audio.mp3', xing[:-6]))
+        vbri = self.MP3_FRAME_HEADER + self.MP3_SIDE_INFO + b'VBRI' + struct.pack('>HHHII', 1, 0, 75, 0, 250)
+        self.assertIsNone(self.probe('audio.mp3', vbri[:-2]))
+
+
+class PlanChunksTest(SimpleTestCase):
+    def assertContiguous(self, chunks, total_duration_ms):
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], total_duration_ms)
+        for (_, end_ms), (start_ms, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end_ms, start_ms)
+
+    def test_chunks_stay_within_bitrate_cap(self):
+        """どの形式のビットレートでも、各チャンクはアップロード上限に収まる長さになる"""
+        total_duration_ms = 5 * 3600 * 1000
+        # 1分ごとに1秒の無音がある録音
+        silences = np.array([[start, start + 1000] for start in range(59000, total_duration_ms, 60000)])
+        for chunk_format in CHUNK_FORMATS.values():
+            bitrate = chunk_format['bitrate']
+            max_ms = max_chunk_duration_ms(bitrate=bitrate)
+            self.assertLessEqual(max_ms / 1000 * bitrate / 8, OPENAI_MAX_UPLOAD_MB * 1024 * 1024)
+            for silence_index in (None, SilenceIndex(silences, total_duration_ms)):
+                chunks = plan_chunks(total_duration_ms, silence_index, bitrate=bitrate)
+                self.assertContiguous(chunks, total_duration_ms)
+                self.assertTrue(all(end_ms - start_ms <= max_ms for start_ms, end_ms in chunks))
+
+    def test_short_audio_is_not_split(self):
+        """上限より短い音声は分割しない"""
+        self.assertEqual(plan_split_ranges(9000, 10000), [(0, 9000)])
+
+    def test_splits_at_silence(self):
+        """目標位置に最も近い、最大長の後半にある無音区間の中央で分割する"""
+        # 無音区間の中央: 3000（前半のため対象外）、7000、8500、18000
+        silences = np.array([[2500, 3500], [6500, 7500], [8000, 9000], [17500, 18500]])
+        chunks = plan_split_ranges(25000, 10000, SilenceIndex(silences, 25000))
+        self.assertEqual(chunks, [(0, 8500), (8500, 18000), (18000, 25000)])
+
+    def test_balanced_splits_without_silence(self):
+        """無音区間がない場合は、最小の区間数で均等な長さに分割する"""
+        expected = [(0, 8334), (8334, 16668), (16668, 25000)]
+        self.assertEqual(plan_split_ranges(25000, 10000), expected)
+        self.assertEqual(plan_split_ranges(25000, 10000, SilenceIndex(np.zeros((0, 2)), 25000)), expected)
+        # 無音区間が最大長の前半にしかない場合も同じ
+        self.assertEqual(plan_split_ranges(25000, 10000, SilenceIndex(np.array([[1000, 2000]]), 25000)), expected)
+
+
+class FakeClock:
+    """time.monotonic / time.sleepの代わりに使う、sleepした分だけ進む時計"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTest(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('voice_picker.services.openai_dispatch.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_capacity_then_blocks(self):
+        """容量分は待たずに取得でき、それ以降は補充されるまで待機する"""
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [1.0])
+
+    def test_refills_with_elapsed_time(self):
+        """経過時間に応じて補充され、補充は容量までで止まる"""
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 0.5
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+        self.clock.now += 100
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5])
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5, 1.0])
+
+
+class TranscribeChunksTest(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.manifest = []
+        for chunk_index in range(3):
+            path = os.path.join(temp_dir.name, f'audio_chunk_{chunk_index:03d}.ogg')
+            with open(path, 'wb') as f:
+                f.write(b'chunk')
+            self.manifest.append(ChunkManifestEntry(path, chunk_index * 1000, (chunk_index + 1) * 1000, 5))
+
+    def test_keeps_manifest_order_when_completed_out_of_order(self):
+        """後ろの分割ファイルから先に完了しても、結果はマニフェストの順で返す"""
+        paths = [chunk.path for chunk in self.manifest]
+        done = [threading.Event() for _ in paths]
+        completed = []
+
+        def transcribe(path):
+            chunk_index = paths.index(path)
+            # 次の分割ファイルの完了を待ってから完了する（2, 1, 0の順）
+            if chunk_index + 1 < len(paths):
+                self.assertTrue(done[chunk_index + 1].wait(timeout=5))
+            completed.append(chunk_index)
+            done[chunk_index].set()
+            return {'text': str(chunk_index)}
+
+        results = transcribe_chunks(self.manifest, transcribe, max_in_flight=3)
+        self.assertEqual(completed, [2, 1, 0])
+        self.assertEqual([result['text'] for result in results], ['0', '1', '2'])
+
+    def test_removes_chunk_files_even_when_transcribe_raises(self):
+        """文字起こしが例外を送出・失敗した分割ファイルも削除し、結果はNoneにする"""
+        def transcribe(path):
+            if path == self.manifest[1].path:
+                raise RuntimeError('API error')
+            if path == self.manifest[2].path:
+                return None
+            return {'text': 'ok'}
+
+        results = transcribe_chunks(self.manifest, transcribe, max_in_flight=2)
+        self.assertEqual(results, [{'text': 'ok'}, None, None])
+        self.assertFalse(any(os.path.exists(chunk.path) for chunk in self.manifest))
+
+
+class ReuseProcessedDuplicateTest(TestCase):
+    CONTENT_HASH = 'a' * 64
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='テスト組織', phone_number='090-0000-0000')
+        self.other_organization = Organization.objects.create(name='別の組織', phone_number='090-1111-1111')
+
+    def create_file(self, organization, status=Status.UNPROCESSED, **fields):
+        return UploadedFile.objects.create(
+            organization=organization,
+            file=f"{organization.id}/meeting.mp3",
+            content_hash=self.CONTENT_HASH,
+            status=status,
+            **fields,
+        )
+
+    def create_source(self, organization, status=Status.COMPLETED, **fields):
+        source = self.create_file(organization, status, summarization='要約', issue='課題', solution='取り組み案', duration=120.0, **fields)
+        Transcription.objects.create(uploaded_file=source, start_time=0, text='こんにちは', speaker='SPEAKER_00')
+        Transcription.objects.create(uploaded_file=source, start_time=5, text='よろしくお願いします', speaker='SPEAKER_01')
+        Transcription.objects.create(uploaded_file=source, start_time=9, text='削除済み', speaker='SPEAKER_00', exist=False)
+        return source
+
+    def rows(self, uploaded_file):
+        return list(
+            Transcription.objects.filter(uploaded_file=uploaded_file, exist=True)
+            .order_by('start_time')
+            .values_list('start_time', 'text', 'speaker')
+        )
+
+    def test_clones_same_organization_duplicate(self):
+        """同じ組織の処理済みファイルから、文字起こしと要約・課題点・取り組み案をコピーして処理済みにする"""
+        source = self.create_source(self.organization)
+        target = self.create_file(self.organization)
+
+        self.assertEqual(reuse_processed_duplicate(target), source)
+
+        target.refresh_from_db()
+        self.assertEqual(target.status, Status.COMPLETED)
+        self.assertEqual((target.summarization, target.issue, target.solution), ('要約', '課題', '取り組み案'))
+        self.assertEqual(target.duration, 120.0)
+        self.assertEqual(self.rows(target), [(0, 'こんにちは', 'SPEAKER_00'), (5, 'よろしくお願いします', 'SPEAKER_01')])
+        self.assertEqual(self.rows(target), self.rows(source))
+
+    def test_ignores_other_organization(self):
+        """別の組織にある同一内容のファイルは再利用しない"""
+        self.create_source(self.other_organization)
+        target = self.create_file(self.organization)
+
+        self.assertIsNone(reuse_processed_duplicate(target))
+
+        target.refresh_from_db()
+        self.assertEqual(target.status, Status.UNPROCESSED)
+        self.assertEqual(self.rows(target), [])
+
+    def test_ignores_unfinished_or_deleted_source(self):
+        """処理済みでない・削除済みのファイルは再利用しない"""
+        for status in (Status.UNPROCESSED, Status.PROCESSING, Status.ERROR):
+            self.create_source(self.organization, status=status)
+        self.create_source(self.organization, exist=False)
+        target = self.create_file(self.organization)
+
+        self.assertIsNone(reuse_processed_duplicate(target))
+
+        target.refresh_from_db()
+        self.assertEqual(target.status, Status.UNPROCESSED)
+        self.assertEqual(self.rows(target), [])
+
+
+class VoskSegmentTest(SimpleTestCase):
+    def test_segment_from_words(self):
+        """単語の先頭・末尾の時刻を区間とし、単語を空白なしで連結する"""
+        result = {
+            'result': [
+                {'conf': 1.0, 'start': 1.25, 'end': 1.5, 'word': 'こんにちは'},
+                {'conf': 0.9, 'start': 1.5, 'end': 2.0, 'word': '世界'},
+            ],
+            'text': 'こんにちは 世界',
+        }
+        self.assertEqual(_segment_from_result(json.dumps(result)), {'start': 1.25, 'end': 2.0, 'text': 'こんにちは世界'})
+
+    def test_no_words(self):
+        """単語がない結果（空のresult・resultなし）はNone"""
+        self.assertIsNone(_segment_from_result(json.dumps({'result': [], 'text': ''})))
+        self.assertIsNone(_segment_from_result(json.dumps({'text': ''})))
+
+
+class SpeakerTrackStoreTest(SimpleTestCase):
+    TRACKS = [(0.0, 2.5, 'SPEAKER_00'), (2.25, 10.125, 'SPEAKER_01'), (12.0, 3600.5, 'SPEAKER_00')]
+
+    def assertTracksEqual(self, actual, expected):
+        self.assertEqual([speaker for _, _, speaker in actual], [speaker for _, _, speaker in expected])
+        np.testing.assert_allclose([track[:2] for track in actual], [track[:2] for track in expected], atol=1e-3)
+
+    def test_rttm_round_trip(self):
+        """RTTMに書き出して読み込むと、開始時刻順の同じ区間に戻る（SPEAKER以外の行は無視する）"""
+        rttm = tracks_to_rttm(list(reversed(self.TRACKS)), uri='meeting')
+        self.assertTracksEqual(parse_rttm(rttm), self.TRACKS)
+        self.assertTracksEqual(parse_rttm('SPKR-INFO meeting 1 <NA> <NA> <NA> unknown SPEAKER_00 <NA> <NA>\n' + rttm), self.TRACKS)
+        self.assertEqual(parse_rttm(tracks_to_rttm([])), [])
+
+    def test_save_and_load(self):
+        """保存した話者分離の結果はモデルごとに読み込める"""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        content_hash = 'b' * 64
+        with override_settings(DIARIZATION_CACHE_ROOT=temp_dir.name):
+            self.assertIsNone(load_speaker_tracks(content_hash, 'pyannote/speaker-diarization-3.1'))
+            save_speaker_tracks(content_hash, 'pyannote/speaker-diarization-3.1', self.TRACKS)
+            self.assertTracksEqual(load_speaker_tracks(content_hash, 'pyannote/speaker-diarization-3.1'), self.TRACKS)
+            self.assertIsNone(load_speaker_tracks(content_hash, 'pyannote/speaker-diarization-3.0'))
+
+
+class ShardedTranscriptionTest(SimpleTestCase):
+    SAMPLE_RATE = 16000
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.artifact = PcmArtifact(os.path.join(temp_dir.name, 'audio.pcm'))
+        self.pcm = np.random.default_rng(0).integers(-32768, 32767, size=20 * self.SAMPLE_RATE, dtype=np.int16)
+        self.pcm.tofile(self.artifact.path)
+        # シャード内の時刻で、末尾のセグメントはシャードの長さを超えて返す文字起こし
+        self.shard_samples = []
+        patcher = mock.patch('voice_picker.services.sharded_whisper.transcribe_samples', side_effect=self.transcribe_samples)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transcribe_samples(self, samples, language='ja', cpu_threads=None):
+        self.shard_samples.append(samples)
+        duration = len(samples) / self.SAMPLE_RATE
+        segments = [
+            {'start': 0.0, 'end': 2.5, 'text': 'はじめ'},
+            {'start': duration - 1.0, 'end': duration + 0.5, 'text': 'おわり'},
+            {'start': duration + 0.2, 'end': duration + 0.8, 'text': 'はみ出し'},
+        ]
+        return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
+
+    def test_offsets_and_clamps_to_shard(self):
+        """シャード内の時刻にシャードの開始位置を加算し、シャードの終了位置を超えないようにする"""
+        segments = _transcribe_shard(self.artifact.path, 5000, 12000, 'ja')
+
+        [samples] = self.shard_samples
+        np.testing.assert_array_equal(samples, self.pcm[5 * self.SAMPLE_RATE:12 * self.SAMPLE_RATE] / 32768.0)
+        self.assertEqual(segments, [
+            {'start': 5.0, 'end': 7.5, 'text': 'はじめ'},
+            {'start': 11.0, 'end': 12.0, 'text': 'おわり'},
+            {'start': 12.0, 'end': 12.0, 'text': 'はみ出し'},
+        ])
+
+    def test_transcribe_sharded_joins_shards_in_order(self):
+        """シャードの結果はシャードの順に結合し、時刻は元の音声上の時刻になる"""
+        pool = mock.Mock(workers=2, threads=1)
+        pool.map_shards.side_effect = lambda pcm_path, shards, language: [
+            _transcribe_shard(pcm_path, start_ms, end_ms, language) for start_ms, end_ms in shards
+        ]
+        with mock.patch('voice_picker.services.sharded_whisper.get_shard_pool', return_value=pool), \
+                mock.patch('voice_picker.services.sharded_whisper.plan_shards', return_value=[(0, 8000), (8000, 20000)]):
+            result = transcribe_sharded(self.artifact)
+
+        self.assertEqual(
+            [(segment['start'], segment['end']) for segment in result['segments']],
+            [(0.0, 2.5), (7.0, 8.0), (8.0, 8.0), (8.0, 10.5), (19.0, 20.0), (20.0, 20.0)],
+        )
+        self.assertEqual(result['text'], 'はじめおわりはみ出し' * 2)
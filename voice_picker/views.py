@@ -7,15 +7,13 @@ import time
 import warnings
 import re
 import webvtt
+from datetime import datetime
 import uuid
 import random
-from typing import Optional
+from typing import List, Optional, Tuple
 from moviepy.editor import VideoFileClip
 # import wave
 
-import numpy as np
-import noisereduce as nr
-from functools import lru_cache
 from celery import shared_task
 from django.db import transaction
 from django.http import JsonResponse, HttpResponse, FileResponse
@@ -27,52 +25,48 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from typing import Union
 from urllib.parse import unquote
-from vosk import KaldiRecognizer, Model
-import torch
-import whisper
-from .models import Transcription, UploadedFile, Environment
+from .models import Transcription, UploadedFile, Environment, OrganizationUsage
 from .models.uploaded_file import Status
-from .serializers import TranscriptionSerializer, UploadedFileSerializer, EnvironmentSerializer
-from pyannote.audio import Pipeline
-from pyannote.audio import Audio
-import torchaudio
-from pyannote.audio.pipelines.utils.hook import ProgressHook
+from .pagination import KeysetCursorPagination
+from .serializers import TranscriptionSerializer, UploadedFileListSerializer, UploadedFileSerializer, EnvironmentSerializer
+from .services.dedup import hash_uploaded_file, reuse_processed_duplicate
+from .services.chunk_cache import chunk_cache_key, evict_expired_chunk_results_if_due, load_chunk_result, save_chunk_result
+from .services.chunk_planner import (
+    OPENAI_MAX_UPLOAD_MB,
+    ChunkManifestEntry,
+    export_chunks,
+    get_chunk_format,
+    max_chunk_duration_ms,
+    plan_chunks,
+)
+from .services.media_probe import probe_duration
+from .services.openai_dispatch import get_openai_rate_limiter, transcribe_chunks
+from .services.pcm_artifact import PcmArtifact
+from .services.pipeline import STAGE_PERSIST, PipelineError, run_pipeline
+from .services.segment_store import bulk_save_transcriptions
+from .services.speaker_alignment import assign_speakers
+from .services.silence_index import ensure_silence_index
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework.renderers import StaticHTMLRenderer
-from pydub.silence import detect_nonsilent
 
 # 環境変数をロードする
 load_dotenv()
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-# ダイアライゼーションのためのモデルをロード
-pyannote_auth_token = os.getenv('PYANNOTE_AUTH_TOKEN')
+# OpenAI APIでの文字起こしのモデルと言語（分割ファイルの結果の保存キーにも使う）
+OPENAI_TRANSCRIBE_MODEL = "whisper-1"
+OPENAI_TRANSCRIBE_LANGUAGE = "ja"
 
 # ロガーを取得
 django_logger = logging.getLogger('django')
 api_logger = logging.getLogger('api')
 processing_logger = logging.getLogger('processing')
 
-@lru_cache(maxsize=1)
-def get_whisper_model():
-    # オープンソースWhisperモデルのロード
-    # GPUを使用する場合
-    # device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    # CPUを使用するように設定
-    device = torch.device("cpu")
-
-    whisper_model = whisper.load_model("small").to(device)
-
-    return whisper_model
-
-@lru_cache(maxsize=1)
-def get_diarization_model():
-    diarization_model = Pipeline.from_pretrained('pyannote/speaker-diarization-3.1', use_auth_token=pyannote_auth_token)
-    return diarization_model
-
 def openai_transcribe_with_retry(file_path: str, max_retries: int = 5) -> Optional[dict]:
     """
     OpenAI APIでのレート制限対策付き文字起こし処理
@@ -94,12 +88,13 @@ def openai_transcribe_with_retry(file_path: str, max_retries: int = 5) -> Option
                 processing_logger.info(f"リトライ {attempt}/{max_retries}: {delay:.1f}秒待機中...")
                 time.sleep(delay)
 
-            # API呼び出し
+            # API呼び出し（プロセス内で共有するトークンバケットで1分あたりのリクエスト数を制限）
+            get_openai_rate_limiter().acquire()
             with open(file_path, "rb") as audio_file:
                 response = client.audio.transcriptions.create(
-                    model="whisper-1",
+                    model=OPENAI_TRANSCRIBE_MODEL,
                     file=audio_file,
-                    language="ja",
+                    language=OPENAI_TRANSCRIBE_LANGUAGE,
                     response_format="verbose_json"
                 )
 
@@ -116,12 +111,6 @@ def openai_transcribe_with_retry(file_path: str, max_retries: int = 5) -> Option
                 ]
             }
 
-            # レート制限対策：成功した場合も少し待機
-            if attempt > 0:  # リトライ後の成功の場合
-                time.sleep(1)
-            else:  # 初回成功の場合
-                time.sleep(0.5)
-
             return result
 
         except Exception as e:
@@ -175,9 +164,39 @@ class EnvironmentViewSet(viewsets.ModelViewSet):
 class UploadedFileViewSet(viewsets.ModelViewSet):
     queryset = UploadedFile.objects.all()
     serializer_class = UploadedFileSerializer
+    pagination_class = KeysetCursorPagination
     parser_classes = (MultiPartParser, FormParser,)  # ファイルアップロードを許可するパーサーを追加
     permission_classes = [IsAuthenticated] # 認証を要求
 
+    def get_serializer_class(self):
+        # 一覧では大きなTEXT列を返さない
+        if self.action == 'list':
+            return UploadedFileListSerializer
+        return UploadedFileSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields:
+            # 指定されたフィールドの列だけを読み込む
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_requested_fields(self):
+        """
+        詳細の?fields=（カンマ区切り）で指定されたフィールド。指定がない場合・詳細以外のアクションではNone。
+        """
+        if self.action != 'retrieve':
+            return None
+        value = self.request.query_params.get('fields') if self.request else None
+        if not value:
+            return None
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = set(fields) - set(UploadedFileSerializer().fields)
+        if unknown:
+            raise ValidationError({"fields": f"存在しないフィールドです: {', '.join(sorted(unknown))}"})
+        return fields
+
     def list(self, request, *args, **kwargs):
         api_logger.info(f"UploadedFile list request: {request.GET}")
         user = request.user  # 現在のユーザーを取得
@@ -187,46 +206,65 @@ class UploadedFileViewSet(viewsets.ModelViewSet):
             api_logger.error("organization_idがない")
             return Response({"detail": "不正なリクエストです"}, status=status.HTTP_400_BAD_REQUEST)
 
-        queryset = UploadedFile.objects.all()
-        queryset = queryset.filter(organization=organization) # 組織に紐づいたUploadedFileを取得
-        queryset = queryset.order_by('-created_at') # 作成日時の降順で取得
+        queryset = UploadedFile.objects.filter(organization=organization) # 組織に紐づいたUploadedFileを取得
+        queryset = queryset.only(*UploadedFileListSerializer.Meta.fields) # 一覧で返す列だけを読み込む
+        queryset = self.filter_by_query_params(queryset, request.query_params)
 
-        serializer = self.get_serializer(queryset, many=True) # シリアライズ
-        response = Response(serializer.data) # json形式でレスポンス
+        # (created_at, id)の降順のキーセットページネーション（履歴の件数によらず1ページ分だけ読む）
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True) # シリアライズ
+        data = serializer.data
 
         # レスポンスデータ内のファイル名をデコード
-        for item in response.data:
+        for item in data:
             if 'file' in item and isinstance(item['file'], str):  # itemが辞書であり、fileが存在することを確認
                 item['file'] = unquote(item['file'])  # ファイル名をデコード
+
+        response = self.get_paginated_response(data) # json形式でレスポンス
         response['Content-Type'] = 'application/json; charset=utf-8'
 
-        api_logger.info(f"UploadedFile list response: {response.data}")
+        api_logger.info(f"UploadedFile list response: {len(data)}件 (next_cursor: {self.paginator.next_cursor})")
         return response
 
+    @staticmethod
+    def filter_by_query_params(queryset, query_params):
+        """
+        一覧の絞り込み（status: カンマ区切りのステータス、created_from / created_to: 作成日時の範囲）。
+        日付のみの場合、created_toはその日の終わりまでを含む。
+        """
+        statuses = query_params.get('status')
+        if statuses:
+            try:
+                statuses = [int(value) for value in statuses.split(',')]
+            except ValueError:
+                raise ValidationError({"status": "ステータスが不正です"})
+            if not set(statuses) <= set(Status.values):
+                raise ValidationError({"status": "ステータスが不正です"})
+            queryset = queryset.filter(status__in=statuses)
+
+        for param, lookup in (('created_from', 'created_at__gte'), ('created_to', 'created_at__lte')):
+            value = query_params.get(param)
+            if not value:
+                continue
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    raise ValidationError({param: "日時が不正です"})
+                moment = datetime.combine(day, datetime.max.time() if param == 'created_to' else datetime.min.time())
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            queryset = queryset.filter(**{lookup: moment})
+        return queryset
+
     @action(detail=False, methods=['post'])
     def total_duration(self, request, *args, **kwargs):
         api_logger.info(f"UploadedFile total_duration request: {request.POST}")
         user = request.user
         organization = user.organization
 
-        subscription = organization.get_subscription()
-        if subscription and subscription.is_active() and subscription.is_within_contract_period():
-            uploaded_files = UploadedFile.objects.filter(
-                organization=organization,
-                exist=True,
-                created_at__gte=subscription.current_period_start,
-                created_at__lte=subscription.current_period_end
-            )
-        else:
-            # サブスクリプションがない、または無効な場合は、現在の月でフィルタリング
-            now = timezone.now()
-            uploaded_files = UploadedFile.objects.filter(
-                organization=organization,
-                exist=True,
-                created_at__year=now.year,
-                created_at__month=now.month
-            )
-        total_duration = sum(uploaded_file.duration for uploaded_file in uploaded_files)
+        # 組織・集計期間ごとの台帳を1行読むだけで済ませる（ない場合はSumで集計して作成する）
+        total_duration = OrganizationUsage.current(organization).total_duration
 
         max_duration = organization.get_max_duration()
 
@@ -350,17 +388,11 @@ class UploadedFileViewSet(viewsets.ModelViewSet):
         file_serializer = UploadedFileSerializer(data=request.data)
         if file_serializer.is_valid():
             try:
-                uploaded_file = file_serializer.save(organization_id=organization_id)
-
-                file_path = uploaded_file.file.path
-                if os.path.exists(file_path):
-                    file_extension = os.path.splitext(file_path)[1].lower()
-                    supported_extensions = ['.mp3', '.wav', '.ogg', '.m4a', '.mp4', '.avi', '.mov', '.wmv']
-
-                    if file_extension in supported_extensions:
-                        processing_logger.info(f"Improving audio index for: {file_path}")
-                        improve_audio_index(file_path)
+                content_hash = hash_uploaded_file(request.FILES['file']) if 'file' in request.FILES else None
+                uploaded_file = file_serializer.save(organization_id=organization_id, content_hash=content_hash)
 
+                # 再生用インデックスの改善とPCM抽出は、非同期タスクの取り込み処理で1回のffmpegにまとめて行う
+                # ここではヘッダから再生時間だけを取得する
                 if uploaded_file.file.name.endswith(('.mp3', '.wav', '.ogg', '.m4a', '.mp4', '.avi', '.mov', '.wmv')):
                     duration = get_video_duration(uploaded_file.file.path)
                     if duration is not None:
@@ -372,6 +404,14 @@ class UploadedFileViewSet(viewsets.ModelViewSet):
                 django_logger.error(f"ファイル保存中にエラーが発生しました: {e}")
                 return Response({"error": "ファイルの保存に失敗しました。"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+            # 同じ組織に処理済みの同一ファイルがあれば、文字起こし・解析をやり直さずに結果をコピーする
+            try:
+                duplicate = reuse_processed_duplicate(uploaded_file)
+            except Exception as e:
+                processing_logger.warning(f"処理済みの同一ファイルからのコピーに失敗したため、通常どおり処理します: {e}")
+                duplicate = None
+            if duplicate is not None:
+                return Response(UploadedFileSerializer(uploaded_file).data, status=status.HTTP_201_CREATED)
 
             # 文字起こし処理を非同期で実行
             from .tasks import transcribe_and_save_async
@@ -386,7 +426,7 @@ class UploadedFileViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         api_logger.info(f"UploadedFile retrieve request: {request.GET}")
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        serializer = self.get_serializer(instance, fields=self.get_requested_fields())
 
         response = Response(serializer.data)
         api_logger.info(f"UploadedFile retrieve response: {response.data}")
@@ -402,7 +442,8 @@ class TranscriptionViewSet(viewsets.ModelViewSet):
         uploadedfileのIDに基づいてtranscriptionのクエリセットをフィルタリングする。
         """
         api_logger.info(f"TranscriptionViewSet get_queryset request: {self.kwargs}")
-        queryset = super().get_queryset().order_by('created_at')
+        # bulk_createで保存したレコードは作成日時が同じになるため、開始時間・IDで順序を決める
+        queryset = super().get_queryset().order_by('created_at', 'start_time', 'id')
         # URLからuploadedfileのIDを取得するためのキーを修正する
         uploadedfile_id = self.kwargs.get('uploadedfile_id')
         if uploadedfile_id is not None:
@@ -430,15 +471,17 @@ class TranscriptionSaveViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            for transcription in transcriptions:
-                save_transcription(
-                    transcription_text = transcription.get('text'),
-                    start = transcription.get('start'),
-                    uploaded_file_id = uploaded_file_id,
-                    speaker = transcription.get('speaker')
-                )
-
+            # ファイルの存在確認は1回だけ行い、レコードはまとめて保存する
             uploaded_file = UploadedFile.objects.get(id=uploaded_file_id)
+            bulk_save_transcriptions(uploaded_file_id, [
+                {
+                    "start_time": transcription.get('start'),
+                    "text": transcription.get('text'),
+                    "speaker": transcription.get('speaker'),
+                }
+                for transcription in transcriptions
+            ])
+
             result = text_generation_save(uploaded_file)
             if not isinstance(result, UploadedFile):
                 raise Exception("テキスト生成に失敗しました")
@@ -495,405 +538,211 @@ def handle_uploaded_file(f):
 
     api_logger.info(f"handle_uploaded_file get response: {'status': 'file uploaded'}")
 
-# 音声ファイルの処理
-def process_audio(file_path, file_extension):
-    processing_logger.info(f"process_audio get request: {file_path}")
-    processing_logger.info(f"process_audio get request: {file_extension}")
-    if file_extension == ".wav":
-        return file_path, file_extension
-
-    # メモリ効率化のため、大きなファイルは分割処理
-    file_size = os.path.getsize(file_path)
-    max_chunk_size = 100 * 1024 * 1024  # 100MB
+def save_transcription(transcription_text, start, uploaded_file_id, speaker):
+    """
+    文字起こし結果を1件保存する。複数件の場合はbulk_save_transcriptionsでまとめて保存する。
+    """
+    processing_logger.info(f"Saving transcription: start_time={start}, text={transcription_text}, speaker={speaker}")
 
     try:
-        if file_size > max_chunk_size:
-            # 大きなファイルは分割処理
-            return process_large_audio_file(file_path, file_extension)
-        else:
-            # 通常処理
-            return process_normal_audio_file(file_path, file_extension)
+        bulk_save_transcriptions(uploaded_file_id, [transcription_row(transcription_text, start, speaker)])
     except Exception as e:
-        processing_logger.error(f"Audio processing failed: {e}")
-        raise
-
-def process_normal_audio_file(file_path, file_extension):
-    """通常サイズのファイル処理"""
-    # 音声ファイルを読み込む
-    audio = AudioSegment.from_file(file_path, format=file_extension.replace(".", ""), frame_rate=16000, sample_width=2, channels=1)
-    processing_logger.info(f"audio: {audio}")
-
-    # 音声の正規化
-    audio = audio.normalize()
-
-    # ノイズ除去（メモリ使用量を抑制）
-    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)  # float32で精度を保ちつつメモリ節約
-
-    # CPUのみで動作するように設定（GPUエラーを回避）
-    reduced_noise = nr.reduce_noise(
-        y=samples,
-        sr=audio.frame_rate,
-        prop_decrease=0.5,
-        time_constant_s=4,
-        freq_mask_smooth_hz=500,
-        time_mask_smooth_ms=50,
-        thresh_n_mult_nonstationary=1.5,
-        sigmoid_slope_nonstationary=15,
-        n_std_thresh_stationary=1.5,
-        clip_noise_stationary=True,
-        use_tqdm=False,
-        n_jobs=1,
-        use_torch=False,  # torchを使用しない
-        device="cpu"      # CPUのみ使用
-    )
-
-    # 音声データの再構築
-    audio = AudioSegment(
-        reduced_noise.tobytes(),
-        frame_rate=audio.frame_rate,
-        sample_width=audio.sample_width,
-        channels=audio.channels
-    )
-
-    # 新しいファイル名を作成
-    new_file_path = file_path.rsplit(".", 1)[0] + ".wav"
-
-    # WAV形式でエクスポート
-    try:
-        audio.export(new_file_path, format="wav")
-    except Exception as e:
-        raise RuntimeError(f"ファイルのエクスポートに失敗しました: {e}")
-
-    # 新しいファイルが作成されたか確認
-    if not os.path.exists(new_file_path):
-        raise FileNotFoundError(f"エクスポートされたファイルが見つかりません: {new_file_path}")
-
-    return new_file_path, ".wav"
-
-def process_large_audio_file(file_path, file_extension):
-    """大きなファイルの分割処理"""
-    processing_logger.info("Processing large audio file in chunks")
-
-    # 一時的に元のファイルを16kHz WAVに変換（ノイズ除去は省略）
-    temp_audio = AudioSegment.from_file(file_path, format=file_extension.replace(".", ""))
-    temp_audio = temp_audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-
-    new_file_path = file_path.rsplit(".", 1)[0] + ".wav"
-    temp_audio.export(new_file_path, format="wav")
-
-    processing_logger.info(f"Large file converted without noise reduction: {new_file_path}")
-    return new_file_path, ".wav"
+        processing_logger.error(f"Error saving transcription: {e}")
 
-def millisec(timeStr):
+def transcription_row(transcription_text: str, start, speaker) -> dict:
     """
-    文字列形式（HH:MM:SS）からミリ秒に変換
+    保存する文字起こしレコード（Transcriptionの1行分）を作る。
     """
-    spl = timeStr.split(":")
-    s = (int)((int(spl[0]) * 60 * 60 + int(spl[1]) * 60 + float(spl[2])) * 1000)
-    return s
+    return {"start_time": int(start), "text": transcription_text, "speaker": speaker}
 
-def perform_diarization(file_path):
+def replace_transcriptions(uploaded_file_id, rows: List[dict]) -> int:
     """
-    音声ファイルをダイアライゼーション（話者分離）する。
-    """
-    pipeline = Pipeline.from_pretrained('pyannote/speaker-diarization-3.1', use_auth_token=pyannote_auth_token)
-
-    # オーディオ ファイルをメモリに事前にロードすると、処理が高速化される可能性があります。
-    waveform, sample_rate = torchaudio.load(file_path)
+    ファイルの文字起こしレコードを、1トランザクションで丸ごと置き換える。
+    リトライ・再処理で保存をやり直しても、途中まで保存したレコードが重複して残らない。
 
-    # パイプラインの進行状況を監視
-    with ProgressHook() as hook:
-        diarization = pipeline({"waveform": waveform, "sample_rate": sample_rate}, hook=hook)
-
-    return diarization
+    Args:
+        uploaded_file_id (str): アップロードファイルのID
+        rows (List[dict]): transcription_rowで作ったレコードのリスト
 
-def save_diarization_output(dz):
-    """
-    ダイアライゼーション（話者分離）の結果を保存する。（テスト用）
+    Returns:
+        int: 保存したレコード数
     """
-    with open("diarization.rttm", "w") as rttm:
-        dz.write_rttm(rttm)
-    with open("diarization.txt", "w") as text_file:
-        text_file.write(str(dz))
+    return bulk_save_transcriptions(uploaded_file_id, rows, replace=True)
 
-def extract_speakers(dz):
+def transcribe_with_engine(file_path: str, uploaded_file_id: int, engine_name: Optional[str] = None) -> bool:
     """
-    ダイアライゼーションの結果から話者情報を抽出する。
-    """
-    spacer_milli = 1000
-    speakers = set()
-    dzList = []
-    for line in dz:
-        processing_logger.info(f"line: {line}")
-        start, end = tuple(re.findall(r'[0-9]+:[0-9]+:[0-9]+\.[0-9]+', string=line))
-        processing_logger.info(f"start: {start}")
-        processing_logger.info(f"end: {end}")
-        start = millisec(start) - spacer_milli
-        end = millisec(end) - spacer_milli
-        processing_logger.info(f"start: {start}")
-        processing_logger.info(f"end: {end}")
-        speaker_match = re.findall(r'SPEAKER_\d+', line)
-        processing_logger.info(f"speaker_match: {speaker_match}")
-        speaker = speaker_match[0] if speaker_match else None
-        processing_logger.info(f"speaker: {speaker}")
-        speakers.add(speaker)
-        processing_logger.info(f"speakers: {speakers}")
-        dzList.append([start, end, speaker])
-        processing_logger.info(f"dzList: {dzList}")
-    return dzList
+    文字起こしエンジンで文字起こしを行い、transcriptionテーブルに保存する。
+    エンジンを指定しない場合は、プラン・再生時間・キューの混雑度からルーターが選ぶ。
+    パイプラインの保存ステージまでを実行するため、完了済みのステージは再実行しない。
 
-def save_transcription(transcription_text, start, uploaded_file_id, speaker):
-    """
-    文字起こし結果を保存する。
-    """
-    processing_logger.info(f"Saving transcription: start_time={start}, text={transcription_text}, speaker={speaker}")
+    Args:
+        file_path (str): 音声、動画ファイルのパス
+        uploaded_file_id (int): UploadedFileのID
+        engine_name (str, optional): 使用するエンジン名（ENGINE_REGISTRYのキー）
 
+    Returns:
+        bool: 成功した場合はTrue、失敗した場合はFalse
+    """
     try:
-        serializer = TranscriptionSerializer(data={
-            "start_time": int(start),
-            "text": transcription_text,
-            "uploaded_file": uploaded_file_id,
-            "speaker": speaker,
-        })
-
-        if serializer.is_valid():
-            serializer.save()
-            processing_logger.info(f"Transcription saved successfully: {serializer.data}")
-        else:
-            processing_logger.error(f"Validation error: {serializer.errors}")
-
+        uploaded_file = UploadedFile.objects.select_related('organization').get(id=uploaded_file_id)
+        run_pipeline(uploaded_file, file_path, engine_name=engine_name, until=STAGE_PERSIST)
+        return True
     except Exception as e:
-        processing_logger.error(f"Error saving transcription: {e}")
+        processing_logger.error(f"文字起こしでエラーが発生しました: {e}")
+        return False
 
-def transcribe_and_save(file_path: str, uploaded_file_id: int) -> bool:
+def build_diarized_rows(all_result: dict, speaker_tracks: list) -> List[dict]:
     """
-    音声、動画ファイルから文字起こしを行い、transcriptionテーブルに保存する。
+    文字起こし結果に話者分離の結果を組み合わせ、保存するレコード（話者が変わらなければ30秒まで1レコード）にまとめる。
 
     Args:
-        file_path (str): 音声、動画ファイルのパス
-        uploaded_file_id (int): UploadedFileのID
+        all_result (dict): 文字起こし結果（text・segments）
+        speaker_tracks (list): 話者分離の結果（開始秒, 終了秒, 話者ラベル）のリスト
 
     Returns:
-        bool: 成功した場合はTrue、失敗した場合はFalse
+        List[dict]: start_time・text・speakerを持つレコードのリスト
     """
+    rows = []
+    # 文字起こししたデータに再生時間を基に話者データを組み合わせる、話者が変わらなければ３０秒まで同じセグメントにまとめる
+    segment_limit_time = 30
+    temp_threshold_time = segment_limit_time
+    temp_segment_transcription_text = ""
+    temp_segment_start_time = 0
+    temp_segment_speaker = ""
+
+    # for segment, _, speaker in diarization.itertracks(yield_label=True):
+    #     # セグメントの開始時間と終了時間を取得
+    #     segment_start_time = segment.start
+    #     segment_end_time = segment.end
+
+    #     waveform, sample_rate = audio.crop(temp_file_path, segment)
+    #     # waveformが正しい形式であることを確認
+    #     if isinstance(waveform, list):
+    #         waveform = torch.tensor(waveform)  # リストをテンソルに変換
+    #     # waveformが2次元テンソルの場合、1次元に変換
+    #     if waveform.ndim == 2:
+    #         waveform = waveform.mean(dim=0)  # チャンネルを平均化
+
+    #     dz_result = whisper_model.transcribe(waveform.numpy(), language="ja")
+
+    #     # 話者情報を付加するための文字起こし結果を見つける
+    #     for result in all_result['segments']:
+    #         # 文字起こしの開始時間と終了時間を取得
+    #         result_start = result['start']
+    #         result_end = result['end']
+
+    #         # セグメントの時間と文字起こしの時間が重なっているか確認
+    #         if segment_start_time <= result_start <= segment_end_time or segment_start_time <= result_end <= segment_end_time:
+    #             sec_start = int(result_start)
+    #             sec_end = int(result_end)
+
+    #             # 話者が変わらず、temp_threshold_timeを超えていない場合、temp_segment_transcription_textに追加
+    #             if speaker == temp_segment_speaker:
+    #                 if sec_end < temp_threshold_time:
+    #                     temp_segment_transcription_text += result['text']
+    #                 else:
+    #                     save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
+    #                     temp_segment_transcription_text = result['text']
+    #                     temp_threshold_time = sec_start + segment_limit_time
+    #                     temp_segment_start_time = sec_start
+    #                     temp_segment_speaker = speaker
+    #             else:
+    #                 save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
+    #                 temp_segment_transcription_text = result['text']
+    #                 temp_threshold_time = sec_start + segment_limit_time
+    #                 temp_segment_start_time = sec_start
+    #                 temp_segment_speaker = speaker
+
+    #             print(f"[{sec_start}s - {sec_end}s] {speaker}: {result['text']}")
+    #             print("------------------------------------------------------------------------------------------------")
+    #             break
+
+    # 文字起こしからループを回すバージョン
+    # 各セグメントには時間の重なりが最も大きい話者を割り当てる（話者区間を1回走査するだけで済む）
+    segment_speakers = assign_speakers(all_result['segments'], speaker_tracks)
+
+    for result, speaker in zip(all_result['segments'], segment_speakers):
+        result_start = result['start']
+        result_end = result['end']
+        result_text = result['text']
+
+        # 重なる話者区間がない場合は直前の話者とみなす（文字起こし結果を捨てない）
+        if speaker is None:
+            speaker = temp_segment_speaker
+
+        sec_start = int(result_start)
+        sec_end = int(result_end)
+
+        # 話者が変わるか、話者が変わらなくてもtemp_threshold_timeを超えている場合、保存する
+        if speaker == temp_segment_speaker and sec_end < temp_threshold_time:
+            temp_segment_transcription_text += result_text
+        else:
+            if temp_segment_transcription_text != "":
+                rows.append(transcription_row(temp_segment_transcription_text, temp_segment_start_time, temp_segment_speaker))
+            temp_segment_transcription_text = result_text
+            temp_threshold_time = sec_start + segment_limit_time
+            temp_segment_start_time = sec_start
+            temp_segment_speaker = speaker
 
-    try:
-        # pyannoteはwavファイルの方が精度が高いので、wavファイルに変換する
-        is_wav_file = True
-        temp_file_path = file_path
-        file_extension = os.path.splitext(file_path)[1]
-        if file_extension != ".wav":
-            temp_file_path, file_extension = process_audio(file_path, file_extension)
-            is_wav_file = False
-        # pyannoteでダイアライゼーション（話者分離）を行う
-        diarization_model = get_diarization_model()
-        diarization = diarization_model(temp_file_path)
-        # save_diarization_output(diarization) # テスト用
-
-        audio = Audio(sample_rate=16000, mono=True)
-
-        # 話者分離したデータを分割で文字起こしするより、全体を文字起こしする方が精度が高い
-        whisper_model = get_whisper_model()
-        all_result = whisper_model.transcribe(temp_file_path, language="ja")
-
-        # 文字起こししたデータに再生時間を基に話者データを組み合わせる、話者が変わらなければ３０秒まで同じセグメントにまとめる
-        segment_limit_time = 30
-        temp_threshold_time = segment_limit_time
-        temp_segment_transcription_text = ""
-        temp_segment_start_time = 0
-        temp_segment_speaker = ""
-
-        # 一時ファイルの削除を保証するためtry-finally構文を追加
-        temp_files_to_cleanup = []
-        if not is_wav_file and temp_file_path != file_path:
-            temp_files_to_cleanup.append(temp_file_path)
-        # for segment, _, speaker in diarization.itertracks(yield_label=True):
-        #     # セグメントの開始時間と終了時間を取得
-        #     segment_start_time = segment.start
-        #     segment_end_time = segment.end
-
-        #     waveform, sample_rate = audio.crop(temp_file_path, segment)
-        #     # waveformが正しい形式であることを確認
-        #     if isinstance(waveform, list):
-        #         waveform = torch.tensor(waveform)  # リストをテンソルに変換
-        #     # waveformが2次元テンソルの場合、1次元に変換
-        #     if waveform.ndim == 2:
-        #         waveform = waveform.mean(dim=0)  # チャンネルを平均化
-
-        #     dz_result = whisper_model.transcribe(waveform.numpy(), language="ja")
-
-        #     # 話者情報を付加するための文字起こし結果を見つける
-        #     for result in all_result['segments']:
-        #         # 文字起こしの開始時間と終了時間を取得
-        #         result_start = result['start']
-        #         result_end = result['end']
-
-        #         # セグメントの時間と文字起こしの時間が重なっているか確認
-        #         if segment_start_time <= result_start <= segment_end_time or segment_start_time <= result_end <= segment_end_time:
-        #             sec_start = int(result_start)
-        #             sec_end = int(result_end)
-
-        #             # 話者が変わらず、temp_threshold_timeを超えていない場合、temp_segment_transcription_textに追加
-        #             if speaker == temp_segment_speaker:
-        #                 if sec_end < temp_threshold_time:
-        #                     temp_segment_transcription_text += result['text']
-        #                 else:
-        #                     save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
-        #                     temp_segment_transcription_text = result['text']
-        #                     temp_threshold_time = sec_start + segment_limit_time
-        #                     temp_segment_start_time = sec_start
-        #                     temp_segment_speaker = speaker
-        #             else:
-        #                 save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
-        #                 temp_segment_transcription_text = result['text']
-        #                 temp_threshold_time = sec_start + segment_limit_time
-        #                 temp_segment_start_time = sec_start
-        #                 temp_segment_speaker = speaker
-
-        #             print(f"[{sec_start}s - {sec_end}s] {speaker}: {result['text']}")
-        #             print("------------------------------------------------------------------------------------------------")
-        #             break
-
-        # 文字起こしからループを回すバージョン
-        for result in all_result['segments']:
-            result_start = result['start']
-            result_end = result['end']
-            result_text = result['text']
-
-            for segment, _, speaker in diarization.itertracks(yield_label=True):
-                segment_start_time = segment.start
-                segment_end_time = segment.end
-
-                # セグメントの時間と文字起こしの時間が重なっているか確認
-                if result_start <= segment_start_time <= result_end or result_start <= segment_end_time <= result_end:
-                    sec_start = int(result_start)
-                    sec_end = int(result_end)
-
-                    # 話者が変わるか、話者が変わらなくてもtemp_threshold_timeを超えている場合、保存する
-                    if speaker == temp_segment_speaker:
-                        if sec_end < temp_threshold_time:
-                            temp_segment_transcription_text += result_text
-                        else:
-                            save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
-                            temp_segment_transcription_text = result_text
-                            temp_threshold_time = sec_start + segment_limit_time
-                            temp_segment_start_time = sec_start
-                            temp_segment_speaker = speaker
-                    else:
-                        save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
-                        temp_segment_transcription_text = result_text
-                        temp_threshold_time = sec_start + segment_limit_time
-                        temp_segment_start_time = sec_start
-                        temp_segment_speaker = speaker
-
-                    print(f"[{sec_start}s - {sec_end}s] {speaker}: {result_text}")
-                    print("------------------------------------------------------------------------------------------------")
-                    break
-
-        # 最後のセグメントが残っている場合は保存
-        if temp_segment_transcription_text != "":
-            save_transcription(temp_segment_transcription_text, temp_segment_start_time, uploaded_file_id, temp_segment_speaker)
+        processing_logger.debug(f"[{sec_start}s - {sec_end}s] {speaker}: {result_text}")
 
-        return True
+    # 最後のセグメントが残っている場合は保存
+    if temp_segment_transcription_text != "":
+        rows.append(transcription_row(temp_segment_transcription_text, temp_segment_start_time, temp_segment_speaker))
 
-    except Exception as e:
-        processing_logger.error(f"エラーが発生しました: {e}")
-        return False
-    finally:
-        # 一時ファイルのクリーンアップ
-        for temp_file in temp_files_to_cleanup:
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    processing_logger.info(f"一時ファイルを削除しました: {temp_file}")
-            except OSError as e:
-                processing_logger.warning(f"一時ファイルの削除に失敗しました: {temp_file}, エラー: {e}")
+    return rows
 
-def transcribe_without_diarization(file_path, uploaded_file_id, is_free_user: bool = False):
+def build_rows_without_speaker(all_result: dict) -> List[dict]:
     """
-    話者分離なしで文字起こしを実行する関数
-    30秒を超えるまでは1レコードにまとめる
+    話者分離なしの文字起こし結果を、30秒を超えるまでは1レコードにまとめる。
 
     Args:
-        file_path (str): 音声ファイルのパス
-        uploaded_file_id (str): アップロードファイルのID
-        is_free_user (bool): 無料ユーザーかどうか
+        all_result (dict): 文字起こし結果（text・segments）
 
     Returns:
-        bool: 処理成功時True、失敗時False
+        List[dict]: start_time・text・speakerを持つレコードのリスト
     """
-    try:
-        # pyannoteはwavファイルの方が精度が高いので、wavファイルに変換する
-        is_wav_file = True
-        temp_file_path = file_path
-        file_extension = os.path.splitext(file_path)[1]
-        if file_extension != ".wav":
-            temp_file_path, file_extension = process_audio(file_path, file_extension)
-            is_wav_file = False
-
-        # Whisperで文字起こしを実行
-        all_result = transcribe_openai(temp_file_path)
-
-        # 30秒制限でセグメントをまとめる
-        segment_limit_time = 30  # 30秒の制限
-        temp_threshold_time = segment_limit_time
-        temp_segment_transcription_text = ""
-        temp_segment_start_time = 0
-        temp_segment_speaker = "UNKNOWN_SPEAKER"
-
-        # 文字起こし結果を時間順にソート
-        segments = sorted(all_result['segments'], key=lambda x: x['start'])
-
-        for result in segments:
-            result_start = int(result['start'])
-            result_end = int(result['end'])
-            result_text = result['text']
-
-            # 30秒を超える場合、現在のセグメントを保存して新しいセグメントを開始
-            if result_end > temp_threshold_time:
-                # 現在のセグメントを保存（空でない場合のみ）
-                if temp_segment_transcription_text.strip():
-                    save_transcription(
-                        temp_segment_transcription_text.strip(),
-                        temp_segment_start_time,
-                        uploaded_file_id,
-                        temp_segment_speaker
-                    )
-                    print(f"[{temp_segment_start_time}s - {temp_threshold_time}s] {temp_segment_speaker}: {temp_segment_transcription_text.strip()}")
-                    print("------------------------------------------------------------------------------------------------")
-
-                # 新しいセグメントを開始
+    rows = []
+    # 30秒制限でセグメントをまとめる
+    segment_limit_time = 30  # 30秒の制限
+    temp_threshold_time = segment_limit_time
+    temp_segment_transcription_text = ""
+    temp_segment_start_time = 0
+    temp_segment_speaker = "UNKNOWN_SPEAKER"
+
+    # 文字起こし結果を時間順にソート
+    segments = sorted(all_result['segments'], key=lambda x: x['start'])
+
+    for result in segments:
+        result_start = int(result['start'])
+        result_end = int(result['end'])
+        result_text = result['text']
+
+        # 30秒を超える場合、現在のセグメントを保存して新しいセグメントを開始
+        if result_end > temp_threshold_time:
+            # 現在のセグメントを保存（空でない場合のみ）
+            if temp_segment_transcription_text.strip():
+                rows.append(transcription_row(temp_segment_transcription_text.strip(), temp_segment_start_time, temp_segment_speaker))
+                processing_logger.debug(f"[{temp_segment_start_time}s - {temp_threshold_time}s] {temp_segment_speaker}: {temp_segment_transcription_text.strip()}")
+
+            # 新しいセグメントを開始
+            temp_segment_transcription_text = result_text
+            temp_segment_start_time = result_start
+            temp_threshold_time = result_start + segment_limit_time
+        else:
+            # 30秒以内の場合は現在のセグメントに追加
+            if temp_segment_transcription_text:
+                temp_segment_transcription_text += " " + result_text
+            else:
                 temp_segment_transcription_text = result_text
                 temp_segment_start_time = result_start
-                temp_threshold_time = result_start + segment_limit_time
-            else:
-                # 30秒以内の場合は現在のセグメントに追加
-                if temp_segment_transcription_text:
-                    temp_segment_transcription_text += " " + result_text
-                else:
-                    temp_segment_transcription_text = result_text
-                    temp_segment_start_time = result_start
-
-        # 最後のセグメントが残っている場合は保存
-        if temp_segment_transcription_text.strip():
-            save_transcription(
-                temp_segment_transcription_text.strip(),
-                temp_segment_start_time,
-                uploaded_file_id,
-                temp_segment_speaker
-            )
-            print(f"[{temp_segment_start_time}s - {temp_threshold_time}s] {temp_segment_speaker}: {temp_segment_transcription_text.strip()}")
-            print("------------------------------------------------------------------------------------------------")
 
-        # ファイルを削除
-        if not is_wav_file:
-            os.remove(temp_file_path)
+    # 最後のセグメントが残っている場合は保存
+    if temp_segment_transcription_text.strip():
+        rows.append(transcription_row(temp_segment_transcription_text.strip(), temp_segment_start_time, temp_segment_speaker))
+        processing_logger.debug(f"[{temp_segment_start_time}s - {temp_threshold_time}s] {temp_segment_speaker}: {temp_segment_transcription_text.strip()}")
 
-        return True
-
-    except Exception as e:
-        processing_logger.error(f"文字起こしでエラーが発生しました: {e}")
-        return False
+    return rows
 
 def get_file_size_mb(file_path: str) -> float:
     """
@@ -907,147 +756,53 @@ def get_file_size_mb(file_path: str) -> float:
     """
     return os.path.getsize(file_path) / (1024 * 1024)
 
-def find_silence_points(audio: AudioSegment, min_silence_len: int = 1000, silence_thresh: int = -40) -> list:
+def plan_audio_chunks(artifact: PcmArtifact, max_size_mb: float = OPENAI_MAX_UPLOAD_MB) -> List[Tuple[int, int]]:
     """
-    音声ファイル内の無音区間を検出して分割ポイントを取得する。
+    PCMアーティファクトを25MB制限に収まる区間に分ける（ファイルは書き出さない）。
+    分割区間はビットレートと再生時間から計算するため、試し書き出しは行わない。
 
     Args:
-        audio (AudioSegment): 音声データ
-        min_silence_len (int): 最小無音長（ミリ秒）
-        silence_thresh (int): 無音判定の閾値（dB）
-
-    Returns:
-        list: 分割ポイントのリスト（ミリ秒）
-    """
-    # 無音区間を検出
-    silence_ranges = detect_nonsilent(
-        audio,
-        min_silence_len=min_silence_len,
-        silence_thresh=silence_thresh
-    )
-
-    # 無音区間の開始点を分割ポイントとして使用
-    split_points = []
-    for start, end in silence_ranges:
-        # 無音区間の中央を分割ポイントとする
-        split_point = (start + end) // 2
-        split_points.append(split_point)
-
-    return split_points
-
-def split_audio_file(file_path: str, max_size_mb: float = 24.0) -> list:
-    """
-    音声ファイルを25MB制限に合わせて分割する。
-
-    Args:
-        file_path (str): 音声ファイルのパス
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
         max_size_mb (float): 最大ファイルサイズ（MB）
 
     Returns:
-        list: 分割されたファイルパスのリスト
+        List[Tuple[int, int]]: (開始, 終了)のリスト（ミリ秒）
     """
-    try:
-        # ファイルサイズをチェック
-        file_size_mb = get_file_size_mb(file_path)
-        if file_size_mb <= max_size_mb:
-            # 25MB以下なら分割不要
-            return [file_path]
-
-        # 音声ファイルを読み込み
-        audio = AudioSegment.from_file(file_path)
-        total_duration_ms = len(audio)
-
-        # より効率的な分割ロジック
-        # ファイルサイズと時間の比率から適切な分割時間を計算
-        target_chunk_duration_ms = int((max_size_mb / file_size_mb) * total_duration_ms * 0.9)  # 安全マージン
-
-        # 最小分割時間を設定（30秒 = 30000ms）
-        min_chunk_duration_ms = 30000
-        if target_chunk_duration_ms < min_chunk_duration_ms:
-            target_chunk_duration_ms = min_chunk_duration_ms
-
-        # 無音区間を検出して分割ポイントを取得
-        silence_points = find_silence_points(audio)
-
-        split_files = []
-        temp_dir = os.path.dirname(file_path)
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-
-        start_time = 0
-        chunk_index = 0
-
-        while start_time < total_duration_ms:
-            # チャンクの終了時間を計算
-            end_time = min(start_time + target_chunk_duration_ms, total_duration_ms)
-
-            # 無音区間を優先して分割ポイントを調整
-            best_silence_point = None
-            for silence_point in silence_points:
-                if start_time < silence_point < end_time:
-                    # 終了時間に近い無音区間を選択
-                    if best_silence_point is None or abs(silence_point - end_time) < abs(best_silence_point - end_time):
-                        best_silence_point = silence_point
-
-            if best_silence_point:
-                end_time = best_silence_point
-
-            # 音声を分割
-            chunk = audio[start_time:end_time]
-
-            # 分割ファイルのパスを生成
-            chunk_path = os.path.join(temp_dir, f"{base_name}_chunk_{chunk_index:03d}.wav")
-
-            # 分割ファイルを保存
-            chunk.export(chunk_path, format="wav")
-
-            # ファイルサイズをチェック
-            chunk_size_mb = get_file_size_mb(chunk_path)
-            if chunk_size_mb > max_size_mb:
-                # ファイルサイズが大きすぎる場合は削除して再分割
-                os.remove(chunk_path)
-                # より小さく分割（現在のチャンクをさらに分割）
-                sub_chunks = split_audio_file(chunk_path, max_size_mb)
-                split_files.extend(sub_chunks)
-            else:
-                split_files.append(chunk_path)
-
-            start_time = end_time
-            chunk_index += 1
+    chunk_format = get_chunk_format()
+    total_duration_ms = artifact.duration_ms
 
-            # 無限ループ防止
-            if chunk_index > 50:  # より現実的な上限
-                processing_logger.error("音声ファイルの分割が無限ループに陥りました")
-                break
+    # 上限に収まる場合は無音インデックスを作らない
+    silence_index = None
+    if total_duration_ms > max_chunk_duration_ms(max_size_mb, chunk_format['bitrate']):
+        silence_index = ensure_silence_index(artifact)
 
-        processing_logger.info(f"音声ファイルを{len(split_files)}個に分割しました（予想: {int(file_size_mb / max_size_mb) + 1}個）")
-        return split_files
-
-    except Exception as e:
-        processing_logger.error(f"音声ファイルの分割中にエラーが発生しました: {e}")
-        return [file_path]
+    return plan_chunks(total_duration_ms, silence_index, max_size_mb, chunk_format['bitrate'])
 
-def merge_transcription_results(results: list, time_offsets: list) -> dict:
+def merge_transcription_results(results: list, manifest: List[ChunkManifestEntry]) -> dict:
     """
     分割された文字起こし結果を結合する。
+    各セグメントの時刻には、マニフェストに記録した分割ファイルの正確な開始位置を加算する。
 
     Args:
-        results (list): 各分割ファイルの文字起こし結果のリスト
-        time_offsets (list): 各分割ファイルの時間オフセットのリスト
+        results (list): 各分割ファイルの文字起こし結果のリスト（失敗した分割ファイルはNone）
+        manifest (List[ChunkManifestEntry]): resultsと同じ順の分割ファイルのマニフェスト
 
     Returns:
         dict: 結合された文字起こし結果
     """
     merged_segments = []
 
-    for i, (result, time_offset) in enumerate(zip(results, time_offsets)):
+    for result, chunk in zip(results, manifest):
         if not result or 'segments' not in result:
             continue
 
+        time_offset = chunk.start_ms / 1000
+        chunk_end = chunk.end_ms / 1000
         for segment in result['segments']:
-            # 時間を調整
+            # 時間を調整（分割ファイルの範囲を超えないようにする）
             adjusted_segment = segment.copy()
-            adjusted_segment['start'] = segment['start'] + time_offset
-            adjusted_segment['end'] = segment['end'] + time_offset
+            adjusted_segment['start'] = min(segment['start'] + time_offset, chunk_end)
+            adjusted_segment['end'] = min(segment['end'] + time_offset, chunk_end)
             merged_segments.append(adjusted_segment)
 
     # 時間順にソート
@@ -1061,95 +816,60 @@ def merge_transcription_results(results: list, time_offsets: list) -> dict:
         'segments': merged_segments
     }
 
-def transcribe_openai(file_path: str) -> dict:
+def transcribe_openai(artifact: PcmArtifact) -> dict:
     """
     OpenAIのAPIを使用して音声ファイルを文字起こしする。
     25MB制限を超える場合は自動的に分割して処理する。
+    成功した分割ファイルの結果は保存しておき、リトライ・再処理時は失敗した分割ファイルだけを送る。
 
     Args:
-        file_path (str): 音声ファイルのパス
+        artifact (PcmArtifact): 16kHzモノラルのPCMアーティファクト
 
     Returns:
         dict: 文字起こし結果
-    """
-    try:
-        # ファイルサイズをチェック
-        file_size_mb = get_file_size_mb(file_path)
-
-        if file_size_mb <= 24.0:  # 安全マージンとして24MB以下
-            # 25MB以下なら通常通り処理（レート制限対策付き）
-            result = openai_transcribe_with_retry(file_path)
-            if result is None:
-                raise Exception("OpenAI APIでの文字起こしに失敗しました")
-            return result
-        else:
-            # 25MBを超える場合は分割処理
-            processing_logger.info(f"ファイルサイズが{file_size_mb:.2f}MBのため、分割処理を実行します")
-
-            # 音声ファイルを分割
-            split_files = split_audio_file(file_path)
-            processing_logger.info(f"音声ファイルを{len(split_files)}個に分割しました")
-
-            if len(split_files) == 1:
-                # 分割できなかった場合は通常処理（レート制限対策付き）
-                result = openai_transcribe_with_retry(file_path)
-                if result is None:
-                    raise Exception("OpenAI APIでの文字起こしに失敗しました")
-                return result
-
-            # 各分割ファイルを処理
-            results = []
-            time_offsets = []
-            audio = AudioSegment.from_file(file_path)
-
-            failed_files = []
-
-            for i, split_file in enumerate(split_files):
-                try:
-                    processing_logger.info(f"分割ファイル {i+1}/{len(split_files)} を処理中...")
-
-                    # レート制限対策付きで分割ファイルの文字起こし
-                    result_dict = openai_transcribe_with_retry(split_file)
-
-                    if result_dict is None:
-                        processing_logger.error(f"分割ファイル {split_file} の文字起こしに失敗しました")
-                        failed_files.append(split_file)
-                        continue
-
-                    # 時間オフセットを計算
-                    split_audio = AudioSegment.from_file(split_file)
-                    time_offset = len(audio[:len(audio) * i // len(split_files)]) / 1000.0
-
-                    results.append(result_dict)
-                    time_offsets.append(time_offset)
-
-                    processing_logger.info(f"分割ファイル {i+1}/{len(split_files)} の処理が完了しました")
-
-                except Exception as e:
-                    processing_logger.error(f"分割ファイル {split_file} の処理中にエラーが発生しました: {e}")
-                    failed_files.append(split_file)
-                finally:
-                    # 一時ファイルを削除
-                    if os.path.exists(split_file):
-                        os.remove(split_file)
 
-            # 結果の処理
-            if results:
-                if failed_files:
-                    processing_logger.warning(f"分割ファイルのうち {len(failed_files)}/{len(split_files)} 個の処理に失敗しました")
-                    processing_logger.warning(f"成功: {len(results)}/{len(split_files)} 個のファイル")
-
-                merged_result = merge_transcription_results(results, time_offsets)
-                processing_logger.info("分割された文字起こし結果を結合しました")
-                return merged_result
-            else:
-                processing_logger.error("すべての分割ファイルの処理に失敗しました")
-                processing_logger.error("対処方法: 1) OpenAI APIキーを確認 2) 課金設定を確認 3) 使用量制限を確認")
-                return {"text": "", "segments": []}
-
-    except Exception as e:
-        processing_logger.error(f"OpenAIで文字起こしに失敗しました: {e}")
-        return {"text": "", "segments": []}
+    Raises:
+        PipelineError: 失敗した分割ファイルがある場合（成功した分割ファイルの結果は保存済み）
+    """
+    chunk_format = get_chunk_format()
+    chunks = plan_audio_chunks(artifact)
+    content_hash = artifact.content_hash()
+    keys = [
+        chunk_cache_key(content_hash, start_ms, end_ms, chunk_format, OPENAI_TRANSCRIBE_MODEL, OPENAI_TRANSCRIBE_LANGUAGE)
+        for start_ms, end_ms in chunks
+    ]
+
+    # 保存済みの結果がある分割区間は書き出し・送信しない
+    results = [load_chunk_result(key) for key in keys]
+    pending = [chunk_index for chunk_index, result in enumerate(results) if result is None]
+    if len(pending) < len(chunks):
+        processing_logger.info(f"分割ファイル {len(chunks) - len(pending)}/{len(chunks)} 個は保存済みの文字起こし結果を使います")
+
+    if pending:
+        manifest = export_chunks(artifact, os.path.dirname(artifact.path), [chunks[chunk_index] for chunk_index in pending], chunk_format)
+        processing_logger.info(f"音声ファイルを{len(manifest)}個に分割しました（{artifact.duration_ms / 1000:.0f}秒 / {chunk_format['bitrate'] // 1000}kbps）")
+
+        # 各分割ファイルを並行して処理（結果はマニフェストと同じ順で返る）
+        for chunk_index, result in zip(pending, transcribe_chunks(manifest, openai_transcribe_with_retry)):
+            if result is not None:
+                save_chunk_result(keys[chunk_index], result)
+            results[chunk_index] = result
+
+    evict_expired_chunk_results_if_due()
+
+    # 一部でも失敗した場合は、欠けた文字起こしを保存せずにステージを失敗させる（リトライ時は失敗した分割ファイルだけを送る）
+    failed = sum(1 for result in results if result is None)
+    if failed:
+        processing_logger.error(f"分割ファイルのうち {failed}/{len(chunks)} 個の処理に失敗しました")
+        if failed == len(chunks):
+            processing_logger.error("対処方法: 1) OpenAI APIキーを確認 2) 課金設定を確認 3) 使用量制限を確認")
+        raise PipelineError(f"OpenAIでの文字起こしに失敗しました（{failed}/{len(chunks)} 個の分割ファイル）")
+
+    manifest = [ChunkManifestEntry('', start_ms, end_ms, 0) for start_ms, end_ms in chunks]
+    merged_result = merge_transcription_results(results, manifest)
+    if len(chunks) > 1:
+        processing_logger.info("分割された文字起こし結果を結合しました")
+    return merged_result
 
 @transaction.atomic
 def text_generation_save(uploaded_file: UploadedFile) -> Union[UploadedFile, bool]:
@@ -1548,6 +1268,7 @@ class RegenerateAnalysisViewSet(viewsets.ViewSet):
 def get_video_duration(file_path: str) -> float:
     """
     動画・音声ファイルの再生時間を取得する。
+    メタデータから取得できない場合のみ、ファイル全体をデコードする。
 
     Args:
         file_path (str): 動画・音声ファイルのパス
@@ -1556,6 +1277,13 @@ def get_video_duration(file_path: str) -> float:
         float: 再生時間（秒）
     """
     try:
+        # コンテナのメタデータ（ffprobe / ヘッダ）から取得する。音声はデコードしない
+        duration = probe_duration(file_path)
+        if duration is not None:
+            return duration
+
+        # メタデータが欠損・破損している場合のみデコードして取得する
+        processing_logger.warning(f"メタデータから再生時間を取得できなかったため、デコードして取得します: {file_path}")
         if file_path.endswith(('.mp3', '.wav', '.ogg', '.m4a')):
             # 音声ファイルの場合
             audio = AudioSegment.from_file(file_path)
@@ -1573,74 +1301,3 @@ def get_video_duration(file_path: str) -> float:
         processing_logger.error(f"ファイルの再生時間取得中にエラーが発生しました: {e}")
         return None
 
-
-def improve_audio_index(file_path: str) -> bool:
-    """
-    音声・動画ファイルのインデックス情報を改善してシーク精度を向上させる。
-    元のファイル形式は変更せず、メタデータのみを最適化する。
-
-    Args:
-        file_path (str): 音声・動画ファイルのパス
-
-    Returns:
-        bool: 成功した場合True、失敗した場合False
-    """
-    try:
-        import subprocess
-
-        file_extension = os.path.splitext(file_path)[1].lower()
-        temp_path = file_path + '.tmp'
-
-        if file_extension in ['.mp3']:
-            cmd = [
-                'ffmpeg', '-i', file_path,
-                '-c', 'copy',
-                '-write_xing', '1',
-                '-y', temp_path
-            ]
-        elif file_extension in ['.m4a', '.mp4']:
-            cmd = [
-                'ffmpeg', '-i', file_path,
-                '-c', 'copy',
-                '-movflags', 'faststart',
-                '-y', temp_path
-            ]
-        elif file_extension in ['.wav', '.ogg']:
-            cmd = [
-                'ffmpeg', '-i', file_path,
-                '-c', 'copy',
-                '-y', temp_path
-            ]
-        elif file_extension in ['.avi', '.mov', '.wmv']:
-            cmd = [
-                'ffmpeg', '-i', file_path,
-                '-c', 'copy',
-                '-movflags', 'faststart',
-                '-y', temp_path
-            ]
-        else:
-            processing_logger.warning(f"Unsupported format for index improvement: {file_extension}")
-            return False
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-
-        if result.returncode == 0:
-            os.replace(temp_path, file_path)
-            processing_logger.info(f"Audio index improved for: {file_path}")
-            return True
-        else:
-            processing_logger.error(f"ffmpeg failed for {file_path}: {result.stderr}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return False
-
-    except Exception as e:
-        processing_logger.error(f"Error improving audio index for {file_path}: {e}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
-        return False